@@ -0,0 +1,469 @@
+"""
+Benchmarks of the B+tree.
+
+Each case is a number of keys, a page size and a key/value shape (serialized by the int, str or pickle serializers)
+and runs the following workloads:
+
+- insert_sequential, insert_random: inserts all keys (one insert call each) in key order or shuffled on a new tree;
+- insert_zipfian: upserts as many keys as the case has, drawn from a Zipfian distribution (a few keys are hot);
+- get_sequential, get_random, get_zipfian: looks up keys in key order, uniformly or Zipfian-distributed;
+- range_scan: scans runs of consecutive records starting at random keys (operations = records read);
+- cold_open: opens the tree file and looks up a random key (operations = opens).
+
+Lookups, scans and opens run against a tree that's bulk loaded with all the keys of the case. Results are written as
+JSON and can be compared with the ones of a baseline run by benchmarks.compare:
+
+    python -m benchmarks.bplustree --keys 10000 1000000 --page-sizes 1024 4096 65536 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+
+Tree files are opened again by the "cold" workloads, but their pages may still be cached by the operating system.
+Timings of single runs are noisy, so runs that are compared should use --repeat (the fastest run is kept).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from itertools import islice
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from pystrukts.trees.bplustree.bplustree import BPlusTree
+from pystrukts.trees.bplustree.serializers import DefaultSerializer
+from pystrukts.trees.bplustree.serializers import IntSerializer
+from pystrukts.trees.bplustree.serializers import Serializer
+from pystrukts.trees.bplustree.serializers import StrSerializer
+
+DEFAULT_KEYS: List[int] = [10_000]
+DEFAULT_PAGE_SIZES: List[int] = [1024, 4096, 16384, 65536]
+DEFAULT_SERIALIZERS: List[str] = ["int", "str", "pickle"]
+WORKLOADS: List[str] = [
+    "insert_sequential",
+    "insert_random",
+    "insert_zipfian",
+    "get_sequential",
+    "get_random",
+    "get_zipfian",
+    "range_scan",
+    "cold_open",
+]
+ZIPFIAN_CONSTANT: float = 0.99  # same skew as YCSB's Zipfian workloads
+
+
+@dataclass
+class KeyValueShape:
+    """
+    Keys and values of a benchmark along with the serializers (and max sizes) of their trees. Keys must sort in the
+    order of their indexes.
+    """
+
+    name: str
+    key: Callable[[int], Any]
+    value: Callable[[int], Any]
+    key_serializer: Callable[[], Serializer]
+    value_serializer: Callable[[], Serializer]
+    max_key_size: int
+    max_value_size: int
+
+
+SHAPES: Dict[str, KeyValueShape] = {
+    "int": KeyValueShape("int", lambda i: i, lambda i: i, IntSerializer, IntSerializer, 4, 4),
+    "str": KeyValueShape(
+        "str", lambda i: f"key-{i:010d}", lambda i: f"value-{i}", StrSerializer, StrSerializer, 16, 32
+    ),
+    "pickle": KeyValueShape(
+        "pickle",
+        lambda i: (i, f"{i}"),
+        lambda i: {"id": i, "name": f"name-{i}"},
+        DefaultSerializer,
+        DefaultSerializer,
+        32,
+        64,
+    ),
+}
+
+
+class ZipfianGenerator:
+    """
+    Generator of key indexes within [0, items_count) drawn from a Zipfian distribution (Gray et al., "Quickly
+    generating billion-record synthetic databases", as done by YCSB). Ranks are scrambled by a hash, so the hot
+    keys are spread over the key space instead of being the smallest ones.
+    """
+
+    def __init__(self, items_count: int, rng: random.Random, theta: float = ZIPFIAN_CONSTANT) -> None:
+        self.items_count = items_count
+        self.rng = rng
+        self.theta = theta
+        self.alpha = 1 / (1 - theta)
+        self.zetan = sum(1 / i**theta for i in range(1, items_count + 1))
+        zeta2 = 1 + 1 / 2**theta
+        # with up to 2 items, ranks are always drawn by the first two cases of next
+        self.eta = (1 - (2 / items_count) ** (1 - theta)) / (1 - zeta2 / self.zetan) if items_count > 2 else 0.0
+
+    def next(self) -> int:
+        u = self.rng.random()
+        uz = u * self.zetan
+
+        if uz < 1:
+            rank = 0
+        elif uz < 1 + 0.5**self.theta:
+            rank = 1
+        else:
+            rank = int(self.items_count * (self.eta * u - self.eta + 1) ** self.alpha)
+
+        return _fnv_hash(rank) % self.items_count
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    Parameters shared by the workloads of a benchmark case.
+    """
+
+    keys: int
+    page_size: int
+    shape: KeyValueShape
+    directory: str
+    operations: int  # lookups of the get workloads
+    scans: int
+    scan_length: int
+    opens: int
+    buffer_pool_pages: int
+    seed: int
+
+    def create_tree(self, tree_file: str) -> BPlusTree:
+        return BPlusTree(
+            tree_file,
+            key_serializer=self.shape.key_serializer(),
+            value_serializer=self.shape.value_serializer(),
+            page_size=self.page_size,
+            max_key_size=self.shape.max_key_size,
+            max_value_size=self.shape.max_value_size,
+            buffer_pool_size=self.buffer_pool_pages * self.page_size,
+        )
+
+    def tree_file(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}-{self.shape.name}-{self.keys}-{self.page_size}.db")
+
+    def rng(self) -> random.Random:
+        return random.Random(self.seed)
+
+
+def run_benchmarks(
+    keys: Sequence[int] = DEFAULT_KEYS,
+    page_sizes: Sequence[int] = DEFAULT_PAGE_SIZES,
+    serializers: Sequence[str] = DEFAULT_SERIALIZERS,
+    workloads: Sequence[str] = WORKLOADS,
+    operations: int = 10_000,
+    scans: int = 100,
+    scan_length: int = 100,
+    opens: int = 20,
+    buffer_pool_pages: int = 0,
+    repeat: int = 1,
+    seed: int = 42,
+    directory: Optional[str] = None,
+    report: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the workloads of every combination of keys, page sizes and serializers and returns their results along with
+    metadata of the run. Each workload keeps its fastest run out of the given number of repetitions.
+    """
+    unknown_workloads = set(workloads) - set(WORKLOADS)
+
+    if unknown_workloads:
+        raise ValueError(f"Unknown workloads: {', '.join(sorted(unknown_workloads))}!")
+
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="bplustree-benchmarks-", dir=directory) as tmp_directory:
+        for keys_count in keys:
+            for page_size in page_sizes:
+                for serializer in serializers:
+                    case = BenchmarkCase(
+                        keys_count,
+                        page_size,
+                        SHAPES[serializer],
+                        tmp_directory,
+                        min(operations, keys_count),
+                        scans,
+                        scan_length,
+                        opens,
+                        buffer_pool_pages,
+                        seed,
+                    )
+
+                    for result in _run_case(case, workloads, repeat):
+                        results.append(result)
+
+                        if report is not None:
+                            report(result)
+
+    return {
+        "metadata": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "options": {
+                "operations": operations,
+                "scans": scans,
+                "scan_length": scan_length,
+                "opens": opens,
+                "buffer_pool_pages": buffer_pool_pages,
+                "repeat": repeat,
+                "seed": seed,
+            },
+        },
+        "results": results,
+    }
+
+
+def _run_case(case: BenchmarkCase, workloads: Sequence[str], repeat: int) -> List[Dict[str, Any]]:
+    """
+    Runs the workloads of a case. The tree of the read workloads is only built if one of them is run.
+    """
+    results = []
+    read_tree_file: Optional[str] = None
+
+    for workload in WORKLOADS:
+        if workload not in workloads:
+            continue
+
+        if not workload.startswith("insert") and read_tree_file is None:
+            read_tree_file = _build_read_tree(case)
+
+        runs = [WORKLOAD_FUNCTIONS[workload](case, read_tree_file) for _ in range(0, repeat)]
+        operations, seconds = min(runs, key=lambda run: run[1])
+        results.append(
+            {
+                "workload": workload,
+                "serializer": case.shape.name,
+                "keys": case.keys,
+                "page_size": case.page_size,
+                "operations": operations,
+                "seconds": seconds,
+                "ops_per_second": operations / seconds if seconds > 0 else 0.0,
+            }
+        )
+
+    return results
+
+
+def _build_read_tree(case: BenchmarkCase) -> str:
+    tree_file = case.tree_file("read")
+    tree = case.create_tree(tree_file)
+    tree.bulk_load((case.shape.key(i), case.shape.value(i)) for i in range(0, case.keys))
+    tree.close()
+
+    return tree_file
+
+
+def _insert(case: BenchmarkCase, indexes: Sequence[int], upsert: bool = False) -> Tuple[int, float]:
+    """
+    Inserts (or upserts) the keys of the given indexes on a new tree, one call per key. The time to close the tree
+    (and flush its pages) is included.
+    """
+    tree_file = case.tree_file("insert")
+    items = [(case.shape.key(i), case.shape.value(i)) for i in indexes]
+    tree = case.create_tree(tree_file)
+
+    start = time.perf_counter()
+
+    if upsert:
+        for item in items:
+            tree.upsert_many((item,))
+    else:
+        for key, value in items:
+            tree.insert(key, value)
+
+    tree.close()
+    seconds = time.perf_counter() - start
+
+    _remove_tree_files(tree_file)
+
+    return len(items), seconds
+
+
+def _get(case: BenchmarkCase, tree_file: str, indexes: Sequence[int]) -> Tuple[int, float]:
+    """
+    Looks up the keys of the given indexes on a freshly opened tree.
+    """
+    keys = [case.shape.key(i) for i in indexes]
+    tree = case.create_tree(tree_file)
+
+    start = time.perf_counter()
+
+    for key in keys:
+        if tree.get(key) is None:
+            raise AssertionError(f"Key {key} was not found by the benchmark!")
+
+    seconds = time.perf_counter() - start
+    tree.close()
+
+    return len(keys), seconds
+
+
+def _insert_sequential(case: BenchmarkCase, _: Optional[str]) -> Tuple[int, float]:
+    return _insert(case, range(0, case.keys))
+
+
+def _insert_random(case: BenchmarkCase, _: Optional[str]) -> Tuple[int, float]:
+    indexes = list(range(0, case.keys))
+    case.rng().shuffle(indexes)
+
+    return _insert(case, indexes)
+
+
+def _insert_zipfian(case: BenchmarkCase, _: Optional[str]) -> Tuple[int, float]:
+    generator = ZipfianGenerator(case.keys, case.rng())
+
+    return _insert(case, [generator.next() for _ in range(0, case.keys)], upsert=True)
+
+
+def _get_sequential(case: BenchmarkCase, tree_file: Optional[str]) -> Tuple[int, float]:
+    return _get(case, tree_file, range(0, case.operations))  # type: ignore
+
+
+def _get_random(case: BenchmarkCase, tree_file: Optional[str]) -> Tuple[int, float]:
+    rng = case.rng()
+
+    return _get(case, tree_file, [rng.randrange(0, case.keys) for _ in range(0, case.operations)])  # type: ignore
+
+
+def _get_zipfian(case: BenchmarkCase, tree_file: Optional[str]) -> Tuple[int, float]:
+    generator = ZipfianGenerator(case.keys, case.rng())
+
+    return _get(case, tree_file, [generator.next() for _ in range(0, case.operations)])  # type: ignore
+
+
+def _range_scan(case: BenchmarkCase, tree_file: Optional[str]) -> Tuple[int, float]:
+    rng = case.rng()
+    last_start = max(case.keys - case.scan_length, 0)  # so that every scan reads scan_length records
+    starts = [case.shape.key(rng.randint(0, last_start)) for _ in range(0, case.scans)]
+    tree = case.create_tree(tree_file)  # type: ignore
+    records_count = 0
+
+    start = time.perf_counter()
+
+    for lo in starts:
+        for _ in islice(tree.items(lo), case.scan_length):
+            records_count += 1
+
+    seconds = time.perf_counter() - start
+    tree.close()
+
+    return records_count, seconds
+
+
+def _cold_open(case: BenchmarkCase, tree_file: Optional[str]) -> Tuple[int, float]:
+    rng = case.rng()
+    keys = [case.shape.key(rng.randrange(0, case.keys)) for _ in range(0, case.opens)]
+    seconds = 0.0
+
+    for key in keys:
+        start = time.perf_counter()
+        tree = case.create_tree(tree_file)  # type: ignore
+        tree.get(key)
+        seconds += time.perf_counter() - start
+
+        tree.close()
+
+    return len(keys), seconds
+
+
+WORKLOAD_FUNCTIONS: Dict[str, Callable[[BenchmarkCase, Optional[str]], Tuple[int, float]]] = {
+    "insert_sequential": _insert_sequential,
+    "insert_random": _insert_random,
+    "insert_zipfian": _insert_zipfian,
+    "get_sequential": _get_sequential,
+    "get_random": _get_random,
+    "get_zipfian": _get_zipfian,
+    "range_scan": _range_scan,
+    "cold_open": _cold_open,
+}
+
+
+def _remove_tree_files(tree_file: str) -> None:
+    for suffix in ("", ".wal", ".bloom"):
+        if os.path.exists(f"{tree_file}{suffix}"):
+            os.remove(f"{tree_file}{suffix}")
+
+
+def _fnv_hash(value: int) -> int:
+    """
+    64-bit FNV-1a hash of the bytes of an int.
+    """
+    hashed = 0xCBF29CE484222325
+
+    for byte in value.to_bytes(8, "little"):
+        hashed = ((hashed ^ byte) * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+
+    return hashed
+
+
+def _report(result: Dict[str, Any]) -> None:
+    print(
+        f"{result['workload']:<18} {result['serializer']:<7} keys={result['keys']:<9} "
+        f"page_size={result['page_size']:<6} {result['ops_per_second']:>12.1f} ops/s",
+        file=sys.stderr,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the B+tree benchmarks and writes their results as JSON.")
+    parser.add_argument("--keys", type=int, nargs="+", default=DEFAULT_KEYS, help="keys of each tree (e.g. 1e4-1e7)")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=DEFAULT_PAGE_SIZES)
+    parser.add_argument("--serializers", nargs="+", choices=list(SHAPES), default=DEFAULT_SERIALIZERS)
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=WORKLOADS)
+    parser.add_argument("--operations", type=int, default=10_000, help="lookups of the get workloads")
+    parser.add_argument("--scans", type=int, default=100)
+    parser.add_argument("--scan-length", type=int, default=100)
+    parser.add_argument("--opens", type=int, default=20)
+    parser.add_argument("--buffer-pool-pages", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each workload (the fastest one is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--directory", help="directory of the temporary tree files (defaults to the system's)")
+    parser.add_argument("--output", help="JSON results file (defaults to stdout)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.keys,
+        args.page_sizes,
+        args.serializers,
+        args.workloads,
+        args.operations,
+        args.scans,
+        args.scan_length,
+        args.opens,
+        args.buffer_pool_pages,
+        args.repeat,
+        args.seed,
+        args.directory,
+        report=_report,
+    )
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
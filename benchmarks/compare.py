@@ -0,0 +1,110 @@
+"""
+Regression comparator of the JSON results of benchmarks.bplustree:
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+
+Results of the same workload, serializer, keys and page size are compared by their operations per second and the
+exit status is 1 if any of them got slower than the threshold allows (e.g. 10% slower), so it can gate CI runs.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+CaseKey = Tuple[str, str, int, int]  # workload, serializer, keys and page size
+
+
+@dataclass
+class Comparison:
+    """
+    Throughput of a benchmark case on the baseline and on the candidate runs.
+    """
+
+    case: CaseKey
+    baseline_ops_per_second: float
+    candidate_ops_per_second: float
+    threshold: float
+
+    @property
+    def change(self) -> float:
+        """
+        Relative change of the throughput (e.g. -0.5 if the candidate is twice as slow).
+        """
+        if self.baseline_ops_per_second == 0:
+            return 0.0
+
+        return self.candidate_ops_per_second / self.baseline_ops_per_second - 1
+
+    @property
+    def is_regression(self) -> bool:
+        return self.change < -self.threshold
+
+
+def load_results(results_file: str) -> Dict[CaseKey, Dict[str, Any]]:
+    """
+    Loads the results of a benchmark run by their cases.
+    """
+    with open(results_file) as results_data:
+        results = json.load(results_data)
+
+    return {
+        (result["workload"], result["serializer"], result["keys"], result["page_size"]): result
+        for result in results["results"]
+    }
+
+
+def compare_results(
+    baseline: Dict[CaseKey, Dict[str, Any]], candidate: Dict[CaseKey, Dict[str, Any]], threshold: float = 0.1
+) -> List[Comparison]:
+    """
+    Compares the cases found on both runs (cases of a single run are ignored).
+    """
+    return [
+        Comparison(case, baseline[case]["ops_per_second"], candidate[case]["ops_per_second"], threshold)
+        for case in baseline
+        if case in candidate
+    ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compares B+tree benchmark results against a baseline.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown (0.1 = 10%% slower)")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    comparisons = compare_results(baseline, candidate, args.threshold)
+
+    for comparison in comparisons:
+        workload, serializer, keys, page_size = comparison.case
+        status = "REGRESSION" if comparison.is_regression else "ok"
+        print(
+            f"{workload:<18} {serializer:<7} keys={keys:<9} page_size={page_size:<6} "
+            f"{comparison.baseline_ops_per_second:>12.1f} -> {comparison.candidate_ops_per_second:>12.1f} ops/s "
+            f"({comparison.change:+.1%}) {status}"
+        )
+
+    for case in sorted(set(baseline) ^ set(candidate)):
+        print(f"{' '.join(map(str, case))}: only on the {'baseline' if case in baseline else 'candidate'} run")
+
+    regressions = [comparison for comparison in comparisons if comparison.is_regression]
+
+    if regressions:
+        print(f"{len(regressions)} of {len(comparisons)} cases regressed by more than {args.threshold:.0%}!")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
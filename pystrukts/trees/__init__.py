@@ -1,3 +1,4 @@
 # flake8: noqa
+from pystrukts.trees.bplustree.aio import AsyncBPlusTree
 from pystrukts.trees.bplustree.bplustree import BPlusTree
 from pystrukts.trees.bstree import BSTree
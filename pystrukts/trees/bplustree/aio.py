@@ -0,0 +1,329 @@
+"""
+Module with an asyncio front-end of the B+tree.
+"""
+# pylint: disable=protected-access
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+from typing import Dict
+from typing import Generic
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
+
+from pystrukts._types.basic import StrPath
+from pystrukts._types.comparable import KT
+from pystrukts._types.comparable import VT
+from pystrukts.trees.bplustree.bplustree import BPlusTree
+from pystrukts.trees.bplustree.memory import PageData
+from pystrukts.trees.bplustree.node import BPTNode
+from pystrukts.trees.bplustree.node import OverflowValue
+
+T = TypeVar("T")
+
+
+class AsyncReadWriteLatch:
+    """
+    Readers-writer latch for the coroutines of an event loop: many coroutines may hold it for reading at the same
+    time while a coroutine that holds it for writing excludes all the others. Waiting writers block new readers so
+    that writers don't starve. Unlike ReadWriteLatch, it's not reentrant.
+    """
+
+    def __init__(self) -> None:
+        self._condition: Optional[asyncio.Condition] = None  # created on first use to bind it to the running loop
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = False
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        return self._condition
+
+    @asynccontextmanager
+    async def reading(self) -> AsyncIterator[None]:
+        """
+        Holds the latch for reading while the context is active.
+        """
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self._writer and self._waiting_writers == 0)
+            self._readers += 1
+
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self._readers -= 1
+
+                if self._readers == 0:
+                    self.condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self) -> AsyncIterator[None]:
+        """
+        Holds the latch for writing (exclusively) while the context is active.
+        """
+        async with self.condition:
+            self._waiting_writers += 1
+
+            try:
+                await self.condition.wait_for(lambda: not self._writer and self._readers == 0)
+            finally:
+                self._waiting_writers -= 1
+
+            self._writer = True
+
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self._writer = False
+                self.condition.notify_all()
+
+
+class AsyncBPlusTree(Generic[KT, VT]):
+    """
+    Class that represents a B+tree for asyncio applications. Lookups and scans descend the tree on the event loop
+    but their disk pages are read on a bounded executor, so cold pages don't block the other coroutines of the loop.
+    Coroutines that await the same page share a single in-flight read of it. Writes run on the executor as a whole.
+
+    The constructor accepts the options of BPlusTree (the wrapped tree is always created in concurrent mode).
+    """
+
+    tree: BPlusTree[KT, VT]
+    executor: Executor
+    latch: AsyncReadWriteLatch
+    pending_reads: Dict[int, asyncio.Future]  # page number -> in-flight read of the page
+
+    def __init__(
+        self,
+        tree_file: Optional[StrPath] = None,
+        max_workers: int = 4,
+        executor: Optional[Executor] = None,
+        **tree_options: Any,
+    ) -> None:
+        self.tree = BPlusTree(tree_file, concurrent=True, **tree_options)
+        self.owns_executor = executor is None
+        self.executor = (
+            executor
+            if executor is not None
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bplustree-io")
+        )
+        self.latch = AsyncReadWriteLatch()
+        self.pending_reads = dict()
+
+    async def __aenter__(self) -> AsyncBPlusTree[KT, VT]:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def get(self, key: KT) -> Optional[VT]:
+        """
+        Looks for a key on the B+tree. If it's not found, returns None.
+        """
+        if not self.tree._may_contain(key):
+            return None
+
+        async with self.latch.reading():
+            node: Any = self.tree.root
+            fence: Optional[KT] = None  # separator to the right of the leaf
+
+            while not node.is_leaf:
+                i = node.child_index(key)
+                child_node = node.child_node(i)
+
+                if i < node.records_count:
+                    fence = node.key_at(i)
+
+                node = (
+                    child_node
+                    if child_node is not None
+                    else self.tree._view_from_page(await self._read_page(node.child_page(i)))
+                )
+
+            i = node.find_record(key)
+
+            # duplicates of a separator's key may continue on the next leaf (as in BPlusTree.get)
+            if i is None and fence == key and node.next_leaf_page != 0:
+                node = self.tree._view_from_page(await self._read_page(node.next_leaf_page))
+                i = node.find_record(key)
+
+            if i is None:
+                return None
+
+            return await self._load_value(node.value_at(i))
+
+    async def items(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> AsyncIterator[Tuple[KT, VT]]:
+        """
+        Yields the (key, value) pairs whose keys are within [lo, hi) in key order. If lo or hi are None, the range
+        is unbounded on that side. The next leaf is read ahead while the records of a leaf are consumed. Writes
+        wait for the iteration to end, so the iterating coroutine must not write to the tree.
+        """
+        async with self.latch.reading():
+            leaf = await self._find_leaf(lo)
+            next_leaf: Optional[asyncio.Future] = None
+
+            try:
+                while True:
+                    if leaf.next_leaf_page != 0:  # page 0 is the metadata page, so it's never a leaf
+                        next_leaf = asyncio.ensure_future(self._read_page(leaf.next_leaf_page))
+
+                    for record in leaf.leaf_records:
+                        if lo is not None and record.key < lo:
+                            continue
+
+                        if hi is not None and record.key >= hi:
+                            return
+
+                        yield record.key, await self._load_value(record.value)
+
+                    if next_leaf is None:
+                        return
+
+                    leaf = self.tree._node_from_page(leaf.next_leaf_page, await next_leaf)
+                    next_leaf = None
+            finally:
+                if next_leaf is not None:
+                    next_leaf.cancel()
+
+    async def keys(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> AsyncIterator[KT]:
+        """
+        Yields the keys within [lo, hi) in order.
+        """
+        async for key, _ in self.items(lo, hi):
+            yield key
+
+    async def values(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> AsyncIterator[VT]:
+        """
+        Yields the values of the keys within [lo, hi) in key order.
+        """
+        async for _, value in self.items(lo, hi):
+            yield value
+
+    def __len__(self) -> int:
+        """
+        Returns the number of keys of the B+tree.
+        """
+        return len(self.tree)
+
+    async def insert(self, key: KT, value: VT) -> None:
+        """
+        Inserts a key and its value on the B+tree.
+        """
+        await self._write(self.tree.insert, key, value)
+
+    async def insert_many(self, items: Iterable[Tuple[KT, VT]]) -> None:
+        """
+        Inserts a batch of (key, value) pairs on the B+tree. See BPlusTree.insert_many.
+        """
+        await self._write(self.tree.insert_many, items)
+
+    async def upsert_many(self, items: Iterable[Tuple[KT, VT]]) -> None:
+        """
+        Inserts or replaces a batch of (key, value) pairs on the B+tree. See BPlusTree.upsert_many.
+        """
+        await self._write(self.tree.upsert_many, items)
+
+    async def bulk_load(self, sorted_items: Iterable[Tuple[KT, VT]], fill_factor: float = 1.0) -> None:
+        """
+        Builds an empty B+tree from (key, value) pairs sorted by key. See BPlusTree.bulk_load.
+        """
+        await self._write(self.tree.bulk_load, sorted_items, fill_factor)
+
+    async def delete(self, key: KT) -> bool:
+        """
+        Deletes a key from the B+tree. Returns True if the key was found and deleted.
+        """
+        return await self._write(self.tree.delete, key)
+
+    async def delete_range(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> int:
+        """
+        Deletes the keys within [lo, hi) and returns how many keys were deleted.
+        """
+        return await self._write(self.tree.delete_range, lo, hi)
+
+    async def flush(self) -> None:
+        """
+        Writes the B+tree's pending changes to disk.
+        """
+        await self._write(self.tree.flush)
+
+    async def checkpoint(self) -> None:
+        """
+        Writes the committed pages of the write-ahead log to the tree file (if the log is enabled).
+        """
+        await self._write(self.tree.checkpoint)
+
+    async def close(self) -> None:
+        """
+        Closes the B+tree and shuts down its executor if it was created by the front-end.
+        """
+        await self._write(self.tree.close)
+
+        if self.owns_executor:
+            self.executor.shutdown(wait=False)
+
+    async def _find_leaf(self, key: Optional[KT]) -> BPTNode[KT, VT]:
+        """
+        Descends the tree to the leftmost leaf whose records may contain the given key or to the leftmost leaf
+        of the tree if the key is None.
+        """
+        node = self.tree.root
+
+        while not node.is_leaf:
+            i = 0 if key is None else node.child_index(key)
+            child_page = node.child_page(i)
+            child_node = node.child_node(i)
+            node = (
+                child_node
+                if child_node is not None
+                else self.tree._node_from_page(child_page, await self._read_page(child_page))
+            )
+
+        return node
+
+    async def _read_page(self, page_number: int) -> PageData:
+        """
+        Reads a disk page on the executor. Concurrent reads of the same page share the same in-flight read.
+        """
+        pending_read = self.pending_reads.get(page_number)
+
+        if pending_read is None:
+            loop = asyncio.get_running_loop()
+            pending_read = loop.run_in_executor(self.executor, self.tree.memory.read_page, page_number)
+            pending_read.add_done_callback(lambda _: self.pending_reads.pop(page_number, None))
+            self.pending_reads[page_number] = pending_read
+
+        # a cancelled awaiter must not cancel the read for the other awaiters of the page
+        return await asyncio.shield(pending_read)
+
+    async def _load_value(self, value: Union[VT, OverflowValue]) -> VT:
+        """
+        Returns a value of a leaf record reading it from its overflow pages on the executor if needed.
+        """
+        if isinstance(value, OverflowValue):
+            return await self._run(self.tree._load_value, value)
+
+        return value
+
+    async def _write(self, method: Callable[..., T], *args: Any) -> T:
+        """
+        Runs a write method of the tree on the executor while the latch is held for writing.
+        """
+        async with self.latch.writing():
+            return await self._run(method, *args)
+
+    async def _run(self, function: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(function, *args))
@@ -0,0 +1,126 @@
+"""
+Bloom filter used by the B+tree to answer lookups of absent keys without reading any page.
+"""
+from __future__ import annotations
+
+import math
+import os
+from hashlib import blake2b
+from typing import List
+from typing import Optional
+
+from pystrukts._types.basic import StrPath
+
+# bloom filter file layout: bits_per_key (2 bytes), hash_count (1 byte), capacity (8 bytes), bits_count (8 bytes), bits
+BITS_PER_KEY_BYTE_SPACE: int = 2
+HASH_COUNT_BYTE_SPACE: int = 1
+CAPACITY_BYTE_SPACE: int = 8
+BITS_COUNT_BYTE_SPACE: int = 8
+
+MIN_BLOOM_FILTER_CAPACITY: int = 1024  # keys
+
+
+class BloomFilter:
+    """
+    Probabilistic set of serialized keys: it never misses a key that was added to it, but it may report keys that
+    were never added with a false positive rate that depends on its bits per key (about 1% with 10 bits per key)
+    as long as it holds up to its capacity. Each key sets hash_count bits derived from a single 128-bit hash of
+    the key (double hashing).
+    """
+
+    bits: bytearray
+    bits_count: int
+    hash_count: int
+    bits_per_key: int
+    capacity: int  # number of keys the filter was sized for
+
+    def __init__(self, capacity: int, bits_per_key: int) -> None:
+        if bits_per_key <= 0:
+            raise ValueError(f"Bloom filters need at least one bit per key and not: {bits_per_key}!")
+
+        self.capacity = max(capacity, MIN_BLOOM_FILTER_CAPACITY)
+        self.bits_per_key = bits_per_key
+        self.hash_count = max(1, round(bits_per_key * math.log(2)))  # minimizes the false positive rate
+        self.bits_count = self.capacity * bits_per_key
+        self.bits = bytearray((self.bits_count + 7) // 8)
+
+    def add(self, key_data: bytes) -> None:
+        """
+        Adds a serialized key to the filter.
+        """
+        for bit in self._bit_positions(key_data):
+            self.bits[bit >> 3] |= 1 << (bit & 7)
+
+    def may_contain(self, key_data: bytes) -> bool:
+        """
+        Returns False if the serialized key was certainly never added to the filter or True if it may have been.
+        """
+        return all(self.bits[bit >> 3] & (1 << (bit & 7)) for bit in self._bit_positions(key_data))
+
+    def save(self, file_path: StrPath) -> None:
+        """
+        Writes the filter to a file. The file is replaced atomically, so it's never left half-written.
+        """
+        filter_data = bytes()
+        filter_data += self.bits_per_key.to_bytes(BITS_PER_KEY_BYTE_SPACE, "big")
+        filter_data += self.hash_count.to_bytes(HASH_COUNT_BYTE_SPACE, "big")
+        filter_data += self.capacity.to_bytes(CAPACITY_BYTE_SPACE, "big")
+        filter_data += self.bits_count.to_bytes(BITS_COUNT_BYTE_SPACE, "big")
+
+        tmp_file_path = f"{os.fsdecode(file_path)}.tmp"
+
+        with open(tmp_file_path, "wb") as filter_file:
+            filter_file.write(filter_data + self.bits)
+            filter_file.flush()
+            os.fsync(filter_file.fileno())
+
+        os.replace(tmp_file_path, file_path)
+
+    @staticmethod
+    def load(file_path: StrPath) -> Optional[BloomFilter]:
+        """
+        Reads a filter from a file or returns None if there's no (complete) filter file.
+        """
+        try:
+            with open(file_path, "rb") as filter_file:
+                filter_data = filter_file.read()
+        except FileNotFoundError:
+            return None
+
+        start = 0
+        end = start + BITS_PER_KEY_BYTE_SPACE
+        bits_per_key = int.from_bytes(filter_data[start:end], "big")
+
+        start = end
+        end += HASH_COUNT_BYTE_SPACE
+        hash_count = int.from_bytes(filter_data[start:end], "big")
+
+        start = end
+        end += CAPACITY_BYTE_SPACE
+        capacity = int.from_bytes(filter_data[start:end], "big")
+
+        start = end
+        end += BITS_COUNT_BYTE_SPACE
+        bits_count = int.from_bytes(filter_data[start:end], "big")
+
+        bits = bytearray(filter_data[end:])
+
+        if bits_per_key == 0 or len(bits) != (bits_count + 7) // 8:
+            return None
+
+        bloom_filter = BloomFilter(capacity, bits_per_key)
+        bloom_filter.hash_count = hash_count
+        bloom_filter.bits_count = bits_count
+        bloom_filter.bits = bits
+
+        return bloom_filter
+
+    def _bit_positions(self, key_data: bytes) -> List[int]:
+        """
+        Returns the positions of the bits of a key: h1 + i * h2 (mod bits count) for i in [0, hash_count).
+        """
+        digest = blake2b(key_data, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1  # odd steps don't cycle early on even bits counts
+
+        return [(h1 + i * h2) % self.bits_count for i in range(0, self.hash_count)]
@@ -3,34 +3,95 @@ Module with a B+tree implementation.
 """
 from __future__ import annotations
 
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import AnyStr
+from typing import Callable
 from typing import Generic
+from typing import Iterable
+from typing import Iterator
+from typing import List
 from typing import Optional
 from typing import Tuple
+from typing import Union
+from typing import cast
 
 from pystrukts._types.basic import Endianness
 from pystrukts._types.basic import StrPath
 from pystrukts._types.comparable import KT
 from pystrukts._types.comparable import VT
+from pystrukts.trees.bplustree.bloom import BloomFilter
+from pystrukts.trees.bplustree.cursor import Cursor
+from pystrukts.trees.bplustree.exceptions import NodeOverflow
+from pystrukts.trees.bplustree.exceptions import ReadOnlyTreeFile
+from pystrukts.trees.bplustree.latches import NullLatch
+from pystrukts.trees.bplustree.latches import ReadWriteLatch
+from pystrukts.trees.bplustree.latches import read_latched
+from pystrukts.trees.bplustree.latches import write_latched
+from pystrukts.trees.bplustree.memory import DEFAULT_MAX_PRESERVED_PAGES
+from pystrukts.trees.bplustree.memory import STORAGE_BACKENDS
+from pystrukts.trees.bplustree.memory import EvictionPolicy
+from pystrukts.trees.bplustree.memory import PageData
 from pystrukts.trees.bplustree.memory import PagedFileMemory
+from pystrukts.trees.bplustree.metrics import TreeMetrics
 from pystrukts.trees.bplustree.node import BPTNode
+from pystrukts.trees.bplustree.node import BPTNodeView
 from pystrukts.trees.bplustree.node import InnerRecord
 from pystrukts.trees.bplustree.node import LeafRecord
+from pystrukts.trees.bplustree.node import OverflowValue
+from pystrukts.trees.bplustree.node import has_columnar_leaves
 from pystrukts.trees.bplustree.serializers import DefaultSerializer
 from pystrukts.trees.bplustree.serializers import Serializer
 from pystrukts.trees.bplustree.settings import INNER_NODE_HEADERS_SPACE
+from pystrukts.trees.bplustree.settings import INNER_RECORD_SLOT_SPACE
 from pystrukts.trees.bplustree.settings import LEAF_NODES_HEADERS_SPACE
+from pystrukts.trees.bplustree.settings import LEAF_RECORD_SLOT_SPACE
+from pystrukts.trees.bplustree.settings import MAX_PAGE_SIZE
 from pystrukts.trees.bplustree.settings import NODE_POINTER_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import NODE_TYPE_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import OVERFLOW_PAGE_HEADERS_SPACE
+from pystrukts.trees.bplustree.settings import OVERFLOW_PAGE_TYPE
+from pystrukts.trees.bplustree.settings import OVERFLOW_VALUE_REFERENCE_SPACE
+from pystrukts.trees.bplustree.settings import PREV_LEAF_POINTER_OFFSET
+from pystrukts.trees.bplustree.settings import SUBTREE_COUNT_BYTE_SPACE
+from pystrukts.trees.bplustree.snapshot import TreeSnapshot
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SearchableNode = Union[BPTNode[KT, VT], BPTNodeView[KT, VT]]
 
 
 class BPlusTree(Generic[KT, VT]):
     """
     Class that represents a B+tree.
+
+    Trees created with concurrent=True can be shared by threads: readers hold the tree's latch for reading and
+    writers hold it exclusively. Scans (items, keys, values and array_items) hold the read latch until they're
+    exhausted or closed, so a thread must close its partially consumed scans before it changes the tree (its
+    writes raise a RuntimeError otherwise) and the writers of other threads wait for them.
     """
 
     root: BPTNode[KT, VT]
     memory: PagedFileMemory
+    storage: str  # name of the storage backend of the tree file
+    latch: Union[ReadWriteLatch, NullLatch]
     inner_degree: int
     leaf_degree: int
+    columnar_leaves: bool  # leaves of fixed-width records are stored as key and value columns
+    order_statistics: bool  # inner nodes keep the records counts of their children's subtrees
+
+    # bloom filter of the keys (None if disabled) and whether its file holds all the keys of the tree file
+    bloom_filter: Optional[BloomFilter] = None
+    bloom_filter_bits_per_key: int
+    bloom_filter_saved: bool
+
+    # opt-in counters and latency histograms (None if disabled)
+    metrics: Optional[TreeMetrics] = None
 
     key_serializer: Serializer[KT]
     value_serializer: Serializer[VT]
@@ -44,222 +105,1387 @@ class BPlusTree(Generic[KT, VT]):
         page_size: int = 4096,
         max_key_size: int = 8,
         max_value_size: int = 32,
+        buffer_pool_size: int = 0,
+        eviction_policy: Optional[EvictionPolicy] = None,
+        storage: str = "file",
+        wal: bool = False,
+        wal_group_commit_size: int = 1,
+        wal_group_commit_interval: Optional[float] = None,
+        write_back: bool = False,
+        concurrent: bool = False,
+        read_only: bool = False,
+        bloom_filter_bits_per_key: int = 0,
+        metrics: Optional[TreeMetrics] = None,
+        order_statistics: bool = False,
     ) -> None:
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend: {storage}. Choose one of: {', '.join(STORAGE_BACKENDS)}.")
+
+        self.storage = storage
         self.key_serializer = key_serializer if key_serializer is not None else DefaultSerializer[KT]()
         self.value_serializer = value_serializer if value_serializer is not None else DefaultSerializer[VT]()
-        self.memory = PagedFileMemory(page_size, max_key_size, max_value_size, self.endianness, tree_file)
+        self.memory = STORAGE_BACKENDS[storage](
+            page_size,
+            max_key_size,
+            max_value_size,
+            self.endianness,
+            tree_file,
+            buffer_pool_size=buffer_pool_size,
+            eviction_policy=eviction_policy,
+            wal=wal,
+            wal_group_commit_size=wal_group_commit_size,
+            wal_group_commit_interval=wal_group_commit_interval,
+            write_back=write_back,
+            read_only=read_only,
+            metrics=metrics,
+            order_statistics=order_statistics,
+        )
+        self.metrics = metrics
+
+        # only new tree files take the given setting: existing ones keep the one they were created with
+        self.order_statistics = self.memory.order_statistics
+
+        if metrics is not None:
+            # only the instances with metrics pay for timing their operations
+            self.get = metrics.instrument("get", self.get)  # type: ignore
+            self.insert = metrics.instrument("insert", self.insert)  # type: ignore
+
         self.inner_degree = self._compute_inner_degree()
         self.leaf_degree = self._compute_leaf_degree()
+        self.columnar_leaves = has_columnar_leaves(
+            self.key_serializer,
+            self.value_serializer,
+            self.memory.max_key_size,
+            self.memory.max_value_size,
+            self.endianness,
+        )
+
+        # readers (lookups and scans) share the tree while writers get exclusive access to it
+        self.latch = ReadWriteLatch() if concurrent else NullLatch()
 
         if self.memory.is_new_file:
             self.root = self._create_root()
+            self.memory.commit()
         else:
-            self.root = self._read_root()
+            self.root = self._read_root(self.memory.root_page)
 
+        # lookups of absent keys are answered by the bloom filter (if enabled) without reading any page
+        self.bloom_filter_bits_per_key = bloom_filter_bits_per_key
+        self._open_bloom_filter()
+
+    @write_latched
     def insert(self, key: KT, value: VT) -> None:
         """
-        Inserts a new key and value on the B+tree. Splits the root node or children nodes
-        as the max number of keys are exceeded on the nodes according to the tree's degree.
+        Inserts a new key and value on the B+tree. Nodes that overflow (leaves with more than (2t - 1) records
+        or inner nodes whose keys no longer fit a page) are split on the way back and the root is split last.
         """
-        if self._is_full(self.root):
-            old_root = self.root
+        self._insert_batch([(key, value)], upsert=False)
 
-            # new root is never a leaf node
-            new_root = self._create_node(is_leaf=False)
-            self.root = new_root
-            self._swap_pages(old_root, new_root)  # swap disk pages so that the new root stays on page 1
+    @write_latched
+    def insert_many(self, items: Iterable[Tuple[KT, VT]]) -> None:
+        """
+        Inserts a batch of (key, value) pairs. The batch is sorted and the tree is descended only once for each
+        leaf that receives keys: all keys of the same leaf are merged into it at once and nodes are split (possibly
+        in many nodes) only when they overflow, so each touched page is read and written once per batch.
+        """
+        self._insert_batch(items, upsert=False)
 
-            # first node pointer is always created upon inner split
-            new_root.first_node = old_root
-            new_root.first_node_page = old_root.disk_page
+    @write_latched
+    def upsert_many(self, items: Iterable[Tuple[KT, VT]]) -> None:
+        """
+        Same as insert_many, but the values of keys that already exist are replaced instead of duplicated. If a
+        key is repeated in the batch, its last value is kept.
+        """
+        self._insert_batch(items, upsert=True)
 
-            # splits the new root's child (old root) which is full to add the new key/value
-            self._split_child(new_root, old_root, 0)
-            self._insert_non_full(new_root, key, value)
-        else:
-            self._insert_non_full(self.root, key, value)
+    @write_latched
+    def bulk_load(self, sorted_items: Iterable[Tuple[KT, VT]], fill_factor: float = 1.0) -> None:
+        """
+        Builds the B+tree bottom-up from (key, value) pairs sorted by strictly increasing keys in a single
+        streaming pass. Leaves are packed (up to fill_factor of their page) and chained in allocation order
+        and each inner level is filled as its children are completed, so only the rightmost node of each level
+        is kept in memory and every page is written once. The B+tree must be empty.
+        """
+        self._check_writable()
+
+        if not 0 < fill_factor <= 1:
+            raise ValueError(f"Fill factor must be within (0, 1] and not: {fill_factor}!")
+
+        if not self.root.is_leaf or self.root.records_count > 0:
+            raise ValueError("Bulk loading is only allowed on an empty B+tree!")
+
+        capacity = int(fill_factor * self.memory.page_size)  # in bytes as records have variable sizes
+
+        levels: List[BPTNode[KT, VT]] = []  # rightmost node of each level being filled (level 0 for leaves)
+        sizes: List[int] = []  # upper bound of the serialized size of each level's inner node (without prefixes)
+        leaf_size = LEAF_NODES_HEADERS_SPACE
+        records_count = 0
+        last_key: Optional[KT] = None
+
+        for key, value in sorted_items:
+            if levels and not key > last_key:  # type: ignore
+                raise ValueError(f"Bulk loaded keys must be strictly increasing but got {key} after {last_key}!")
+
+            record, record_size = self._create_leaf_record(key, value)
+
+            if not levels:
+                levels.append(self._create_node(is_leaf=True))
+            elif levels[0].records_count > 0 and leaf_size + record_size > capacity:
+                full_leaf = levels[0]
+                levels[0] = self._create_node(is_leaf=True)
+                full_leaf.next_leaf_page = levels[0].disk_page
+                levels[0].prev_leaf_page = full_leaf.disk_page
+
+                self._disk_write(full_leaf)
+                separator = self._separator(last_key, key)  # type: ignore
+                self._bulk_load_child(
+                    levels,
+                    sizes,
+                    1,
+                    full_leaf.disk_page,
+                    full_leaf.records_count,
+                    separator,
+                    levels[0].disk_page,
+                    capacity,
+                )
+                leaf_size = LEAF_NODES_HEADERS_SPACE
+
+                # the root is only replaced at the end, so a crash before that leaves an empty tree
+                self.memory.commit()
+
+            levels[0].leaf_records.append(record)
+            leaf_size += record_size
+            records_count += 1
+            last_key = key
+
+        if not levels:
+            return
+
+        for level, node in enumerate(levels):
+            if level > 0:
+                # the rightmost node of the level below is the last child of the level's rightmost node
+                node.set_child_count(node.records_count, levels[level - 1].subtree_records_count)
+
+            self._disk_write(node)
+
+        # the topmost node becomes the new root (the empty root leaf is released)
+        self.memory.free_page(self.root.disk_page)
+        self.root = levels[-1]
+        self.memory.root_page = self.root.disk_page
+        self.memory.tree_height = len(levels)
+        self.memory.records_count = records_count
+        self.memory.commit()
+
+        if self.bloom_filter is not None:
+            self._rebuild_bloom_filter()
+
+    def _pack(self, sorted_items: Iterable[Tuple[KT, VT]], fill_factor: float) -> None:
+        """
+        Builds an empty B+tree from (key, value) pairs sorted by key (as compactions do). Unlike bulk_load, all leaves
+        are written before the inner levels, so they take consecutive pages from the root leaf's page on (apart from
+        the overflow pages of big values). The separator, page and records count of each leaf are kept in memory
+        until the inner levels are packed.
+        """
+        capacity = int(fill_factor * self.memory.page_size)  # in bytes as records have variable sizes
+
+        leaf = self.root  # the empty root leaf becomes the first leaf
+        leaf_separator: Optional[KT] = None  # separator to the left of the leaf being filled
+        leaf_size = LEAF_NODES_HEADERS_SPACE
+        children: List[Tuple[Optional[KT], int, int]] = []
+        records_count = 0
+        last_key: Optional[KT] = None
+
+        # index and size of the leaf's trailing records with the last key, which move along to the next leaf
+        run_start = 0
+        run_size = 0
+
+        for key, value in sorted_items:
+            record, record_size = self._create_leaf_record(key, value)
+
+            if key != last_key:
+                run_start = leaf.records_count
+                run_size = 0
+
+            if leaf.records_count > 0 and leaf_size + record_size > capacity:
+                next_leaf = self._create_node(is_leaf=True)
+                leaf.next_leaf_page = next_leaf.disk_page
+                next_leaf.prev_leaf_page = leaf.disk_page
+
+                # duplicates only straddle leaves if their records (and the new one) don't fit a leaf by themselves
+                if run_start > 0 and LEAF_NODES_HEADERS_SPACE + run_size + record_size <= capacity:
+                    next_leaf.leaf_records = leaf.leaf_records[run_start:]
+                    del leaf.leaf_records[run_start:]
+                else:
+                    run_size = 0
+
+                self._disk_write(leaf)
+                children.append((leaf_separator, leaf.disk_page, leaf.records_count))
+                leaf_separator = self._separator(leaf.leaf_records[-1].key, key)
+                leaf = next_leaf
+                leaf_size = LEAF_NODES_HEADERS_SPACE + run_size
+                run_start = 0
+
+            leaf.leaf_records.append(record)
+            leaf_size += record_size
+            run_size += record_size
+            records_count += 1
+            last_key = key
+
+        self._disk_write(leaf)
+        children.append((leaf_separator, leaf.disk_page, leaf.records_count))
+        tree_height = 1
+
+        while len(children) > 1:
+            children = self._pack_inner_level(children, capacity)
+            tree_height += 1
+
+        self.root = self._read_root(children[0][1])
+        self.memory.root_page = self.root.disk_page
+        self.memory.tree_height = tree_height
+        self.memory.records_count = records_count
+        self.memory.commit()
+
+    def _pack_inner_level(
+        self, children: List[Tuple[Optional[KT], int, int]], capacity: int
+    ) -> List[Tuple[Optional[KT], int, int]]:
+        """
+        Packs the children of a level (the separator to their left, their page and their subtree's records count)
+        into inner nodes of up to capacity bytes that are written to consecutive pages and returns the children of
+        the level above.
+        """
+        parents: List[Tuple[Optional[KT], int, int]] = []
+        node: Optional[BPTNode[KT, VT]] = None
+        node_separator: Optional[KT] = None
+        size = 0
+
+        for separator, page, count in children:
+            record_size = 0 if node is None else self._inner_record_size(separator)  # type: ignore
+
+            if node is None or (node.records_count > 0 and size + record_size > capacity):
+                if node is not None:
+                    self._disk_write(node)
+                    parents.append((node_separator, node.disk_page, node.subtree_records_count))
+
+                # the child's separator goes up to the level above as the new node's separator
+                node = self._create_node(is_leaf=False)
+                node.first_node_page = page
+                node.first_node_count = count
+                node_separator = separator
+                size = self._inner_headers_size()
+                continue
+
+            node.inner_records.append(InnerRecord(separator, page, None, count))  # type: ignore
+            size += record_size
+
+        self._disk_write(node)  # type: ignore
+        parents.append((node_separator, node.disk_page, node.subtree_records_count))  # type: ignore
+
+        return parents
+
+    def _bulk_load_child(
+        self,
+        levels: List[BPTNode[KT, VT]],
+        sizes: List[int],
+        level: int,
+        left_page: int,
+        left_count: int,
+        separator: KT,
+        right_page: int,
+        capacity: int,
+    ) -> None:
+        """
+        Adds a new right child page to the rightmost inner node of the given level during bulk loading. The
+        separator splits the left child's keys from the right child's keys and the left child (which is complete)
+        has left_count records on its subtree. Inner nodes whose keys would exceed the capacity (bytes) are written
+        to disk and their separator is passed to the level above while the new child becomes the first node of a
+        new inner node.
+        """
+        if level == len(levels):
+            levels.append(self._create_node(is_leaf=False))
+            levels[level].first_node_page = left_page
+            sizes.append(self._inner_headers_size())
+
+        node = levels[level]
+        node.set_child_count(node.records_count, left_count)  # the left child is the node's last child
+        record_size = self._inner_record_size(separator)
+
+        if node.records_count == 0 or sizes[level - 1] + record_size <= capacity:
+            node.inner_records.append(InnerRecord(separator, right_page, None))
+            sizes[level - 1] += record_size
+            return
+
+        levels[level] = self._create_node(is_leaf=False)
+        levels[level].first_node_page = right_page
+        sizes[level - 1] = self._inner_headers_size()
+
+        self._disk_write(node)
+        self._bulk_load_child(
+            levels,
+            sizes,
+            level + 1,
+            node.disk_page,
+            node.subtree_records_count,
+            separator,
+            levels[level].disk_page,
+            capacity,
+        )
 
+    def _inner_headers_size(self) -> int:
+        """
+        Returns the size of the headers of an inner node (along with its first child's subtree count, if kept).
+        """
+        return INNER_NODE_HEADERS_SPACE + (SUBTREE_COUNT_BYTE_SPACE if self.order_statistics else 0)
+
+    def _inner_record_size(self, separator: KT) -> int:
+        """
+        Returns an upper bound of the size of an inner record with the given separator (as if its key wasn't prefix
+        compressed) for packing inner nodes up to a capacity.
+        """
+        count_size = SUBTREE_COUNT_BYTE_SPACE if self.order_statistics else 0
+
+        return INNER_RECORD_SLOT_SPACE + count_size + len(self.key_serializer.to_bytes(separator))
+
+    @read_latched
     def get(self, key: KT) -> Optional[VT]:
         """
         Looks for a key on the B+tree. If it's not found, returns None.
         """
+        if not self._may_contain(key):
+            return None
+
         result = self._get(self.root, key)
 
         if result is not None:
             node, i = result  # only leaf nodes can contain values, so we have a leaf node
-            return node.leaf_records[i].value
+            return self._load_value(node.value_at(i))
 
         return None
 
-    def _get(self, node: BPTNode[KT, VT], key: KT) -> Optional[Tuple[BPTNode[KT, VT], int]]:
+    @read_latched
+    def items(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[Tuple[KT, VT]]:
+        """
+        Yields the (key, value) pairs whose keys are within [lo, hi) in key order. If lo or hi are None, the range
+        is unbounded on that side. The tree is descended only once to the first leaf of the range and the leaves
+        are then streamed through their next leaf pointers. The tree must not be modified during the iteration
+        (concurrent trees refuse writes of the scanning thread and delay the others' until the scan is closed).
+        """
+        leaf = self._find_leaf(lo)
+
+        while True:
+            for record in leaf.leaf_records:
+                if lo is not None and record.key < lo:
+                    continue
+
+                if hi is not None and record.key >= hi:
+                    return
+
+                yield record.key, self._load_value(record.value)
+
+            if leaf.next_leaf_page == 0:  # page 0 is the metadata page, so it's never a leaf
+                return
+
+            leaf = self._disk_read(leaf.next_leaf_page)
+
+    @read_latched
+    def array_items(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Same as items, but the keys within [lo, hi) and their values are yielded in bulk as NumPy arrays: a pair of
+        (keys, values) array slices for each leaf of the range. The arrays are built over the leaves' pages without
+        copying them, so they're only valid until the tree is changed. It requires NumPy and columnar leaves of
+        NumPy scalars (e.g. Int64Serializer or Float64Serializer for both keys and values).
+        """
+        node: SearchableNode[KT, VT] = self.root if not self.root.is_leaf else self._disk_read_view(self.root.disk_page)
+
+        while not node.is_leaf:
+            node = self._disk_read_view(node.child_page(0 if lo is None else node.child_index(lo)))
+
+        while True:
+            keys, values = node.key_array(), node.value_array()  # type: ignore
+            start = 0 if lo is None else node.lower_bound(lo)  # type: ignore
+            end = len(keys) if hi is None else node.lower_bound(hi)  # type: ignore
+
+            if start < end:
+                yield keys[start:end], values[start:end]
+
+            if end < len(keys) or node.next_leaf_page == 0:  # page 0 is the metadata page, so it's never a leaf
+                return
+
+            node = self._disk_read_view(node.next_leaf_page)
+
+    def keys(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[KT]:
+        """
+        Yields the keys within [lo, hi) in order.
+        """
+        for key, _ in self.items(lo, hi):
+            yield key
+
+    def values(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[VT]:
+        """
+        Yields the values of the keys within [lo, hi) in key order.
+        """
+        for _, value in self.items(lo, hi):
+            yield value
+
+    @read_latched
+    def count(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> int:
+        """
+        Returns how many keys are within [lo, hi). With order statistics, it's the difference of the ranks of lo and
+        hi, so it reads a page per level whatever the size of the range. Otherwise, the keys of the range are scanned.
+        """
+        if not self.order_statistics:
+            return sum(1 for _ in self.keys(lo, hi))
+
+        lo_rank = 0 if lo is None else self.rank(lo)
+        hi_rank = len(self) if hi is None else self.rank(hi)
+
+        return max(hi_rank - lo_rank, 0)
+
+    @read_latched
+    def rank(self, key: KT) -> int:
+        """
+        Returns how many keys are smaller than the given key, i.e., the index of its first occurrence on the sorted
+        keys (or where it would be inserted). With order statistics, the subtree counts of the children to the left
+        of the descent are summed on the way down to the key's leaf. Otherwise, the leaves up to the key are scanned.
+        """
+        if not self.order_statistics:
+            return sum(1 for _ in self.keys(None, key))
+
+        node: SearchableNode[KT, VT] = self.root if not self.root.is_leaf else self._disk_read_view(self.root.disk_page)
+        rank = 0
+
+        while not node.is_leaf:
+            i = node.child_index(key)
+            rank += sum(node.child_count(j) for j in range(0, i))  # type: ignore
+            node = self._disk_read_view(node.child_page(i))
+
+        return rank + node.lower_bound(key)  # type: ignore
+
+    @read_latched
+    def select(self, i: int) -> Tuple[KT, VT]:
+        """
+        Returns the (key, value) pair at the i-th position of the sorted keys (negative positions count from the
+        end), e.g. for pagination by offset or percentiles. With order statistics, the descent follows the child
+        whose subtree holds the i-th key. Otherwise, the leaves up to it are scanned. Raises IndexError if there's
+        no such position.
+        """
+        records_count = len(self)
+
+        if i < 0:
+            i += records_count
+
+        if not 0 <= i < records_count:
+            raise IndexError(f"Position {i} is out of the range of the B+tree's {records_count} keys!")
+
+        if not self.order_statistics:
+            return next(islice(self.items(), i, None))
+
+        node: SearchableNode[KT, VT] = self.root if not self.root.is_leaf else self._disk_read_view(self.root.disk_page)
+
+        while not node.is_leaf:
+            j = 0
+
+            while j < node.records_count and i >= node.child_count(j):  # type: ignore
+                i -= node.child_count(j)  # type: ignore
+                j += 1
+
+            node = self._disk_read_view(node.child_page(j))
+
+        return node.key_at(i), self._load_value(node.value_at(i))
+
+    def __len__(self) -> int:
+        """
+        Returns the number of keys of the B+tree which is kept on the metadata page.
+        """
+        return self.memory.records_count
+
+    @property
+    def height(self) -> int:
+        """
+        Returns the number of levels of the B+tree (a single leaf root has height 1).
+        """
+        return self.memory.tree_height
+
+    @read_latched
+    def snapshot(self, max_preserved_pages: int = DEFAULT_MAX_PRESERVED_PAGES) -> TreeSnapshot[KT, VT]:
+        """
+        Returns a read-only view of the B+tree as it is now. Writes may go on while the snapshot is read as the
+        pages they overwrite keep their before-images for it (and only for the pages it may read). The snapshot
+        must be closed (e.g. by using it as a context manager) so that these before-images are released.
+
+        Every page written while the snapshot is open costs a before-image of a full page: up to
+        max_preserved_pages of them are kept in main memory and the others are spilled to a temporary file (which
+        is deleted once all snapshots are closed), so long scans that run alongside heavy writes use disk space
+        instead of main memory.
+        """
+        return TreeSnapshot(self, self.memory.take_snapshot(max_preserved_pages))
+
+    def cursor(self) -> Cursor[KT, VT]:
+        """
+        Returns an unpositioned cursor over the records of the B+tree: it's positioned with seek, first or last and
+        then moved with next and prev. Cursors should be closed (e.g. by using them as context managers) so that their
+        current leaf is unpinned from the buffer pool.
+        """
+        return Cursor(self)
+
+    @write_latched
+    def delete(self, key: KT) -> bool:
+        """
+        Deletes a key (and its value) from the B+tree and returns whether the key was found. Nodes that are left
+        with less than (t - 1) records borrow records from a sibling or are merged with it and the pages of merged
+        nodes are released to the free list of pages.
+        """
+        self._check_writable()
+        new_siblings = self._delete(self.root, key, self.memory.tree_height - 1)
+        self._grow_root(new_siblings or [])
+
+        # a root without keys has a single child which becomes the new root
+        if not self.root.is_leaf and self.root.records_count == 0:
+            self.memory.free_page(self.root.disk_page)
+            self.root = self._read_root(self.root.first_node_page)
+            self.memory.root_page = self.root.disk_page
+            self.memory.tree_height -= 1
+
+        self.memory.commit()
+
+        return new_siblings is not None
+
+    @write_latched
+    def delete_range(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> int:
+        """
+        Deletes all keys within [lo, hi) and returns how many keys were deleted.
+        """
+        deleted_count = 0
+
+        while True:
+            # the tree changes on deletions, so the range is scanned again for each batch of (about) a leaf of keys
+            keys_batch = list(islice(self.keys(lo, hi), 2 * self.leaf_degree - 1))
+            batch_deleted_count = sum(self.delete(key) for key in keys_batch)
+
+            if batch_deleted_count == 0:
+                return deleted_count
+
+            deleted_count += batch_deleted_count
+
+    @write_latched
+    def flush(self) -> None:
+        """
+        Writes all dirty pages (of write-back mode) to the tree file, or to the write-ahead log if it's enabled.
+        The bloom filter (if enabled) is saved to its file afterwards.
+        """
+        self.memory.flush()
+        self._save_bloom_filter()
+
+    @contextmanager
+    @write_latched
+    def transaction(self) -> Iterator[None]:
+        """
+        Context manager that defers all page writes of the operations performed inside it: pages are marked as
+        dirty and each one is written only once when the block exits (as a single write-ahead log operation, if
+        the log is enabled). If the block raises an exception, all of its changes are discarded.
+        """
+        self._check_writable()
+        self.memory.begin_transaction()
+
+        try:
+            yield
+        except BaseException:
+            self.memory.rollback_transaction()
+            self.root = self._read_root(self.memory.root_page)  # drops in-memory nodes changed by the transaction
+            raise
+
+        self.memory.end_transaction()
+
+    @write_latched
+    def refresh(self) -> None:
+        """
+        Makes a read-only B+tree see the operations committed by the tree file's writer since it was opened
+        without opening the tree file again: cached pages are dropped and the metadata page and the root are read
+        again. Lookups that run afterwards see the new state of the tree.
+        """
+        self.memory.refresh()
+        self.root = self._read_root(self.memory.root_page)
+        self._open_bloom_filter()
+
+    @write_latched
+    def checkpoint(self) -> None:
+        """
+        Writes the committed pages of the write-ahead log (if enabled) to the tree file and empties the log.
+        """
+        self.memory.checkpoint()
+
+    @write_latched
+    def compact(self, target_path: Optional[StrPath] = None, fill_factor: float = 1.0) -> None:
+        """
+        Rewrites the B+tree into a new tree file laid out in key order and swaps it in for the tree file: the leaves
+        are streamed in key order to consecutive pages (packed up to fill_factor of their page) and the inner levels
+        are packed after them, so scans read the file sequentially again and free pages are dropped. The new file is
+        written to target_path (by default, the tree file's path with a ".compact" suffix), which must be on the same
+        file system as the tree file, and then atomically replaces the tree file. The B+tree stays open afterwards.
+        """
+        self._check_writable()
+
+        if not 0 < fill_factor <= 1:
+            raise ValueError(f"Fill factor must be within (0, 1] and not: {fill_factor}!")
+
+        if self.memory.snapshots:
+            raise ValueError("The B+tree can't be compacted while it has open snapshots!")
+
+        if self.memory.transaction_depth > 0:
+            raise ValueError("The B+tree can't be compacted inside a transaction!")
+
+        if target_path is None:
+            target_path = f"{os.fsdecode(self.memory.tree_file_path)}.compact"
+
+            if os.path.exists(target_path):
+                os.remove(target_path)  # left by an interrupted compaction
+        elif os.path.exists(target_path):
+            raise ValueError(f"Target file {os.fsdecode(target_path)} of the compaction already exists!")
+
+        compacted_tree: BPlusTree[KT, VT] = BPlusTree(
+            target_path,
+            self.key_serializer,
+            self.value_serializer,
+            page_size=self.memory.page_size,
+            max_key_size=self.memory.max_key_size,
+            max_value_size=self.memory.max_value_size,
+            storage=self.storage,
+            order_statistics=self.order_statistics,
+        )
+
+        try:
+            compacted_tree._pack(self.items(), fill_factor)
+        except BaseException:
+            compacted_tree.close()
+            os.remove(target_path)
+            raise
+
+        compacted_tree.close()
+        self.memory.replace_tree_file(target_path)
+        self.root = self._read_root(self.memory.root_page)
+
+    @write_latched
+    def close(self) -> None:
+        """
+        Flushes any pending pages to the tree file and closes it. The bloom filter (if enabled) is saved to its file.
+        """
+        self.memory.close()
+        self._save_bloom_filter()
+
+    def _check_writable(self) -> None:
+        """
+        Raises ReadOnlyTreeFile if the B+tree was opened in read-only mode (before anything is changed).
+        """
+        if self.memory.read_only:
+            raise ReadOnlyTreeFile("The B+tree can't be changed as it was opened in read-only mode!")
+
+    def _get(self, node: SearchableNode[KT, VT], key: KT) -> Optional[Tuple[SearchableNode[KT, VT], int]]:
         """
         Finds a leaf node along with it's corresponding index int of its 'leaf_records' array
         containg the record with the value associated with the given key. If no such node is found,
-        returns None.
+        returns None. Nodes that are not in memory are searched through lazy views of their disk pages,
+        so only the probed keys and the found value are ever deserialized.
         """
-        i = 0
+        levels = 1
+        fence: Optional[KT] = None  # separator to the right of the leaf
 
-        if node.is_leaf:
-            while i < node.records_count and key > node.leaf_records[i].key:
-                i += 1
+        while not node.is_leaf:
+            # inner node searching: look at the child whose subtree may contain the key
+            i = node.child_index(key)
+            next_node = node.child_node(i)
 
-            if i < node.records_count and key == node.leaf_records[i].key:
-                return node, i
+            if i < node.records_count:
+                fence = node.key_at(i)
 
-            return None
+            # if not in memory, view it from disk
+            node = next_node if next_node is not None else self._disk_read_view(node.child_page(i))
+            levels += 1
 
-        # inner node searching
-        while i < node.records_count and key > node.inner_records[i].key:
-            i += 1
+        if self.metrics is not None:
+            self.metrics.count("descents")
+            self.metrics.count("descent_levels", levels)
 
-        # here we have an inner node, if i == 0, it's smaller than all keys
-        # so look at the first child page (out of the inner_records)
-        if i == 0:
-            next_node_page = node.first_node_page
-            next_node = node.first_node
-        else:
-            i -= 1  # [!]: key is bigger than first page keys, but inner_records starts at i == 0
+        record_index = node.find_record(key)
+
+        # duplicates of a separator's key may continue on the next leaf after they are deleted from this one
+        if record_index is None and fence == key and node.next_leaf_page != 0:
+            node = self._disk_read_view(node.next_leaf_page)
+            record_index = node.find_record(key)
 
-            next_node_page = node.inner_records[i].next_node_page
-            next_node = node.inner_records[i].next_node
+        if record_index is not None:
+            return node, record_index
+
+        return None
+
+    def _find_leaf(self, key: Optional[KT]) -> BPTNode[KT, VT]:
+        """
+        Descends the tree to the leftmost leaf whose records may contain the given key or to the leftmost leaf
+        of the tree if the key is None.
+        """
+        node = self.root
 
-        # check if the next inner node is in memory
-        if next_node is not None:
-            return self._get(next_node, key)
+        while not node.is_leaf:
+            i = 0 if key is None else node.child_index(key)
+            child_node = node.child_node(i)
+            node = child_node if child_node is not None else self._disk_read(node.child_page(i))
 
-        # if not in memory, read it from disk and perform recursion
-        return self._get(self._disk_read(next_node_page), key)
+        return node
 
     def _disk_write(self, node: BPTNode[KT, VT]) -> None:
         """
         Writes a given node to disk according to its page attribute by calling the memory allocator.
         """
         node_page = node.disk_page
+        start = time.perf_counter() if self.metrics is not None else 0.0
         node_data = node.to_page(
             self.memory.page_size, self.memory.max_key_size, self.memory.max_value_size, self.endianness
         )
+
+        if self.metrics is not None:
+            self.metrics.count("serialize_seconds", time.perf_counter() - start)
+
         self.memory.write_page(node_page, node_data)
 
     def _disk_read(self, node_page: int) -> BPTNode[KT, VT]:
         """
         Reads a given node from disk according to its page attribute by calling the memory allocator.
         """
-        page_data = self.memory.read_page(node_page)
+        return self._node_from_page(node_page, self.memory.read_page(node_page))
+
+    def _disk_read_view(self, node_page: int) -> BPTNodeView[KT, VT]:
+        """
+        Reads a given node's disk page and returns a lazy view of it without deserializing its records.
+        """
+        return self._view_from_page(self.memory.read_page(node_page))
 
+    def _node_from_page(self, node_page: int, page_data: PageData) -> BPTNode[KT, VT]:
+        """
+        Deserializes a node from the data of its disk page.
+        """
+        start = time.perf_counter() if self.metrics is not None else 0.0
         node_from_disk: BPTNode[KT, VT] = BPTNode(True, node_page, self.key_serializer, self.value_serializer)
         node_from_disk.load_from_page(page_data, self.memory.max_key_size, self.memory.max_value_size, self.endianness)
 
+        if self.metrics is not None:
+            self.metrics.count("deserialize_seconds", time.perf_counter() - start)
+
         return node_from_disk
 
-    def _is_full(self, node: BPTNode[KT, VT]) -> bool:
+    def _view_from_page(self, page_data: PageData) -> BPTNodeView[KT, VT]:
         """
-        Checks if the given node is full of keys according to the tree's degree which takes
-        into account the disk page sizes.
+        Returns a lazy view of a node from the data of its disk page.
         """
-        degree = self.leaf_degree if node.is_leaf else self.inner_degree
+        return BPTNodeView(
+            page_data,
+            self.memory.max_key_size,
+            self.memory.max_value_size,
+            self.endianness,
+            self.key_serializer,
+            self.value_serializer,
+        )
 
-        return node.records_count == 2 * degree - 1
+    def _insert_batch(self, items: Iterable[Tuple[KT, VT]], upsert: bool) -> None:
+        """
+        Inserts a batch of items from the root and grows the tree while the root overflows.
+        """
+        self._check_writable()
+        records = [self._create_leaf_record(key, value)[0] for key, value in sorted(items, key=lambda item: item[0])]
 
-    def _insert_non_full(self, node: BPTNode[KT, VT], key: KT, value: VT) -> None:
+        if not records:
+            return
+
+        self._grow_root(self._insert_records(self.root, records, upsert, self.memory.tree_height - 1)[0])
+        self.memory.commit()
+
+        # the filter is sized for twice the keys it's built with, so it's rebuilt each time the tree doubles
+        if self.bloom_filter is not None and self.memory.records_count > self.bloom_filter.capacity:
+            self._rebuild_bloom_filter()
+
+    def _grow_root(self, new_siblings: List[InnerRecord[KT, VT]]) -> None:
         """
-        Inserts a new key into a non-full node or raise an exception.
+        Adds new levels on top of the root while it has new right siblings after being split.
         """
-        # starts at the end of the inserted keys so far
-        i = node.records_count - 1
+        while new_siblings:
+            old_root = self.root
+
+            # new root is never a leaf node
+            new_root = self._create_node(is_leaf=False)
+            new_root.first_node = old_root
+            new_root.first_node_page = old_root.disk_page
+            new_root.inner_records = new_siblings
+            self._count_children(new_root, (0, old_root))
+            self._count_siblings(new_siblings)
+
+            self.root = new_root
+            self.memory.root_page = new_root.disk_page
+            self.memory.tree_height += 1
 
+            new_siblings = self._split_overflowing_node(new_root, self.memory.tree_height - 1)
+
+    def _insert_records(
+        self,
+        node: BPTNode[KT, VT],
+        records: List[LeafRecord[KT, VT]],
+        upsert: bool,
+        level: int,
+        fence: Optional[KT] = None,
+    ) -> Tuple[List[InnerRecord[KT, VT]], List[LeafRecord[KT, VT]]]:
+        """
+        Inserts sorted leaf records into the subtree of the given node (of the given level, 0 for leaves) whose
+        right separator is the fence (None for the rightmost subtrees). Records are grouped by the child they belong
+        to, so each child is descended only once. Returns the inner records (separator key and node) of the new
+        right siblings of the node if it overflowed and had to be split, along with the upserted records of the
+        fence key that were not found: they are upserted into the next subtree, where its duplicates may continue.
+        """
         if node.is_leaf:
-            new_record = LeafRecord(key, value)
+            deferred_records: List[LeafRecord[KT, VT]] = []
+
+            if upsert and records[-1].key == fence and node.next_leaf_page != 0 and node.find_record(fence) is None:
+                while records and records[-1].key == fence:
+                    deferred_records.insert(0, records.pop())
+
+            node.leaf_records = self._merge_leaf_records(node.leaf_records, records, upsert)
+            return self._split_overflowing_node(node, level), deferred_records
+
+        children_siblings = []
+        deferred_records = []
+        start = 0
+        i = 0
+
+        while start < len(records) or deferred_records:
+            # records deferred by a child go to the next one (as their key is the child's separator)
+            i = i + 1 if deferred_records else node.child_index(records[start].key)
+            end = start
+
+            # the next records belong to the same child up to the child's separator
+            while end < len(records) and (i == node.records_count or records[end].key <= node.key_at(i)):
+                end += 1
+
+            child_node = self._disk_read(node.child_page(i))
+            node.set_child_node(i, child_node)
+            child_siblings, deferred_records = self._insert_records(
+                child_node,
+                deferred_records + records[start:end],
+                upsert,
+                level - 1,
+                node.key_at(i) if i < node.records_count else fence,
+            )
+            self._count_children(node, (i, child_node))
+            self._count_siblings(child_siblings)
+            children_siblings.append((i, child_siblings))
+            start = end
+
+            # the rightmost child's separator is the node's, so its deferred records go to the node's next sibling
+            if i == node.records_count:
+                break
+
+        # nodes are written again if they got new children or if the counts of their children changed
+        if not node.has_subtree_counts and not any(siblings for _, siblings in children_siblings):
+            return [], deferred_records
 
-            # finds final sorted position of the key (notice we need to do i + 1 after the loop)
-            while i >= 0 and key < node.leaf_records[i].key:
-                i -= 1
+        # the new siblings of the i-th child are placed right after it (from right to left to keep the indexes)
+        for i, siblings in reversed(children_siblings):
+            node.inner_records[i:i] = siblings
 
-            # shift keys right to find a new spot for the new key
-            node.leaf_records.insert(i + 1, new_record)
+        return self._split_overflowing_node(node, level), deferred_records
 
+    def _merge_leaf_records(
+        self, leaf_records: List[LeafRecord[KT, VT]], records: List[LeafRecord[KT, VT]], upsert: bool
+    ) -> List[LeafRecord[KT, VT]]:
+        """
+        Merges two sorted lists of leaf records. New records are placed after existing records with the same key
+        or replace them when upserting.
+        """
+        merged_records: List[LeafRecord[KT, VT]] = []
+        i = 0
+
+        for record in records:
+            while i < len(leaf_records) and leaf_records[i].key <= record.key:
+                merged_records.append(leaf_records[i])
+                i += 1
+
+            if upsert and merged_records and merged_records[-1].key == record.key:
+                self._free_value(merged_records[-1].value)
+                merged_records[-1] = record
+            else:
+                merged_records.append(record)
+                self.memory.records_count += 1
+
+        merged_records.extend(leaf_records[i:])
+
+        return merged_records
+
+    def _split_overflowing_node(self, node: BPTNode[KT, VT], level: int) -> List[InnerRecord[KT, VT]]:
+        """
+        Writes a node (of the given level, 0 for leaves) that may be overflowing, i.e., whose records don't fit a
+        page anymore. Overflowing nodes are split in halves until they fit and the inner records (separator key and
+        node) of the new right siblings are returned so that they can be inserted in the parent node.
+        """
+        try:
             self._disk_write(node)
-        else:
-            while i >= 0 and key < node.inner_records[i].key:
-                i -= 1
+            return []
+        except NodeOverflow:
+            pass
 
-            child_node_page = node.inner_records[i].next_node_page
-            child_node = self._disk_read(child_node_page)
-            node.inner_records[i].next_node = child_node
+        if self.metrics is not None:
+            self.metrics.count_split(level)
 
-            if self._is_full(child_node):
-                self._split_child(node, child_node, i)
-                if key > node.inner_records[i].key:
-                    i += 1
+        if node.is_leaf:
+            return self._split_leaf_node(node)
+
+        return self._split_inner_node(node, level)
+
+    def _split_leaf_node(self, node: BPTNode[KT, VT]) -> List[InnerRecord[KT, VT]]:
+        """
+        Splits an overflowing leaf in halves and chains the new leaf to its right. Halves that still overflow are
+        split again: the right half is written first, so splits of the left half can patch its previous leaf pointer.
+        """
+        middle = self._leaf_split_index(node)
+
+        new_node = self._create_node(is_leaf=True)
+        new_node.leaf_records = node.leaf_records[middle:]
+        del node.leaf_records[middle:]
+
+        new_node.next_leaf_page = node.next_leaf_page
+        new_node.prev_leaf_page = node.disk_page
+        node.next_leaf_page = new_node.disk_page
+        separator = self._separator(node.leaf_records[-1].key, new_node.leaf_records[0].key)
+
+        if new_node.next_leaf_page != 0:
+            self._write_prev_leaf_page(new_node.next_leaf_page, new_node.disk_page)
 
-            # as splitting adds a new key in the current node, refetch child
-            child_node_page = node.inner_records[i].next_node_page
-            child_node = self._disk_read(child_node_page)
-            node.inner_records[i].next_node = child_node
+        new_node_siblings = self._split_overflowing_node(new_node, 0)
+        siblings = self._split_overflowing_node(node, 0)
+        siblings.append(InnerRecord(separator, new_node.disk_page, new_node))
+        siblings.extend(new_node_siblings)
 
-            self._insert_non_full(child_node, key, value)
+        return siblings
 
-    def _split_child(self, parent_node: BPTNode[KT, VT], child_node: BPTNode[KT, VT], i: int) -> None:
+    def _leaf_split_index(self, node: BPTNode[KT, VT]) -> int:  # pylint: disable=no-self-use
         """
-        Splits the child according to whether it is a leaf or inner node. Notice that the parent node must
-        be an inner node or it would not have children.
+        Returns the index where an overflowing leaf is split: the key boundary closest to its middle, so records with
+        the same key stay together. Only a leaf whose records all have the same key is split in the middle, and then
+        its duplicates straddle the split (searches move right from a leaf whose separator equals the key).
         """
-        if child_node.is_leaf:
-            self._split_leaf_child(parent_node, child_node, i)
+        records = node.leaf_records
+        middle = len(records) // 2
+
+        for distance in range(0, middle + 1):
+            for i in (middle - distance, middle + distance):
+                if 0 < i < len(records) and records[i - 1].key < records[i].key:
+                    return i
+
+        return middle
+
+    def _write_prev_leaf_page(self, leaf_page: int, prev_leaf_page: int) -> None:
+        """
+        Patches the previous leaf pointer of a leaf page whose left sibling changed without deserializing it.
+        """
+        page_data = bytearray(self.memory.read_page(leaf_page))
+        page_data[PREV_LEAF_POINTER_OFFSET:LEAF_NODES_HEADERS_SPACE] = prev_leaf_page.to_bytes(
+            NODE_POINTER_BYTE_SPACE, self.endianness
+        )
+        self.memory.write_page(leaf_page, bytes(page_data))
+
+    def _split_inner_node(self, node: BPTNode[KT, VT], level: int) -> List[InnerRecord[KT, VT]]:
+        """
+        Splits an overflowing inner node in halves: the middle record's key goes up to the parent and its child
+        becomes the new node's first child. Halves that still overflow are split again.
+        """
+        middle = node.records_count // 2
+        middle_record = node.inner_records[middle]
+
+        new_node = self._create_node(is_leaf=False)
+        new_node.first_node_page = middle_record.next_node_page
+        new_node.first_node = middle_record.next_node
+        new_node.first_node_count = middle_record.next_node_count
+        new_node.inner_records = node.inner_records[middle + 1 :]
+        del node.inner_records[middle:]
+
+        siblings = self._split_overflowing_node(node, level)
+        siblings.append(InnerRecord(middle_record.key, new_node.disk_page, new_node))
+        siblings.extend(self._split_overflowing_node(new_node, level))
+
+        return siblings
+
+    def _create_leaf_record(self, key: KT, value: VT) -> Tuple[LeafRecord[KT, VT], int]:
+        """
+        Creates a leaf record and returns it along with its size on a leaf page. Values bigger than the max value
+        size are stored on overflow pages and the record only holds a reference to them.
+        """
+        key_data = self.key_serializer.to_bytes(key)
+        key_size = len(key_data)
+        value_data = self.value_serializer.to_bytes(value)
+
+        if self.bloom_filter_saved:
+            self._remove_bloom_filter_file()  # it must not outlive the tree file's changes without its new keys
+
+        if self.bloom_filter is not None:
+            self.bloom_filter.add(key_data)
+
+        if self.columnar_leaves:
+            return LeafRecord(key, value), key_size + len(value_data)  # columnar leaves have no slots
+
+        if len(value_data) > self.memory.max_value_size:
+            overflow_value: VT = self._write_overflow_pages(value_data)  # type: ignore
+            return LeafRecord(key, overflow_value), LEAF_RECORD_SLOT_SPACE + key_size + OVERFLOW_VALUE_REFERENCE_SPACE
+
+        return LeafRecord(key, value), LEAF_RECORD_SLOT_SPACE + key_size + len(value_data)
+
+    def _may_contain(self, key: KT) -> bool:
+        """
+        Returns False if the key is certainly not on the B+tree according to its bloom filter (if enabled).
+        """
+        return self.bloom_filter is None or self.bloom_filter.may_contain(self.key_serializer.to_bytes(key))
+
+    @property
+    def _bloom_filter_file_path(self) -> str:
+        return f"{os.fsdecode(self.memory.tree_file_path)}.bloom"
+
+    def _open_bloom_filter(self) -> None:
+        """
+        Loads the bloom filter from its file if it holds all the keys of the tree file (it's removed before the
+        tree file gets new keys and saved again on flushes) or rebuilds it from the keys of the tree otherwise.
+        """
+        self.bloom_filter_saved = os.path.exists(self._bloom_filter_file_path)
+
+        if self.bloom_filter_bits_per_key <= 0:
+            self.bloom_filter = None
+            return
+
+        bloom_filter = BloomFilter.load(self._bloom_filter_file_path) if self.bloom_filter_saved else None
+
+        if bloom_filter is not None and bloom_filter.bits_per_key == self.bloom_filter_bits_per_key:
+            self.bloom_filter = bloom_filter
         else:
-            self._split_inner_child(parent_node, child_node, i)
+            self._rebuild_bloom_filter()
 
-    def _split_inner_child(self, parent_node: BPTNode[KT, VT], child_node: BPTNode[KT, VT], i: int) -> None:
+    def _rebuild_bloom_filter(self) -> None:
         """
-        Splits the i-th full child of the given parent node. Notice that the parent node, as it has a child, is
-        an inner node (non-leaf) but the child itself can either be a leaf or an inner-node.
+        Builds a new bloom filter with all the keys of the tree and room for as many new keys.
         """
-        new_node = self._create_node(is_leaf=False)  # creates a new inner node
-        degree = self.inner_degree
+        bloom_filter = BloomFilter(2 * self.memory.records_count, self.bloom_filter_bits_per_key)
 
-        # copies lower part of the full child node to the new node
-        for j in range(0, degree - 1):
-            record = child_node.inner_records[degree + j]
-            new_node.inner_records.append(InnerRecord(record.key, record.next_node_page, record.next_node))
+        for key in self.keys():
+            bloom_filter.add(self.key_serializer.to_bytes(key))
 
-            # removes copied nodes from child node
-            child_node.leaf_records.pop(degree + j)
+        self.bloom_filter = bloom_filter
 
-        # inserts new key into the non-full inner node parent and make it point to the new node
-        parent_node.inner_records.insert(
-            i, InnerRecord(child_node.inner_records[degree - 1].key, new_node.disk_page, new_node)
-        )
-        child_node.inner_records.pop(degree - 1)  # removes the split key from the child to 'pass' it to the parent
+    def _save_bloom_filter(self) -> None:
+        """
+        Saves the bloom filter to its file unless the file is up to date (or the tree is read-only).
+        """
+        if self.bloom_filter is not None and not self.bloom_filter_saved and not self.memory.read_only:
+            self.bloom_filter.save(self._bloom_filter_file_path)
+            self.bloom_filter_saved = True
 
-        # disk persistance of the split
-        self._disk_write(child_node)
-        self._disk_write(new_node)
-        self._disk_write(parent_node)
+    def _remove_bloom_filter_file(self) -> None:
+        if os.path.exists(self._bloom_filter_file_path):
+            os.remove(self._bloom_filter_file_path)
 
-    def _split_leaf_child(self, parent_node: BPTNode[KT, VT], child_node: BPTNode[KT, VT], i: int) -> None:
+        self.bloom_filter_saved = False
+
+    def _load_value(self, value: Union[VT, OverflowValue], read_page: Optional[Callable[[int], PageData]] = None) -> VT:
         """
-        Splits the i-th full child of the given parent node. Notice that the parent node, as it has a child, is
-        an inner node and never a leaf node.
+        Returns a value of a leaf record reading it from its overflow pages if needed (with the given page reader
+        or with the memory's one).
         """
-        new_node = self._create_node(is_leaf=True)
-        degree = self.leaf_degree
+        if isinstance(value, OverflowValue):
+            return self._read_overflow_pages(value, read_page if read_page is not None else self.memory.read_page)
 
-        # copies lower part of the full child node to the new node
-        for j in range(0, degree - 1):
-            record = child_node.leaf_records[degree + j]
-            new_node.leaf_records.append(LeafRecord(record.key, record.value))
+        return value
 
-            # removes copied nodes from child node
-            child_node.leaf_records.pop(degree + j)
+    def _free_value(self, value: Union[VT, OverflowValue]) -> None:
+        """
+        Releases the overflow pages of a value of a leaf record that is removed (if any).
+        """
+        if isinstance(value, OverflowValue):
+            self._free_overflow_pages(value)
 
-        # inserts new key into the non-full inner node parent and make it point to the new node
-        parent_node.inner_records.insert(
-            i, InnerRecord(child_node.leaf_records[degree - 1].key, new_node.disk_page, new_node)
-        )
+    def _write_overflow_pages(self, value_data: bytes) -> OverflowValue:
+        """
+        Writes a serialized value to a new chain of overflow pages.
+        """
+        page_size = self.memory.page_size
+        page_capacity = page_size - OVERFLOW_PAGE_HEADERS_SPACE
+        pages = [self.memory.allocate_page() for _ in range(0, len(value_data), page_capacity)]
+
+        for i, page in enumerate(pages):
+            next_page = pages[i + 1] if i + 1 < len(pages) else 0
+
+            page_data = bytes()
+            page_data += OVERFLOW_PAGE_TYPE.to_bytes(NODE_TYPE_BYTE_SPACE, self.endianness)
+            page_data += next_page.to_bytes(NODE_POINTER_BYTE_SPACE, self.endianness)
+            page_data += value_data[i * page_capacity : (i + 1) * page_capacity]
+
+            self.memory.write_page(page, page_data + bytes(page_size - len(page_data)))
+
+        return OverflowValue(pages[0], len(value_data))
+
+    def _read_overflow_pages(self, overflow_value: OverflowValue, read_page: Callable[[int], PageData]) -> VT:
+        """
+        Reads and deserializes a value from its chain of overflow pages.
+        """
+        value_data = bytes()
+        page = overflow_value.first_page
+
+        while len(value_data) < overflow_value.size:
+            page_data = read_page(page)
+            value_data += bytes(page_data[OVERFLOW_PAGE_HEADERS_SPACE:])
+            page = int.from_bytes(page_data[NODE_TYPE_BYTE_SPACE:OVERFLOW_PAGE_HEADERS_SPACE], self.endianness)
+
+        return self.value_serializer.from_bytes(value_data[: overflow_value.size])
+
+    def _free_overflow_pages(self, overflow_value: OverflowValue) -> None:
+        """
+        Releases a chain of overflow pages to the free list of pages.
+        """
+        page = overflow_value.first_page
+
+        while page != 0:
+            page_data = self.memory.read_page(page)
+            next_page = int.from_bytes(page_data[NODE_TYPE_BYTE_SPACE:OVERFLOW_PAGE_HEADERS_SPACE], self.endianness)
+
+            self.memory.free_page(page)
+            page = next_page
+
+    def _separator(self, left_key: KT, right_key: KT) -> KT:  # pylint: disable=no-self-use
+        """
+        Returns the shortest key to separate two adjacent subtrees: a key that is not smaller than the biggest
+        key of the left subtree and smaller than the smallest key of the right subtree (suffix truncation). Only
+        str and bytes keys are truncated, other keys are used as they are.
+        """
+        if not isinstance(left_key, (str, bytes)) or type(left_key) is not type(right_key):
+            return left_key
+
+        # both keys are either str or bytes here, but mypy can't narrow KT to them
+        return cast(KT, self._shortest_separator(cast(Any, left_key), cast(Any, right_key)))
 
-        # disk persistance of the split
+    @staticmethod
+    def _shortest_separator(left_key: AnyStr, right_key: AnyStr) -> AnyStr:
+        """
+        Truncates two str (or bytes) keys into their shortest separator.
+        """
+        i = 0
+
+        while i < len(left_key) and i < len(right_key) and left_key[i] == right_key[i]:
+            i += 1
+
+        # left key is a prefix of the right key (or they're equal), so it's already the shortest separator
+        if i == len(left_key) or i == len(right_key):
+            return left_key
+
+        # the right key's prefix up to the first different character is bigger than the left key
+        if i + 1 < len(right_key):
+            return right_key[: i + 1]
+
+        # otherwise, the left key's prefix up to a character that can be incremented is used
+        for j in range(i, len(left_key)):
+            new_character: Optional[AnyStr]
+
+            if isinstance(left_key, bytes):
+                new_character = bytes([left_key[j] + 1]) if left_key[j] < 0xFF else None
+            else:
+                new_character = chr(ord(left_key[j]) + 1) if left_key[j] < chr(0xD7FF) else None
+
+            # the first different character must remain smaller than the right key's
+            if new_character is not None and (j > i or new_character < right_key[i : i + 1]):
+                return left_key[:j] + new_character
+
+        return left_key
+
+    def _delete(self, node: BPTNode[KT, VT], key: KT, level: int) -> Optional[List[InnerRecord[KT, VT]]]:
+        """
+        Deletes a key from the subtree of the given node (of the given level, 0 for leaves) and fixes the children
+        that underflow on the way back. Returns None if the key is not found or, otherwise, the inner records of the
+        node's new right siblings as rebalancing may move a longer separator into an inner node which must then be
+        split.
+        """
+        if node.is_leaf:
+            i = node.find_record(key)
+
+            if i is None:
+                return None
+
+            self._free_value(node.leaf_records.pop(i).value)
+            self._disk_write(node)
+            self.memory.records_count -= 1
+
+            return []
+
+        i = node.child_index(key)
+
+        while True:
+            child_node = self._disk_read(node.child_page(i))
+            node.set_child_node(i, child_node)
+            child_siblings = self._delete(child_node, key, level - 1)
+
+            if child_siblings is not None:
+                break
+
+            # duplicates of a separator's key may continue on the next child after they are deleted from this one
+            if i == node.records_count or node.key_at(i) != key:
+                return None
+
+            i += 1
+
+        self._count_children(node, (i, child_node))
+        self._count_siblings(child_siblings)
+
+        if child_siblings:
+            node.inner_records[i:i] = child_siblings
+        elif self._is_underflow(child_node):
+            self._rebalance_child(node, child_node, i)
+        elif not node.has_subtree_counts:
+            return []
+
+        return self._split_overflowing_node(node, level)
+
+    def _is_underflow(self, node: BPTNode[KT, VT]) -> bool:
+        """
+        Checks if the given (non-root) node has less than the minimum amount of keys: (t - 1) keys.
+        """
+        degree = self.leaf_degree if node.is_leaf else self.inner_degree
+
+        return node.records_count < degree - 1
+
+    def _rebalance_child(self, parent_node: BPTNode[KT, VT], child_node: BPTNode[KT, VT], i: int) -> None:
+        """
+        Fixes the i-th child of the parent node which underflowed: a record is borrowed from a sibling that
+        can spare one or, otherwise, the child is merged with one of its siblings. The parent node is written
+        by the caller as it may no longer fit its page if it gets a longer separator.
+        """
+        left_node = None
+        right_node = None
+
+        if i > 0:
+            left_node = self._disk_read(parent_node.child_page(i - 1))
+            parent_node.set_child_node(i - 1, left_node)
+
+            if not self._is_underflow_without_one_record(left_node):
+                self._borrow_from_left(parent_node, left_node, child_node, i)
+                return
+
+        if i < parent_node.records_count:
+            right_node = self._disk_read(parent_node.child_page(i + 1))
+            parent_node.set_child_node(i + 1, right_node)
+
+            if not self._is_underflow_without_one_record(right_node):
+                self._borrow_from_right(parent_node, child_node, right_node, i)
+                return
+
+        if left_node is not None:
+            self._merge_children(parent_node, left_node, child_node, i - 1)
+        elif right_node is not None:
+            self._merge_children(parent_node, child_node, right_node, i)
+
+    def _is_underflow_without_one_record(self, node: BPTNode[KT, VT]) -> bool:
+        """
+        Checks if the given node would underflow if it lent one of its records to a sibling.
+        """
+        degree = self.leaf_degree if node.is_leaf else self.inner_degree
+
+        return node.records_count - 1 < degree - 1
+
+    def _borrow_from_left(
+        self, parent_node: BPTNode[KT, VT], left_node: BPTNode[KT, VT], child_node: BPTNode[KT, VT], i: int
+    ) -> None:
+        """
+        Moves the last record of the left sibling to the beginning of the i-th child and updates their separator.
+        """
+        separator = parent_node.inner_records[i - 1]
+
+        if child_node.is_leaf:
+            child_node.leaf_records.insert(0, left_node.leaf_records.pop())
+            separator.key = self._separator(left_node.leaf_records[-1].key, child_node.leaf_records[0].key)
+        else:
+            # the separator goes down to the child and the left node's last key goes up to the parent
+            last_record = left_node.inner_records.pop()
+            child_node.inner_records.insert(
+                0,
+                InnerRecord(
+                    separator.key, child_node.first_node_page, child_node.first_node, child_node.first_node_count
+                ),
+            )
+            child_node.first_node_page = last_record.next_node_page
+            child_node.first_node = last_record.next_node
+            child_node.first_node_count = last_record.next_node_count
+            separator.key = last_record.key
+
+        self._count_children(parent_node, (i - 1, left_node), (i, child_node))
+        self._disk_write(left_node)
         self._disk_write(child_node)
-        self._disk_write(new_node)
-        self._disk_write(parent_node)
+
+    def _borrow_from_right(
+        self, parent_node: BPTNode[KT, VT], child_node: BPTNode[KT, VT], right_node: BPTNode[KT, VT], i: int
+    ) -> None:
+        """
+        Moves the first record of the right sibling to the end of the i-th child and updates their separator.
+        """
+        separator = parent_node.inner_records[i]
+
+        if child_node.is_leaf:
+            child_node.leaf_records.append(right_node.leaf_records.pop(0))
+            separator.key = self._separator(child_node.leaf_records[-1].key, right_node.leaf_records[0].key)
+        else:
+            # the separator goes down to the child and the right node's first key goes up to the parent
+            first_record = right_node.inner_records.pop(0)
+            child_node.inner_records.append(
+                InnerRecord(
+                    separator.key, right_node.first_node_page, right_node.first_node, right_node.first_node_count
+                )
+            )
+            right_node.first_node_page = first_record.next_node_page
+            right_node.first_node = first_record.next_node
+            right_node.first_node_count = first_record.next_node_count
+            separator.key = first_record.key
+
+        self._count_children(parent_node, (i, child_node), (i + 1, right_node))
+        self._disk_write(right_node)
+        self._disk_write(child_node)
+
+    def _merge_children(
+        self, parent_node: BPTNode[KT, VT], left_node: BPTNode[KT, VT], right_node: BPTNode[KT, VT], i: int
+    ) -> None:
+        """
+        Merges the right node into the left node, which are the i-th and (i + 1)-th children of the parent node,
+        removes their separator from the parent and releases the right node's page.
+        """
+        separator = parent_node.inner_records.pop(i)
+
+        if left_node.is_leaf:
+            left_node.leaf_records.extend(right_node.leaf_records)
+            left_node.next_leaf_page = right_node.next_leaf_page
+
+            if left_node.next_leaf_page != 0:
+                self._write_prev_leaf_page(left_node.next_leaf_page, left_node.disk_page)
+        else:
+            # the separator goes down as the key of the right node's first child
+            left_node.inner_records.append(
+                InnerRecord(
+                    separator.key, right_node.first_node_page, right_node.first_node, right_node.first_node_count
+                )
+            )
+            left_node.inner_records.extend(right_node.inner_records)
+
+        self._count_children(parent_node, (i, left_node))
+        self.memory.free_page(right_node.disk_page)
+        self._disk_write(left_node)
+
+    def _count_children(self, parent_node: BPTNode[KT, VT], *children: Tuple[int, BPTNode[KT, VT]]) -> None:
+        """
+        Updates the subtree counts that a counted inner node keeps for the given (index, node) children.
+        """
+        if parent_node.has_subtree_counts:
+            for i, child_node in children:
+                parent_node.set_child_count(i, child_node.subtree_records_count)
+
+    def _count_siblings(self, siblings: List[InnerRecord[KT, VT]]) -> None:
+        """
+        Sets the subtree counts of the inner records of the new right siblings of a split node (if they're kept).
+        """
+        if self.order_statistics:
+            for sibling in siblings:
+                sibling.next_node_count = sibling.next_node.subtree_records_count  # type: ignore
 
     def _compute_inner_degree(self) -> int:
         """
@@ -270,19 +1496,33 @@ class BPlusTree(Generic[KT, VT]):
         Minimum allowed keys for any node: (t - 1) keys and t children
 
         2*t - 1 == "max keys in node on a single page" -> 2*t - 1 == free_page_size / each_record_size and solve for t
+
+        As inner nodes' keys are prefix compressed and truncated, the degree is computed for the worst case of
+        uncompressed keys of the max key size: inner nodes usually fit many more keys than (2*t - 1) and are only
+        split when their keys don't fit a page anymore.
         """
+        if self.memory.page_size > MAX_PAGE_SIZE:
+            raise ValueError(f"Page size must not exceed {MAX_PAGE_SIZE} bytes!")
+
         page_headers_size = INNER_NODE_HEADERS_SPACE
-        each_record_size = NODE_POINTER_BYTE_SPACE + self.memory.max_key_size
+        each_record_size = INNER_RECORD_SLOT_SPACE + self.memory.max_key_size
+
+        if self.memory.order_statistics:
+            # counted inner nodes also keep the subtree count of each child (including the first one)
+            page_headers_size += SUBTREE_COUNT_BYTE_SPACE
+            each_record_size += SUBTREE_COUNT_BYTE_SPACE
+
         free_page_size = self.memory.page_size - page_headers_size
-        degree = int((free_page_size / each_record_size + 1) / 2)  # max amount of keys in inner nodes
+        max_records_count = free_page_size // each_record_size
 
-        if degree <= 0:
+        # a split inner node must leave at least one key on each half
+        if max_records_count < 2:
             raise ValueError(
-                "Impossible disk page memory layout for inner nodes: B+tree's degree <= 0! Please, "
+                "Impossible disk page memory layout for inner nodes: less than two keys fit a page! Please, "
                 "increase the page size or reduce the max key value size."
             )
 
-        return degree
+        return (max_records_count + 1) // 2
 
     def _compute_leaf_degree(self) -> int:
         """
@@ -291,13 +1531,14 @@ class BPlusTree(Generic[KT, VT]):
         code and, as such, has a different degree.
         """
         page_headers_size = LEAF_NODES_HEADERS_SPACE
-        each_record_size = self.memory.max_key_size + self.memory.max_value_size
+        each_record_size = LEAF_RECORD_SLOT_SPACE + self.memory.max_key_size
+        each_record_size += max(self.memory.max_value_size, OVERFLOW_VALUE_REFERENCE_SPACE)
         free_page_size = self.memory.page_size - page_headers_size
         degree = int((free_page_size / each_record_size + 1) / 2)
 
-        if degree <= 0:
+        if degree < 2:
             raise ValueError(
-                "Impossible disk page memory layout for leaf nodes: B+tree's degree <= 0! Please, "
+                "Impossible disk page memory layout for leaf nodes: B+tree's degree < 2! Please, "
                 "increase the page size or reduce the max key value size."
             )
 
@@ -310,20 +1551,10 @@ class BPlusTree(Generic[KT, VT]):
         """
         new_page_number = self.memory.allocate_page()
         new_empty_node: BPTNode[KT, VT] = BPTNode(is_leaf, new_page_number, self.key_serializer, self.value_serializer)
+        new_empty_node.has_subtree_counts = self.order_statistics and not is_leaf
 
         return new_empty_node
 
-    def _swap_pages(self, node_1: BPTNode[KT, VT], node_2: BPTNode[KT, VT]) -> None:
-        """
-        Swaps disk pages between two nodes. Notice that this mutates the two node's disk_page property.
-        """
-        disk_page_1 = node_1.disk_page
-        node_1.disk_page = node_2.disk_page
-        node_2.disk_page = disk_page_1
-
-        self._disk_write(node_1)
-        self._disk_write(node_2)
-
     def _create_root(self) -> BPTNode[KT, VT]:
         """
         Creates a new root for the B+tree (when the B+tree's file is new).
@@ -333,10 +1564,17 @@ class BPlusTree(Generic[KT, VT]):
         root = BPTNode(True, page_number, self.key_serializer, self.value_serializer)
         self._disk_write(root)
 
+        self.memory.root_page = page_number
+        self.memory.tree_height = 1
+        self.memory.records_count = 0
+
         return root
 
-    def _read_root(self) -> BPTNode[KT, VT]:
+    def _read_root(self, root_page: int) -> BPTNode[KT, VT]:
         """
-        Reads a previous root of the B+tree from it's B+tree file.
+        Reads a root of the B+tree from its B+tree file.
         """
-        return self._disk_read(1)  # root is always stored on page 1 (page 0 for tree metadata)
+        root = self._disk_read(root_page)
+        root.decode()  # the root is searched by every operation
+
+        return root
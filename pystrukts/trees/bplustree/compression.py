@@ -0,0 +1,281 @@
+"""
+Page compression used by the compressed storage backends of the B+tree.
+
+Pages are kept in main memory (and in the write-ahead log) with their fixed size, but each page is compressed on its
+way to the tree file and stored on a variable-size extent of it. An extent map locates the current extent of each
+page and it's stored compressed on the tree file itself, pointed to by the file header:
+
+Compressed tree file memory layout:
+
++-------------------------- file header ---------------------------+------------ ... ------------+
+|  magic  |  codec  | extent_map_offset | extent_map_size |  unused  | extents (pages and the map) |
+| 4 bytes |  1 byte |      8 bytes      |     4 bytes     | 15 bytes |             ...             |
++------------------------------------------------------------------+------------ ... ------------+
+
+Extent map (compressed with the codec of the file), one entry per page:
+
++-------------- extent map entry --------------+
+| page_number |  extent_offset  |  extent_size |
+|   4 bytes   |     8 bytes     |    4 bytes   |
++----------------------------------------------+
+
+where extent_size = size of the compressed page. Extents are allocated in multiples of EXTENT_ALIGNMENT bytes and
+the extents released by rewritten pages are reused by later writes. Extents of the last saved map are never
+overwritten until a new map is saved (shadow paging), so the tree file is always consistent with its saved map.
+"""
+from __future__ import annotations
+
+import bisect
+import lzma
+import struct
+import zlib
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Protocol
+from typing import Tuple
+from typing import Union
+
+from pystrukts._types.basic import Endianness
+from pystrukts.trees.bplustree.settings import MAX_PAGE_SIZE
+
+COMPRESSED_FILE_MAGIC: bytes = b"BPTZ"
+COMPRESSED_FILE_MAGIC_BYTE_SPACE: int = 4
+CODEC_BYTE_SPACE: int = 1
+EXTENT_MAP_OFFSET_BYTE_SPACE: int = 8
+EXTENT_MAP_SIZE_BYTE_SPACE: int = 4
+FILE_HEADER_SPACE: int = 32  # bytes (the first extent starts right after the header)
+
+EXTENT_ALIGNMENT: int = 32  # bytes
+EXTENT_MAP_ENTRY_FORMAT: str = "IQI"  # page_number, extent_offset, extent_size
+
+ZLIB_CODEC: int = 1
+LZMA_CODEC: int = 2
+
+Extent = Tuple[int, int]  # offset and size (bytes) of a compressed page on the tree file
+
+
+class PageCompressor(Protocol):
+    """
+    Compression protocol of the pages of compressed tree files.
+    """
+
+    codec: int  # codec identifier stored on the tree file header
+    name: str
+
+    def compress(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        """Compresses a page."""
+
+    def decompress(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        """Decompresses a page."""
+
+
+class ZlibCompressor(PageCompressor):
+    """
+    Page compressor based on stdlib's zlib (raw deflate streams, so pages carry no zlib headers or checksums).
+    """
+
+    codec = ZLIB_CODEC
+    name = "zlib"
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def compress(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        return zlib.compress(data, self.level, wbits=-zlib.MAX_WBITS)
+
+    def decompress(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        return zlib.decompress(data, wbits=-zlib.MAX_WBITS)
+
+
+class LzmaCompressor(PageCompressor):
+    """
+    Page compressor based on stdlib's lzma (raw LZMA2 streams, so pages carry no xz container headers). It trades
+    slower writes for smaller pages than zlib.
+    """
+
+    codec = LZMA_CODEC
+    name = "lzma"
+
+    def __init__(self, preset: int = 1) -> None:
+        # a dictionary bigger than a page is never used but it's still set up for each page
+        self.filters = [{"id": lzma.FILTER_LZMA2, "preset": preset, "dict_size": MAX_PAGE_SIZE}]
+
+    def compress(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        return lzma.compress(data, format=lzma.FORMAT_RAW, filters=self.filters)
+
+    def decompress(self, data: Union[bytes, bytearray, memoryview]) -> bytes:
+        return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=self.filters)
+
+
+class ExtentMap:
+    """
+    Page number to extent map of a compressed tree file along with its free extents. Free extents are merged with
+    their free neighbors and kept in lists by their capacity (segregated fits): a write takes a free extent of its
+    exact capacity, or splits the smallest bigger one, or it's appended to the end of the file. Free space at the
+    end of the file is cut from it.
+    """
+
+    extents: Dict[int, Extent]  # page number -> current extent of the page
+    saved_extents: Dict[int, Extent]  # extents of the pages as of the last saved map
+    saved_map_extent: Optional[Extent]  # extent of the last saved map
+    free_offsets: Dict[int, int]  # offset -> capacity of each free extent
+    free_ends: Dict[int, int]  # end offset -> offset of each free extent (to merge it with the next freed one)
+    free_extents: Dict[int, List[int]]  # capacity -> offsets of free extents (merged ones are skipped lazily)
+    free_capacities: List[int]  # sorted capacities of free_extents
+    released_extents: List[Extent]  # extents of the saved map that are only free once a new map is saved
+    file_end: int  # offset where new extents are appended
+    is_changed: bool  # whether extents changed since the last saved map
+
+    def __init__(self) -> None:
+        self.extents = dict()
+        self.saved_extents = dict()
+        self.saved_map_extent = None
+        self.free_offsets = dict()
+        self.free_ends = dict()
+        self.free_extents = dict()
+        self.free_capacities = list()
+        self.released_extents = list()
+        self.file_end = FILE_HEADER_SPACE
+        self.is_changed = False
+
+    def assign(self, page_number: int, size: int) -> int:
+        """
+        Assigns a new extent of the given size to a page, releasing its previous extent, and returns its offset.
+        """
+        previous_extent = self.extents.get(page_number)
+
+        if previous_extent is not None:
+            if self.saved_extents.get(page_number) == previous_extent:
+                self.released_extents.append(previous_extent)  # the saved map must stay readable
+            else:
+                self._free(previous_extent[0], extent_capacity(previous_extent[1]))
+
+        offset = self.allocate(size)
+        self.extents[page_number] = (offset, size)
+        self.is_changed = True
+
+        return offset
+
+    def allocate(self, size: int) -> int:
+        """
+        Allocates an extent that fits the given size and returns its offset.
+        """
+        capacity = extent_capacity(size)
+        i = bisect.bisect_left(self.free_capacities, capacity)
+
+        while i < len(self.free_capacities):
+            free_capacity = self.free_capacities[i]
+            offsets = self.free_extents[free_capacity]
+            offset = offsets.pop()
+
+            if not offsets:
+                del self.free_extents[free_capacity]
+                del self.free_capacities[i]
+
+            if self.free_offsets.get(offset) != free_capacity:
+                continue  # the extent was merged into another free extent (or allocated) since it was listed
+
+            del self.free_offsets[offset]
+            del self.free_ends[offset + free_capacity]
+
+            if free_capacity > capacity:
+                self._free(offset + capacity, free_capacity - capacity)  # the rest of the extent stays free
+
+            return offset
+
+        offset = self.file_end
+        self.file_end += capacity
+
+        return offset
+
+    def mark_saved(self, map_extent: Extent) -> None:
+        """
+        Marks the current extents as saved (on the map stored on the given extent), which frees the extents that
+        were only kept for the previously saved map.
+        """
+        if self.saved_map_extent is not None:
+            self.released_extents.append(self.saved_map_extent)
+
+        for offset, size in self.released_extents:
+            self._free(offset, extent_capacity(size))
+
+        self.released_extents = list()
+        self.saved_extents = dict(self.extents)
+        self.saved_map_extent = map_extent
+        self.is_changed = False
+
+    def to_bytes(self, endianness: Endianness) -> bytes:
+        """
+        Serializes the page extents (uncompressed).
+        """
+        entry_struct = _entry_struct(endianness)
+
+        return b"".join(entry_struct.pack(page, offset, size) for page, (offset, size) in self.extents.items())
+
+    @staticmethod
+    def from_bytes(map_data: bytes, map_extent: Optional[Extent], endianness: Endianness) -> ExtentMap:
+        """
+        Deserializes saved page extents (uncompressed) stored on the given extent. The gaps between the used
+        extents become the free extents.
+        """
+        extent_map = ExtentMap()
+
+        for page_number, offset, size in _entry_struct(endianness).iter_unpack(map_data):
+            extent_map.extents[page_number] = (offset, size)
+
+        used_extents = list(extent_map.extents.values())
+
+        if map_extent is not None:
+            used_extents.append(map_extent)
+
+        for offset, size in sorted(used_extents):
+            if offset > extent_map.file_end:
+                extent_map._free(extent_map.file_end, offset - extent_map.file_end)
+
+            extent_map.file_end = max(extent_map.file_end, offset + extent_capacity(size))
+
+        extent_map.saved_extents = dict(extent_map.extents)
+        extent_map.saved_map_extent = map_extent
+
+        return extent_map
+
+    def _free(self, offset: int, capacity: int) -> None:
+        """
+        Frees an extent merging it with its free neighbors.
+        """
+        next_capacity = self.free_offsets.pop(offset + capacity, None)
+
+        if next_capacity is not None:
+            del self.free_ends[offset + capacity + next_capacity]
+            capacity += next_capacity
+
+        previous_offset = self.free_ends.pop(offset, None)
+
+        if previous_offset is not None:
+            capacity += self.free_offsets.pop(previous_offset)
+            offset = previous_offset
+
+        if offset + capacity == self.file_end:
+            self.file_end = offset
+            return
+
+        self.free_offsets[offset] = capacity
+        self.free_ends[offset + capacity] = offset
+
+        if capacity not in self.free_extents:
+            self.free_extents[capacity] = list()
+            bisect.insort(self.free_capacities, capacity)
+
+        self.free_extents[capacity].append(offset)
+
+
+def extent_capacity(size: int) -> int:
+    """
+    Returns the bytes taken on the tree file by an extent of the given size (a multiple of the extent alignment).
+    """
+    return -(-size // EXTENT_ALIGNMENT) * EXTENT_ALIGNMENT
+
+
+def _entry_struct(endianness: Endianness) -> struct.Struct:
+    return struct.Struct(f"{'>' if endianness == 'big' else '<'}{EXTENT_MAP_ENTRY_FORMAT}")
@@ -0,0 +1,222 @@
+"""
+Module with bidirectional cursors over the leaves of the B+tree.
+"""
+# pylint: disable=protected-access
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Generic
+from typing import Optional
+from typing import Union
+
+from pystrukts._types.comparable import KT
+from pystrukts._types.comparable import VT
+from pystrukts.trees.bplustree.latches import NullLatch
+from pystrukts.trees.bplustree.latches import ReadWriteLatch
+from pystrukts.trees.bplustree.latches import read_latched
+from pystrukts.trees.bplustree.node import BPTNodeView
+
+if TYPE_CHECKING:
+    from pystrukts.trees.bplustree.bplustree import BPlusTree
+    from pystrukts.trees.bplustree.bplustree import SearchableNode
+
+
+class Cursor(Generic[KT, VT]):
+    """
+    Position on a record of a B+tree that can be moved to its next and previous records, e.g. to walk backwards from
+    a key or to merge-join two trees. The tree is descended only when the cursor is positioned (seek, first or last)
+    and steps follow the next and previous leaf pointers, so stepping within a leaf reads no pages at all. The
+    current leaf is pinned on the buffer pool (if it's enabled) until the cursor leaves it or is closed.
+
+    Each call holds the tree's latch for reading, but writes made between calls aren't seen by the cursor's current
+    leaf: cursors should be positioned again (e.g. with seek of their current key) after the tree is changed.
+    """
+
+    tree: BPlusTree[KT, VT]
+    latch: Union[ReadWriteLatch, NullLatch]
+    leaf: Optional[BPTNodeView[KT, VT]]
+    leaf_page: int
+    index: int
+    pinned_page: Optional[int]
+
+    def __init__(self, tree: BPlusTree[KT, VT]) -> None:
+        self.tree = tree
+        self.latch = tree.latch
+        self.leaf = None
+        self.leaf_page = 0
+        self.index = 0
+        self.pinned_page = None
+
+    def __enter__(self) -> Cursor[KT, VT]:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        Checks if the cursor is positioned on a record (cursors that move past either end of the tree aren't).
+        """
+        return self.leaf is not None and 0 <= self.index < self.leaf.records_count
+
+    @property
+    @read_latched
+    def key(self) -> KT:
+        """
+        Returns the key of the current record.
+        """
+        self._check_valid()
+
+        return self.leaf.key_at(self.index)  # type: ignore
+
+    @property
+    @read_latched
+    def value(self) -> VT:
+        """
+        Returns the value of the current record (read from its overflow pages if needed).
+        """
+        self._check_valid()
+
+        return self.tree._load_value(self.leaf.value_at(self.index))  # type: ignore
+
+    @read_latched
+    def seek(self, key: KT) -> bool:
+        """
+        Positions the cursor on the first record whose key is not smaller than the given key and returns whether
+        there's such a record.
+        """
+        self._move_to_leaf(self._descend(lambda node: node.child_index(key)))
+        self.index = self.leaf.lower_bound(key)  # type: ignore
+
+        return self._skip_forward()
+
+    @read_latched
+    def first(self) -> bool:
+        """
+        Positions the cursor on the record with the smallest key and returns whether the tree has any records.
+        """
+        self._move_to_leaf(self._descend(lambda node: 0))
+        self.index = 0
+
+        return self._skip_forward()
+
+    @read_latched
+    def last(self) -> bool:
+        """
+        Positions the cursor on the record with the biggest key and returns whether the tree has any records.
+        """
+        self._move_to_leaf(self._descend(lambda node: node.records_count))
+        self.index = self.leaf.records_count - 1  # type: ignore
+
+        return self._skip_backward()
+
+    @read_latched
+    def next(self) -> bool:
+        """
+        Moves the cursor to the next record and returns whether there's one. Cursors that aren't positioned on a
+        record stay that way.
+        """
+        if not self.is_valid:
+            return False
+
+        self.index += 1
+
+        return self._skip_forward()
+
+    @read_latched
+    def prev(self) -> bool:
+        """
+        Moves the cursor to the previous record and returns whether there's one. Cursors that aren't positioned on
+        a record stay that way.
+        """
+        if not self.is_valid:
+            return False
+
+        self.index -= 1
+
+        return self._skip_backward()
+
+    def close(self) -> None:
+        """
+        Unpins the current leaf and invalidates the cursor.
+        """
+        self._unpin()
+        self.leaf = None
+        self.leaf_page = 0
+        self.index = 0
+
+    def _descend(self, choose_child: Callable[[SearchableNode[KT, VT]], int]) -> int:
+        """
+        Descends the tree choosing a child of each inner node with the given function and returns the page of the
+        reached leaf. Inner nodes are read as lazy views (except for the root, which is kept in memory).
+        """
+        node: SearchableNode[KT, VT] = self.tree.root
+
+        if node.is_leaf:
+            return node.disk_page  # type: ignore
+
+        for _ in range(self.tree.height - 2):
+            node = self.tree._disk_read_view(node.child_page(choose_child(node)))
+
+        return node.child_page(choose_child(node))
+
+    def _move_to_leaf(self, leaf_page: int) -> None:
+        """
+        Reads a leaf page (pinning it when the buffer pool is enabled) and unpins the previous one.
+        """
+        memory = self.tree.memory
+
+        if memory.buffer_pool is not None:
+            page_data = memory.pin_page(leaf_page)
+            self._unpin()
+            self.pinned_page = leaf_page
+        else:
+            page_data = memory.read_page(leaf_page)
+
+        self.leaf = self.tree._view_from_page(page_data)
+        self.leaf_page = leaf_page
+
+    def _skip_forward(self) -> bool:
+        """
+        Follows the next leaf pointers while the cursor is past the end of its leaf (empty leaves are skipped).
+        """
+        while self.index >= self.leaf.records_count:  # type: ignore
+            next_leaf_page = self.leaf.next_leaf_page  # type: ignore
+
+            if next_leaf_page == 0:  # page 0 is the metadata page, so it's never a leaf
+                self.index = self.leaf.records_count  # type: ignore
+                return False
+
+            self._move_to_leaf(next_leaf_page)
+            self.index = 0
+
+        return True
+
+    def _skip_backward(self) -> bool:
+        """
+        Follows the previous leaf pointers while the cursor is before the start of its leaf (empty leaves are
+        skipped).
+        """
+        while self.index < 0:
+            prev_leaf_page = self.leaf.prev_leaf_page  # type: ignore
+
+            if prev_leaf_page == 0:
+                self.index = -1
+                return False
+
+            self._move_to_leaf(prev_leaf_page)
+            self.index = self.leaf.records_count - 1  # type: ignore
+
+        return True
+
+    def _unpin(self) -> None:
+        if self.pinned_page is not None:
+            self.tree.memory.unpin_page(self.pinned_page)
+            self.pinned_page = None
+
+    def _check_valid(self) -> None:
+        if not self.is_valid:
+            raise ValueError("The cursor isn't positioned on a record!")
@@ -0,0 +1,23 @@
+"""
+Exceptions raised by the B+tree.
+"""
+
+
+class BufferPoolFull(Exception):
+    """
+    Exception raised when the buffer pool has no free frames and all of its frames are pinned, so
+    no page can be evicted to make room for a new one.
+    """
+
+
+class NodeOverflow(Exception):
+    """
+    Exception raised when the records of a node don't fit a disk page, so the node must be split before it's
+    written to disk.
+    """
+
+
+class ReadOnlyTreeFile(Exception):
+    """
+    Exception raised when a tree file that was opened in read-only mode would be changed.
+    """
@@ -0,0 +1,152 @@
+"""
+Latches used to share a B+tree between threads.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextlib import nullcontext
+from functools import wraps
+from inspect import isgeneratorfunction
+from typing import Any
+from typing import Callable
+from typing import ContextManager
+from typing import Iterator
+from typing import Optional
+from typing import TypeVar
+
+Method = TypeVar("Method", bound=Callable[..., Any])
+
+
+class ReadWriteLatch:
+    """
+    Readers-writer latch: many threads may hold it for reading at the same time while a thread that holds it for
+    writing excludes all other threads. Waiting writers block new readers so that writers don't starve.
+
+    The latch is reentrant: a thread that holds it may acquire it again for reading (or for writing, if it's the
+    writer). Upgrading a read latch to a write latch would deadlock, so it raises a RuntimeError instead.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer: Optional[int] = None  # thread identifier of the writer
+        self._writer_depth = 0
+        self._local = threading.local()  # read depth of each thread
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """
+        Holds the latch for reading while the context is active.
+        """
+        read_depth = getattr(self._local, "read_depth", 0)
+
+        # the writer and the threads that are already readers don't wait (or they could wait for themselves)
+        if self._writer == threading.get_ident() or read_depth > 0:
+            self._local.read_depth = read_depth + 1
+
+            try:
+                yield
+            finally:
+                self._local.read_depth = read_depth
+
+            return
+
+        with self._condition:
+            while self._writer is not None or self._waiting_writers > 0:
+                self._condition.wait()
+
+            self._readers += 1
+
+        self._local.read_depth = 1
+
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+
+            with self._condition:
+                self._readers -= 1
+
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """
+        Holds the latch for writing (exclusively) while the context is active.
+        """
+        thread_id = threading.get_ident()
+
+        with self._condition:
+            if self._writer != thread_id:
+                if getattr(self._local, "read_depth", 0) > 0:
+                    raise RuntimeError("A thread that holds a read latch can't acquire it for writing!")
+
+                self._waiting_writers += 1
+
+                while self._writer is not None or self._readers > 0:
+                    self._condition.wait()
+
+                self._waiting_writers -= 1
+                self._writer = thread_id
+
+            self._writer_depth += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer_depth -= 1
+
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+class NullLatch:
+    """
+    Latch that does nothing. It's used when the B+tree is not shared between threads.
+    """
+
+    _context: ContextManager[None] = nullcontext()
+
+    def reading(self) -> ContextManager[None]:
+        return self._context
+
+    def writing(self) -> ContextManager[None]:
+        return self._context
+
+
+def read_latched(method: Method) -> Method:
+    """
+    Decorates a method so that it runs while its instance's latch is held for reading. Generators hold the latch
+    until they are exhausted (or closed).
+    """
+    return _latched(method, lambda latch: latch.reading())
+
+
+def write_latched(method: Method) -> Method:
+    """
+    Decorates a method so that it runs while its instance's latch is held for writing.
+    """
+    return _latched(method, lambda latch: latch.writing())
+
+
+def _latched(method: Method, acquire: Callable[[Any], ContextManager[None]]) -> Method:
+    if isgeneratorfunction(method):
+
+        @wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            with acquire(self.latch):
+                yield from method(self, *args, **kwargs)
+
+        return generator_wrapper  # type: ignore
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with acquire(self.latch):
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore
@@ -3,19 +3,336 @@ Disk memory-related structures used by the B+tree.
 """
 from __future__ import annotations
 
+import mmap
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
 from pathlib import Path
 from typing import BinaryIO
+from typing import Callable
+from typing import Dict
+from typing import List
 from typing import Optional
+from typing import Protocol
 from typing import Tuple
+from typing import Type
 from typing import Union
 from uuid import uuid4
 
 from pystrukts._types.basic import Endianness
 from pystrukts._types.basic import StrPath
+from pystrukts.trees.bplustree.compression import CODEC_BYTE_SPACE
+from pystrukts.trees.bplustree.compression import COMPRESSED_FILE_MAGIC
+from pystrukts.trees.bplustree.compression import COMPRESSED_FILE_MAGIC_BYTE_SPACE
+from pystrukts.trees.bplustree.compression import EXTENT_MAP_OFFSET_BYTE_SPACE
+from pystrukts.trees.bplustree.compression import EXTENT_MAP_SIZE_BYTE_SPACE
+from pystrukts.trees.bplustree.compression import FILE_HEADER_SPACE
+from pystrukts.trees.bplustree.compression import Extent
+from pystrukts.trees.bplustree.compression import ExtentMap
+from pystrukts.trees.bplustree.compression import LzmaCompressor
+from pystrukts.trees.bplustree.compression import PageCompressor
+from pystrukts.trees.bplustree.compression import ZlibCompressor
+from pystrukts.trees.bplustree.exceptions import BufferPoolFull
+from pystrukts.trees.bplustree.exceptions import ReadOnlyTreeFile
+from pystrukts.trees.bplustree.metrics import TreeMetrics
+from pystrukts.trees.bplustree.settings import FORMAT_VERSION_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import FREE_LIST_HEAD_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import FREE_PAGE_TYPE
 from pystrukts.trees.bplustree.settings import MAX_KEY_SIZE_BYTE_SPACE
 from pystrukts.trees.bplustree.settings import MAX_VALUE_SIZE_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import NODE_POINTER_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import NODE_TYPE_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import ORDER_STATISTICS_FLAG
 from pystrukts.trees.bplustree.settings import PAGE_SIZE_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import TREE_FLAGS_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import TREE_FORMAT_VERSION
+from pystrukts.trees.bplustree.settings import TREE_HEIGHT_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import TREE_RECORDS_COUNT_BYTE_SPACE
+from pystrukts.trees.bplustree.wal import WriteAheadLog
+from pystrukts.trees.bplustree.wal import replay_log
+
+PageData = Union[bytes, bytearray, memoryview]
+
+# positional I/O doesn't move the file's cursor, so threads can read pages at the same time (not on all platforms)
+POSITIONAL_IO = hasattr(os, "pread") and hasattr(os, "pwrite")
+
+# before-images that each snapshot keeps in main memory (the others are spilled to a temporary file)
+DEFAULT_MAX_PRESERVED_PAGES: int = 1024
+
+
+class EvictionPolicy(Protocol):
+    """
+    Page replacement protocol used by the buffer pool to choose which page frame should be evicted.
+    """
+
+    def record_access(self, page_number: int) -> None:
+        """Registers that a page has been loaded into (or accessed on) the buffer pool."""
+
+    def remove(self, page_number: int) -> None:
+        """Stops tracking a page that has left the buffer pool."""
+
+    def choose_victim(self, is_evictable: Callable[[int], bool]) -> Optional[int]:
+        """Chooses an evictable page to be evicted or returns None if no page can be evicted."""
+
+
+class LRUEvictionPolicy(EvictionPolicy):
+    """
+    Least recently used eviction policy: evicts the evictable page that has not been accessed for the
+    longest time. Pages are kept on an ordered dict whose first entry is the least recently used one.
+    """
+
+    pages: OrderedDict[int, None]
+
+    def __init__(self) -> None:
+        self.pages = OrderedDict()
+
+    def record_access(self, page_number: int) -> None:
+        self.pages[page_number] = None
+        self.pages.move_to_end(page_number)
+
+    def remove(self, page_number: int) -> None:
+        self.pages.pop(page_number, None)
+
+    def choose_victim(self, is_evictable: Callable[[int], bool]) -> Optional[int]:
+        for page_number in self.pages:  # from the least to the most recently used page
+            if is_evictable(page_number):
+                return page_number
+
+        return None
+
+
+class ClockEvictionPolicy(EvictionPolicy):
+    """
+    CLOCK (second chance) eviction policy: pages sit on a circular array of slots with a reference bit which
+    is set on every access. The clock hand sweeps the slots clearing reference bits and evicts the first evictable
+    page whose bit is already cleared. It approximates LRU without reordering anything on page accesses.
+    """
+
+    slots: List[Optional[int]]
+    slot_of_page: Dict[int, int]
+    reference_bits: Dict[int, bool]
+    free_slots: List[int]
+    hand: int
+
+    def __init__(self) -> None:
+        self.slots = []
+        self.slot_of_page = dict()
+        self.reference_bits = dict()
+        self.free_slots = []
+        self.hand = 0
+
+    def record_access(self, page_number: int) -> None:
+        if page_number not in self.slot_of_page:
+            if self.free_slots:
+                slot = self.free_slots.pop()
+                self.slots[slot] = page_number
+            else:
+                slot = len(self.slots)
+                self.slots.append(page_number)
+
+            self.slot_of_page[page_number] = slot
+
+        self.reference_bits[page_number] = True
+
+    def remove(self, page_number: int) -> None:
+        slot = self.slot_of_page.pop(page_number, None)
+
+        if slot is not None:
+            self.slots[slot] = None
+            self.free_slots.append(slot)
+            self.reference_bits.pop(page_number)
+
+    def choose_victim(self, is_evictable: Callable[[int], bool]) -> Optional[int]:
+        # two full sweeps: the first one may only clear reference bits
+        for _ in range(0, 2 * len(self.slots)):
+            page_number = self.slots[self.hand]
+            self.hand = (self.hand + 1) % len(self.slots)
+
+            if page_number is None or not is_evictable(page_number):
+                continue
+
+            if self.reference_bits[page_number]:
+                self.reference_bits[page_number] = False  # second chance
+                continue
+
+            return page_number
+
+        return None
+
+
+@dataclass
+class BufferFrame:
+    """
+    A page held in main memory by the buffer pool.
+    """
+
+    page_number: int
+    data: bytes
+    pin_count: int = 0
+    is_dirty: bool = False
+
+
+@dataclass
+class PageSnapshot:
+    """
+    Consistent image of the pages of a memory at a point in time along with the tree metadata of that time. Pages
+    that are overwritten (or freed) after the snapshot is taken have their before-images preserved in it: up to
+    max_preserved_pages of them are kept in main memory and the others are spilled to a temporary file.
+    """
+
+    root_page: int
+    tree_height: int
+    records_count: int
+    last_used_page: int  # pages allocated after the snapshot was taken are never read by it
+    max_preserved_pages: int = DEFAULT_MAX_PRESERVED_PAGES
+    preserved_pages: Dict[int, bytes] = field(default_factory=dict)
+    spilled_pages: Dict[int, int] = field(default_factory=dict)  # offsets of before-images on the spill file
+
+
+class BufferPool:
+    """
+    Fixed-budget cache of disk pages held in main memory. Frames can be pinned, which forbids their
+    eviction, and dirty frames are written back with the given flush function before they are evicted.
+    """
+
+    frames: Dict[int, BufferFrame]
+    capacity: int  # max amount of frames that fit the memory budget
+    eviction_policy: EvictionPolicy
+    flush_function: Callable[[int, bytes], None]
+
+    # statistics
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        memory_budget: int,
+        page_size: int,
+        flush_function: Callable[[int, bytes], None],
+        eviction_policy: Optional[EvictionPolicy] = None,
+    ) -> None:
+        self.capacity = memory_budget // page_size
+
+        if self.capacity <= 0:
+            raise ValueError(
+                f"Buffer pool memory budget of {memory_budget} bytes can't hold a single page of {page_size} bytes!"
+            )
+
+        self.frames = dict()
+        self.eviction_policy = eviction_policy if eviction_policy is not None else LRUEvictionPolicy()
+        self.flush_function = flush_function
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __contains__(self, page_number: int) -> bool:
+        return page_number in self.frames
+
+    def get_page(self, page_number: int) -> Optional[bytes]:
+        """
+        Returns the page data if it is held by the pool or None otherwise.
+        """
+        frame = self.frames.get(page_number)
+
+        if frame is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.eviction_policy.record_access(page_number)
+
+        return frame.data
+
+    def put_page(self, page_number: int, data: bytes, is_dirty: bool = False) -> None:
+        """
+        Stores (or replaces) a page on the pool evicting another page if the pool is full. A replaced
+        frame keeps its pins and its data is considered dirty only if the new data is dirty.
+        """
+        frame = self.frames.get(page_number)
+
+        if frame is None:
+            if len(self.frames) >= self.capacity:
+                self._evict()
+
+            frame = BufferFrame(page_number, data)
+            self.frames[page_number] = frame
+
+        frame.data = data
+        frame.is_dirty = is_dirty
+        self.eviction_policy.record_access(page_number)
+
+    def pin_page(self, page_number: int) -> None:
+        """
+        Pins a page held by the pool so that it can't be evicted until it is unpinned.
+        """
+        self.frames[page_number].pin_count += 1
+
+    def unpin_page(self, page_number: int, is_dirty: bool = False) -> None:
+        """
+        Releases a pin of a page and marks it as dirty if requested.
+        """
+        frame = self.frames[page_number]
+
+        if frame.pin_count <= 0:
+            raise ValueError(f"Page {page_number} is not pinned!")
+
+        frame.pin_count -= 1
+        frame.is_dirty = frame.is_dirty or is_dirty
+
+    def discard_page(self, page_number: int) -> None:
+        """
+        Drops a page from the pool without writing it back to disk.
+        """
+        if self.frames.pop(page_number, None) is not None:
+            self.eviction_policy.remove(page_number)
+
+    def discard_all_pages(self) -> None:
+        """
+        Drops all pages from the pool without writing them back to disk.
+        """
+        for page_number in list(self.frames):
+            self.discard_page(page_number)
+
+    def discard_dirty_pages(self) -> None:
+        """
+        Drops all dirty pages from the pool without writing them back to disk.
+        """
+        for page_number in [page_number for page_number, frame in self.frames.items() if frame.is_dirty]:
+            self.discard_page(page_number)
+
+    def flush_page(self, page_number: int) -> None:
+        """
+        Writes a dirty page back to disk and marks it as clean.
+        """
+        frame = self.frames.get(page_number)
+
+        if frame is not None and frame.is_dirty:
+            self.flush_function(page_number, frame.data)
+            frame.is_dirty = False
+
+    def flush_all(self) -> None:
+        """
+        Writes all dirty pages back to disk in page order so that the writes are as sequential as possible.
+        """
+        for page_number in sorted(self.frames):
+            self.flush_page(page_number)
+
+    def _evict(self) -> None:
+        """
+        Evicts a page chosen by the eviction policy among the unpinned ones writing it back if it's dirty.
+        """
+        victim = self.eviction_policy.choose_victim(lambda page_number: self.frames[page_number].pin_count == 0)
+
+        if victim is None:
+            raise BufferPoolFull(f"All {self.capacity} buffer pool frames are pinned!")
+
+        self.flush_page(victim)
+        self.discard_page(victim)
 
 
 class PagedFileMemory:
@@ -34,8 +351,44 @@ class PagedFileMemory:
     max_key_size: int
     max_value_size: int
     last_used_page: int = -1  # first metadata writing increments to 0
+    free_list_head: int = 0  # page 0 is the metadata page, so it's never free
+    order_statistics: bool = False  # inner nodes keep the records counts of their children's subtrees
     endianness: Endianness
 
+    # tree metadata (kept by the tree and persisted along with the page metadata)
+    root_page: int = 0
+    tree_height: int = 0
+    records_count: int = 0
+    persisted_metadata: Tuple[int, ...] = ()  # metadata as it was last written to the metadata page
+
+    # main memory cache of pages (None if disabled) and its lock as concurrent readers may change it
+    buffer_pool: Optional[BufferPool] = None
+    buffer_pool_lock: threading.Lock
+
+    # file cursor lock for platforms without positional I/O
+    tree_file_lock: threading.Lock
+
+    # write-ahead log of page writes (None if disabled)
+    wal: Optional[WriteAheadLog] = None
+
+    # read-only mode: pages are never written and the committed pages of the writer's log are read from it
+    read_only: bool = False
+    logged_pages: Dict[int, bytes]
+
+    # deferred writes: dirty pages are written on flushes (or evictions) instead of on every page write
+    write_back: bool = False
+    dirty_pages: Dict[int, bytes]  # dirty pages that are not held by the buffer pool
+    transaction_depth: int = 0
+    transaction_state: Tuple[int, ...]  # metadata when the transaction began
+
+    # open snapshots and the lock that makes page writes atomic for their readers
+    snapshots: List[PageSnapshot]
+    snapshot_lock: threading.Lock
+    snapshot_spill_file: Optional[BinaryIO] = None  # before-images that don't fit the snapshots' main memory
+
+    # opt-in counters and latency histograms (None if disabled)
+    metrics: Optional[TreeMetrics] = None
+
     def __init__(
         self,
         page_size: int = 4096,
@@ -43,57 +396,155 @@ class PagedFileMemory:
         max_value_size: int = 32,
         endianness: Endianness = "big",
         tree_file: Optional[StrPath] = None,
+        buffer_pool_size: int = 0,
+        eviction_policy: Optional[EvictionPolicy] = None,
+        wal: bool = False,
+        wal_group_commit_size: int = 1,
+        wal_group_commit_interval: Optional[float] = None,
+        write_back: bool = False,
+        read_only: bool = False,
+        metrics: Optional[TreeMetrics] = None,
+        order_statistics: bool = False,
     ) -> None:
+        self.read_only = read_only
+        self.metrics = metrics
+
+        if metrics is not None:
+            # only the instances with metrics pay for timing their page reads and writes
+            self.read_page = metrics.instrument("read_page", self.read_page)  # type: ignore
+            self.write_page = metrics.instrument("write_page", self.write_page)  # type: ignore
+
+        self.logged_pages = dict()
+        self.buffer_pool_lock = threading.Lock()
+        self.tree_file_lock = threading.Lock()
+        self.endianness = endianness
         self.tree_file, self.is_new_file = self._open_tree_file(tree_file)
         self.tree_file_path = self.tree_file.name
-        self.endianness = endianness
+        self.dirty_pages = dict()
+        self.snapshots = list()
+        self.snapshot_lock = threading.Lock()
+
+        # committed operations of a previous log must reach the tree file before its metadata is read (read-only
+        # memories can't write them, so they keep them in main memory instead)
+        wal_file_path = f"{os.fsdecode(self.tree_file_path)}.wal"
+
+        if read_only:
+            self._read_log_pages()
+
+            if self._is_empty_tree_file() and 0 not in self.logged_pages:
+                raise ValueError(f"Tree file {self.tree_file_path} has no tree to be read!")
+        elif wal and os.path.exists(wal_file_path):
+            replay_log(wal_file_path, self._write_to_disk_page, self.endianness)
+            self._sync_to_disk()
+            self.is_new_file = self._is_empty_tree_file()
+
+        if wal and not read_only:
+            self.wal = WriteAheadLog(
+                wal_file_path, page_size, endianness, wal_group_commit_size, wal_group_commit_interval
+            )
 
         if self.is_new_file:
             self.page_size = page_size
             self.max_key_size = max_key_size
             self.max_value_size = max_value_size
+            self.order_statistics = order_statistics
             self._write_page_metadata_to_disk()
         else:
             self._read_page_metadata_from_disk()
 
+        # page size is only known after reading the metadata of existing files
+        if self.wal is not None:
+            self.wal.page_size = self.page_size
+
+        if buffer_pool_size > 0:
+            self.buffer_pool = BufferPool(buffer_pool_size, self.page_size, self._write_back_page, eviction_policy)
+
+        # settings are always persisted right away
+        self.write_back = write_back
+
     def allocate_page(self) -> int:
         """
-        Allocates a new page on disk and returns the page number reference.
+        Allocates a new page on disk and returns the page number reference. Free pages are reused
+        before the file is grown with a new page.
         """
         empty_page = bytes(self.page_size)
+
+        if self.free_list_head != 0:
+            page_number = self.free_list_head
+            free_page = self.read_page(page_number)
+
+            start = NODE_TYPE_BYTE_SPACE
+            end = start + NODE_POINTER_BYTE_SPACE
+            self.free_list_head = int.from_bytes(free_page[start:end], self.endianness)
+            self.write_page(page_number, empty_page)
+
+            return page_number
+
         self.last_used_page += 1
         self.write_page(self.last_used_page, empty_page)
 
         return self.last_used_page
 
-    def read_page(self, page_number: int, page_size: Optional[int] = None) -> bytearray:
+    def free_page(self, page_number: int) -> None:
         """
-        Reads a disk page from the tree file.
+        Releases a page that is no longer used by pushing it on the free list of pages.
         """
-        page_size = page_size if page_size is not None else self.page_size
+        if page_number <= 0 or page_number > self.last_used_page:
+            raise ValueError(f"Page {page_number} is not an allocated page and can't be freed!")
 
-        page_start = page_number * page_size
-        page_end = page_start + page_size
-        data = bytearray()
+        page_data = bytes()
+        page_data += FREE_PAGE_TYPE.to_bytes(NODE_TYPE_BYTE_SPACE, self.endianness)
+        page_data += self.free_list_head.to_bytes(NODE_POINTER_BYTE_SPACE, self.endianness)
+        page_data += bytes(self.page_size - len(page_data))  # padding
+
+        self.write_page(page_number, page_data)
+        self.free_list_head = page_number
+
+    def read_page(self, page_number: int, page_size: Optional[int] = None) -> PageData:
+        """
+        Reads a disk page from the tree file. If the buffer pool is enabled, the page is served from main memory
+        whenever possible. Pages can be read by many threads at the same time.
+        """
+        if page_size is not None and page_size != self.page_size:
+            return self._read_from_disk(page_number, page_size)
+
+        if self.buffer_pool is None and page_number in self.dirty_pages:
+            return self.dirty_pages[page_number]
+
+        if self.buffer_pool is None:
+            return self._read_from_log_or_disk(page_number)
+
+        with self.buffer_pool_lock:
+            data = self.buffer_pool.get_page(page_number)
 
-        # sets file's stream cursor at the beginning of the page
-        page_cursor = self.tree_file.seek(page_start)
+            if data is None and page_number in self.dirty_pages:
+                # dirty pages that were evicted during a transaction go back to the pool
+                data = self.dirty_pages.pop(page_number)
+                self.buffer_pool.put_page(page_number, data, is_dirty=True)
 
-        # read() may return less bytes than expected, so we iterate until
-        # the cursor position is at the end of the page
-        while page_cursor != page_end:
-            data += self.tree_file.read(page_end - page_cursor)  # reading moves cursor forward
-            page_cursor = self.tree_file.tell()
+        if self.metrics is not None:
+            self.metrics.count("cache_hits" if data is not None else "cache_misses")
+
+        if data is None:
+            # the pool isn't locked during disk reads, so misses of different threads don't wait for each other
+            data = bytes(self._read_from_log_or_disk(page_number))
+
+            with self.buffer_pool_lock:
+                self.buffer_pool.put_page(page_number, data)
 
         return data
 
     def write_page(self, page: int, data: Union[bytes, bytearray], page_size: Optional[int] = None) -> None:
         """
-        Writes a full disk block to the tree file.
+        Writes a full disk block to the tree file. If the buffer pool is enabled, its page is also updated. If the
+        write-ahead log is enabled, the page is logged instead and it only reaches the tree file on checkpoints.
+        If writes are deferred (write-back mode or transactions), the page is only marked as dirty.
         """
         page_size = page_size if page_size is not None else self.page_size
         stream_bytes = len(data)
-        flushed_bytes = 0
+
+        if self.read_only:
+            raise ReadOnlyTreeFile(f"Page {page} can't be written as the tree file was opened in read-only mode!")
 
         if stream_bytes != page_size:
             raise ValueError(
@@ -101,14 +552,426 @@ class PagedFileMemory:
                 f"which is not the current page size of {page_size} bytes!"
             )
 
-        page_start = page * page_size
+        if page_size != self.page_size:
+            self._write_to_disk(page, data, page_size)
+            return
+
+        if self.snapshots:
+            # snapshot readers must see either the before-image or the current page, never a page being written
+            with self.snapshot_lock:
+                self._preserve_page(page)
+                self._store_page(page, data)
+
+            return
+
+        self._store_page(page, data)
+
+    def take_snapshot(self, max_preserved_pages: int = DEFAULT_MAX_PRESERVED_PAGES) -> PageSnapshot:
+        """
+        Takes a snapshot of the pages as they are now. Until it's released, page writes preserve the before-images
+        of the pages that the snapshot may read, so it must be released once it's no longer used. Only up to
+        max_preserved_pages before-images are kept in main memory, the others are spilled to a temporary file.
+        """
+        snapshot = PageSnapshot(
+            self.root_page, self.tree_height, self.records_count, self.last_used_page, max_preserved_pages
+        )
 
-        # sets stream cursor position
-        self.tree_file.seek(page_start)
+        with self.snapshot_lock:
+            self.snapshots.append(snapshot)
 
-        # write() may actually write less than stream_bytes, so we iterate to guarantee full write
-        while flushed_bytes < stream_bytes:
-            flushed_bytes += self.tree_file.write(data[flushed_bytes:])
+        return snapshot
+
+    def release_snapshot(self, snapshot: PageSnapshot) -> None:
+        """
+        Releases a snapshot along with its preserved pages. Releasing a snapshot twice has no effect. The spill
+        file is reclaimed once no snapshots are left.
+        """
+        with self.snapshot_lock:
+            self.snapshots = [open_snapshot for open_snapshot in self.snapshots if open_snapshot is not snapshot]
+            snapshot.preserved_pages = dict()
+            snapshot.spilled_pages = dict()
+
+            if not self.snapshots and self.snapshot_spill_file is not None:
+                self.snapshot_spill_file.close()  # temporary files are deleted on close
+                self.snapshot_spill_file = None
+
+    def read_snapshot_page(self, snapshot: PageSnapshot, page_number: int) -> PageData:
+        """
+        Reads a page as it was when the snapshot was taken. Pages that were not written since then are read as
+        usual, but they're copied as mapped pages could still be changed in place by later writes.
+        """
+        with self.snapshot_lock:
+            data = snapshot.preserved_pages.get(page_number)
+            spilled_offset = snapshot.spilled_pages.get(page_number)
+
+            if data is None and spilled_offset is not None:
+                self.snapshot_spill_file.seek(spilled_offset)  # type: ignore[union-attr]
+                data = self.snapshot_spill_file.read(self.page_size)  # type: ignore[union-attr]
+            elif data is None:
+                data = bytes(self.read_page(page_number))
+
+        return data
+
+    def pin_page(self, page_number: int) -> PageData:
+        """
+        Reads a page and pins it on the buffer pool so that it's kept in main memory until it's unpinned.
+        """
+        if self.buffer_pool is None:
+            raise ValueError("Pages can only be pinned when the buffer pool is enabled!")
+
+        while True:
+            data = self.read_page(page_number)
+
+            # the page may be evicted by another thread before it's pinned, so it's read again
+            with self.buffer_pool_lock:
+                if page_number in self.buffer_pool:
+                    self.buffer_pool.pin_page(page_number)
+                    return data
+
+    def unpin_page(self, page_number: int, is_dirty: bool = False) -> None:
+        """
+        Unpins a previously pinned page of the buffer pool.
+        """
+        if self.buffer_pool is None:
+            raise ValueError("Pages can only be unpinned when the buffer pool is enabled!")
+
+        with self.buffer_pool_lock:
+            self.buffer_pool.unpin_page(page_number, is_dirty)
+
+    @property
+    def defers_writes(self) -> bool:
+        return self.write_back or self.transaction_depth > 0
+
+    def flush(self) -> None:
+        """
+        Writes all dirty pages held in main memory back to the tree file (in page order) and, with the write-ahead
+        log enabled, commits them as a single operation.
+        """
+        self._write_metadata_changes()
+
+        for page_number in sorted(self.dirty_pages):
+            self._flush_page(page_number, self.dirty_pages[page_number])
+
+        self.dirty_pages = dict()
+
+        if self.buffer_pool is not None:
+            self.buffer_pool.flush_all()
+
+        self._commit_to_log()
+
+    def commit(self) -> None:
+        """
+        Marks the end of an operation (a set of page writes that must be atomic). With the write-ahead log enabled,
+        the operation's pages are appended to the log (and fsynced according to the group commit settings) and
+        the log is checkpointed into the tree file once it grows enough. Without it, this is a no-op. If writes are
+        deferred, operations are only committed when dirty pages are flushed. The metadata page is written (once)
+        if the operation changed it.
+        """
+        if not self.defers_writes:
+            self._write_metadata_changes()
+            self._commit_to_log()
+
+    def begin_transaction(self) -> None:
+        """
+        Starts deferring page writes until the transaction ends. Nested transactions join the outermost one.
+        """
+        if self.transaction_depth == 0:
+            self.flush()  # previous deferred writes are not part of the transaction
+            self.transaction_state = self._metadata()
+
+        self.transaction_depth += 1
+
+    def end_transaction(self) -> None:
+        """
+        Ends a transaction: the outermost one flushes all pages written during the transaction.
+        """
+        if self.transaction_depth == 0:
+            return  # the transaction was rolled back by a nested one
+
+        self.transaction_depth -= 1
+
+        if self.transaction_depth == 0:
+            self.flush()
+
+    def rollback_transaction(self) -> None:
+        """
+        Aborts the current transaction discarding all pages written during it.
+        """
+        self.dirty_pages = dict()
+
+        if self.buffer_pool is not None:
+            self.buffer_pool.discard_dirty_pages()
+
+        self._restore_metadata(self.transaction_state)
+        self.transaction_depth = 0
+
+    def refresh(self) -> None:
+        """
+        Makes a read-only memory see the operations committed by the tree file's writer since it was opened: the
+        cached pages are dropped and the metadata (and the pages of the writer's log) are read again.
+        """
+        if self.buffer_pool is not None:
+            with self.buffer_pool_lock:
+                self.buffer_pool.discard_all_pages()
+
+        if self.read_only:
+            self._read_log_pages()
+
+        self._read_page_metadata_from_disk()
+
+    def replace_tree_file(self, file_path: StrPath) -> None:
+        """
+        Atomically replaces the tree file with another tree file of the same settings (e.g. a compacted copy of it)
+        and reads the metadata of its tree. Pending pages are flushed and the write-ahead log is checkpointed first,
+        so neither of them holds pages of the replaced file, and the cached pages are dropped.
+        """
+        self.flush()
+        self.checkpoint()
+
+        if self.buffer_pool is not None:
+            with self.buffer_pool_lock:
+                self.buffer_pool.discard_all_pages()
+
+        # the new file must be durable before it's renamed and the rename before new pages are logged for it
+        with open(file_path, "rb") as new_tree_file:
+            os.fsync(new_tree_file.fileno())
+
+        self._close_tree_file()
+        os.replace(file_path, self.tree_file_path)
+        _sync_directory(self.tree_file_path)
+
+        self.tree_file, _ = self._open_tree_file(self.tree_file_path)
+        self._read_page_metadata_from_disk()
+
+    def _commit_to_log(self) -> None:
+        """
+        Commits the logged pages as a single operation and checkpoints the log if it has grown enough.
+        """
+        if self.wal is None:
+            return
+
+        self.wal.commit()
+
+        if self.wal.needs_checkpoint():
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """
+        Writes the pages of all committed operations of the write-ahead log to the tree file and empties the log.
+        """
+        if self.wal is not None:
+            self.wal.checkpoint(self._write_to_disk_page, self._sync_to_disk)
+
+    def close(self) -> None:
+        """
+        Flushes pending pages and closes the tree file.
+        """
+        self.flush()
+
+        if self.wal is not None:
+            self.checkpoint()
+            self.wal.close()
+
+        self._close_tree_file()
+
+    def _close_tree_file(self) -> None:
+        self.tree_file.close()
+
+    def _store_page(self, page: int, data: Union[bytes, bytearray]) -> None:
+        """
+        Stores a page of a write: it's marked as dirty if writes are deferred or it's persisted otherwise.
+        """
+        if self.defers_writes:
+            if self.buffer_pool is not None:
+                with self.buffer_pool_lock:
+                    self.buffer_pool.put_page(page, bytes(data), is_dirty=True)
+
+                self.dirty_pages.pop(page, None)
+            else:
+                self.dirty_pages[page] = bytes(data)
+
+            return
+
+        self._flush_page(page, data)
+
+        if self.buffer_pool is not None:
+            with self.buffer_pool_lock:
+                self.buffer_pool.put_page(page, bytes(data))
+
+    def _preserve_page(self, page_number: int) -> None:
+        """
+        Preserves the before-image of a page that is about to be written on the open snapshots that may read it.
+        Snapshots whose main memory budget is used up get it from the spill file (where it's written only once).
+        """
+        before_image: Optional[bytes] = None
+        spilled_offset: Optional[int] = None
+
+        for snapshot in self.snapshots:
+            # the metadata page is never read by snapshots as they carry their own tree metadata
+            if not 0 < page_number <= snapshot.last_used_page:
+                continue
+
+            if page_number in snapshot.preserved_pages or page_number in snapshot.spilled_pages:
+                continue
+
+            if before_image is None:
+                before_image = bytes(self.read_page(page_number))
+
+            if len(snapshot.preserved_pages) < snapshot.max_preserved_pages:
+                snapshot.preserved_pages[page_number] = before_image
+                continue
+
+            if spilled_offset is None:
+                spilled_offset = self._spill_page(before_image)
+
+            snapshot.spilled_pages[page_number] = spilled_offset
+
+    def _spill_page(self, before_image: bytes) -> int:
+        """
+        Appends a before-image to the spill file of the snapshots (creating it if needed) and returns its offset.
+        """
+        if self.snapshot_spill_file is None:
+            self.snapshot_spill_file = tempfile.TemporaryFile()
+
+        offset = self.snapshot_spill_file.seek(0, os.SEEK_END)
+        self.snapshot_spill_file.write(before_image)
+
+        return offset
+
+    def _write_back_page(self, page_number: int, data: bytes) -> None:
+        """
+        Writes back a dirty page evicted from the buffer pool. During transactions, it's kept in main memory until
+        the transaction ends so that it can still be rolled back.
+        """
+        if self.transaction_depth > 0:
+            self.dirty_pages[page_number] = data
+        else:
+            self._flush_page(page_number, data)
+
+    def _flush_page(self, page_number: int, data: Union[bytes, bytearray]) -> None:
+        """
+        Persists a page: it's logged if the write-ahead log is enabled or written to the tree file otherwise.
+        """
+        if self.wal is not None:
+            self.wal.log_page(page_number, data)
+        else:
+            self._write_to_disk(page_number, data)
+
+    def _read_from_log_or_disk(self, page_number: int) -> PageData:
+        """
+        Reads a page from the write-ahead log if it was not checkpointed yet or from the tree file otherwise.
+        """
+        if self.wal is not None and page_number in self.wal.pages:
+            return self.wal.pages[page_number]
+
+        if page_number in self.logged_pages:
+            return self.logged_pages[page_number]
+
+        return self._read_from_disk(page_number, self.page_size)
+
+    def _read_log_pages(self) -> None:
+        """
+        Reads (without applying them) the pages of the committed operations of the writer's log that were not
+        checkpointed yet.
+        """
+        self.logged_pages = dict()
+        wal_file_path = f"{os.fsdecode(self.tree_file_path)}.wal"
+
+        if os.path.exists(wal_file_path):
+            replay_log(wal_file_path, self.logged_pages.__setitem__, self.endianness)
+
+    def _write_to_disk_page(self, page_number: int, data: bytes) -> None:
+        """
+        Writes a page of any size (e.g. replayed log pages before the page size is known) to the tree file.
+        """
+        self._write_to_disk(page_number, data, len(data))
+
+    def _sync_to_disk(self) -> None:
+        """
+        Makes all writes to the tree file durable.
+        """
+        os.fsync(self.tree_file.fileno())
+
+    def _is_empty_tree_file(self) -> bool:
+        """
+        Returns whether the tree file has no pages at all.
+        """
+        return os.path.getsize(self.tree_file_path) == 0
+
+    def _read_from_disk(self, page_number: int, page_size: int) -> PageData:
+        """
+        Reads a page straight from the tree file.
+        """
+        return self._read_at(page_number * page_size, page_size)
+
+    def _read_at(self, page_start: int, page_size: int) -> PageData:
+        """
+        Reads page_size bytes of the tree file starting at the given byte offset.
+        """
+        page_end = page_start + page_size
+
+        if self.metrics is not None:
+            self.metrics.count("disk_reads")
+            self.metrics.count("bytes_read", page_size)
+
+        data: Union[bytes, bytearray]
+
+        if POSITIONAL_IO:
+            data = os.pread(self.tree_file.fileno(), page_size, page_start)
+
+            # pread() may return less bytes than expected, so we iterate until the end of the page
+            while len(data) < page_size:
+                data += os.pread(self.tree_file.fileno(), page_size - len(data), page_start + len(data))
+
+            return data
+
+        with self.tree_file_lock:
+            data = bytearray()
+
+            # sets file's stream cursor at the beginning of the page
+            page_cursor = self.tree_file.seek(page_start)
+
+            # read() may return less bytes than expected, so we iterate until
+            # the cursor position is at the end of the page
+            while page_cursor != page_end:
+                data += self.tree_file.read(page_end - page_cursor)  # reading moves cursor forward
+                page_cursor = self.tree_file.tell()
+
+        return data
+
+    def _write_to_disk(self, page: int, data: Union[bytes, bytearray], page_size: Optional[int] = None) -> None:
+        """
+        Writes a full page straight to the tree file.
+        """
+        page_size = page_size if page_size is not None else self.page_size
+
+        self._write_at(page * page_size, data)
+
+    def _write_at(self, page_start: int, data: Union[bytes, bytearray]) -> None:
+        """
+        Writes bytes to the tree file starting at the given byte offset.
+        """
+        stream_bytes = len(data)
+        flushed_bytes = 0
+
+        if self.metrics is not None:
+            self.metrics.count("disk_writes")
+            self.metrics.count("bytes_written", stream_bytes)
+
+        if POSITIONAL_IO:
+            # pwrite() may actually write less than stream_bytes, so we iterate to guarantee full write
+            while flushed_bytes < stream_bytes:
+                flushed_bytes += os.pwrite(self.tree_file.fileno(), data[flushed_bytes:], page_start + flushed_bytes)
+
+            return
+
+        with self.tree_file_lock:
+            # sets stream cursor position
+            self.tree_file.seek(page_start)
+
+            # write() may actually write less than stream_bytes, so we iterate to guarantee full write
+            while flushed_bytes < stream_bytes:
+                flushed_bytes += self.tree_file.write(data[flushed_bytes:])
 
     def _open_tree_file(self, file_path: Optional[StrPath]) -> Tuple[BinaryIO, bool]:
         """
@@ -119,38 +982,82 @@ class PagedFileMemory:
             file_name = f"bptree-{uuid4().hex}.db"
             file_path = Path().absolute().joinpath(file_name)
 
+        if self.read_only:
+            return open(file_path, "rb", buffering=0), False  # read-only files must exist
+
         if os.path.exists(file_path):
             tree_fd = open(file_path, "r+b", buffering=0)
 
-            return tree_fd, False
+            # an empty file was created but nothing was ever written to it (e.g. only on the write-ahead log)
+            return tree_fd, os.path.getsize(file_path) == 0
 
         tree_fd = open(file_path, "x+b", buffering=0)  # creates file it doesn't exist
         return tree_fd, True
 
     def _write_page_metadata_to_disk(self):
+        """
+        Allocates the first page of a new tree file and persists the tree memory disk paging metadada
+        (settings) on it.
+        """
+        self.allocate_page()  # increments self.last_used_page to 0
+        self._write_metadata_page()
+
+    def _metadata(self) -> Tuple[int, ...]:
+        """
+        Returns the metadata that changes as the tree is modified.
+        """
+        return self.free_list_head, self.root_page, self.tree_height, self.records_count, self.last_used_page
+
+    def _restore_metadata(self, metadata: Tuple[int, ...]) -> None:
+        """
+        Restores previously taken metadata (e.g. when a transaction is rolled back).
+        """
+        self.free_list_head, self.root_page, self.tree_height, self.records_count, self.last_used_page = metadata
+
+    def _write_metadata_changes(self) -> None:
+        """
+        Writes the metadata page only if the metadata has changed since it was last written.
+        """
+        if self._metadata() != self.persisted_metadata:
+            self._write_metadata_page()
+
+    def _write_metadata_page(self):
         """
         Creates a byte array of the tree memory disk paging metadada (settings) to be persisted on disk.
         The memory layout of the byte array is as follows:
 
-        page_size, max_key_size, max_value_size, padding
-        4 bytes, 4 bytes, 4 bytes, 4 bytes, (page_size - 4 * 3) bytes
+        page_size, max_key_size, max_value_size, free_list_head, format_version, root_page, tree_height,
+        records_count, last_used_page, flags, padding
+        4 bytes, 4 bytes, 4 bytes, 4 bytes, 2 bytes, 4 bytes, 4 bytes, 8 bytes, 4 bytes, 1 byte, (page_size - 39) bytes
         """
-        metadata_page_number = self.allocate_page()  # increments self.last_used_page to 0
         page_data = bytes()
 
         page_data += self.page_size.to_bytes(PAGE_SIZE_BYTE_SPACE, self.endianness)
         page_data += self.max_key_size.to_bytes(MAX_KEY_SIZE_BYTE_SPACE, self.endianness)
         page_data += self.max_value_size.to_bytes(MAX_VALUE_SIZE_BYTE_SPACE, self.endianness)
+        page_data += self.free_list_head.to_bytes(FREE_LIST_HEAD_BYTE_SPACE, self.endianness)
+        page_data += TREE_FORMAT_VERSION.to_bytes(FORMAT_VERSION_BYTE_SPACE, self.endianness)
+        page_data += self.root_page.to_bytes(NODE_POINTER_BYTE_SPACE, self.endianness)
+        page_data += self.tree_height.to_bytes(TREE_HEIGHT_BYTE_SPACE, self.endianness)
+        page_data += self.records_count.to_bytes(TREE_RECORDS_COUNT_BYTE_SPACE, self.endianness)
+        page_data += self.last_used_page.to_bytes(NODE_POINTER_BYTE_SPACE, self.endianness)
+        page_data += self._tree_flags().to_bytes(TREE_FLAGS_BYTE_SPACE, self.endianness)
         page_data += bytes(self.page_size - len(page_data))  # padding
 
-        self.write_page(metadata_page_number, page_data)
+        self.write_page(0, page_data)
+        self.persisted_metadata = self._metadata()
 
     def _read_page_metadata_from_disk(self):
         """
-        Reads a tree memory layout settings from a disk byte array.
+        Reads a tree memory layout settings from a disk byte array. Everything that's needed to open the tree is
+        stored on the metadata page, so the size of the tree file doesn't matter.
         """
         # reads incomplete page in order to fetch page size first
-        incomplete_first_page = self.read_page(0, PAGE_SIZE_BYTE_SPACE)
+        if 0 in self.logged_pages:
+            incomplete_first_page = self.logged_pages[0][:PAGE_SIZE_BYTE_SPACE]
+        else:
+            incomplete_first_page = self._read_from_disk(0, PAGE_SIZE_BYTE_SPACE)
+
         self.page_size = int.from_bytes(incomplete_first_page, self.endianness)
 
         # after having page size, reads the complete settings page
@@ -165,4 +1072,391 @@ class PagedFileMemory:
         end += MAX_VALUE_SIZE_BYTE_SPACE
         self.max_value_size = int.from_bytes(full_page[start:end], self.endianness)
 
-        self.last_used_page = int(os.path.getsize(self.tree_file_path) / self.page_size) - 1  # pages are zero-indexed
+        start = end
+        end += FREE_LIST_HEAD_BYTE_SPACE
+        self.free_list_head = int.from_bytes(full_page[start:end], self.endianness)
+
+        start = end
+        end += FORMAT_VERSION_BYTE_SPACE
+        format_version = int.from_bytes(full_page[start:end], self.endianness)
+
+        if format_version != TREE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported tree file format version: {format_version}!")
+
+        start = end
+        end += NODE_POINTER_BYTE_SPACE
+        self.root_page = int.from_bytes(full_page[start:end], self.endianness)
+
+        start = end
+        end += TREE_HEIGHT_BYTE_SPACE
+        self.tree_height = int.from_bytes(full_page[start:end], self.endianness)
+
+        start = end
+        end += TREE_RECORDS_COUNT_BYTE_SPACE
+        self.records_count = int.from_bytes(full_page[start:end], self.endianness)
+
+        start = end
+        end += NODE_POINTER_BYTE_SPACE
+        self.last_used_page = int.from_bytes(full_page[start:end], self.endianness)
+
+        start = end
+        end += TREE_FLAGS_BYTE_SPACE
+        tree_flags = int.from_bytes(full_page[start:end], self.endianness)
+        self.order_statistics = bool(tree_flags & ORDER_STATISTICS_FLAG)
+
+        self.persisted_metadata = self._metadata()
+
+    def _tree_flags(self) -> int:
+        """
+        Returns the flags of the optional features of the tree that are persisted on the metadata page.
+        """
+        return ORDER_STATISTICS_FLAG if self.order_statistics else 0
+
+
+class MmapPagedFileMemory(PagedFileMemory):
+    """
+    Paged file memory backed by a memory-mapped tree file. Pages are read as zero-copy memoryview slices of
+    the mapping (served by the OS page cache) and written with plain slice assignments, so no read/write
+    syscalls are issued per page. The file (and its mapping) grows in extents of many pages at once as new
+    pages are allocated and it's truncated back to its used pages when the memory is closed.
+
+    In read-only mode, the file is mapped read-only, so processes that share a tree file (e.g. workers forked after
+    it's opened) share the same physical pages of the OS page cache instead of holding their own copies.
+    """
+
+    mapping: Optional[mmap.mmap] = None
+    extent_size: int = 1 << 20  # bytes
+
+    def __init__(self, *args, extent_size: Optional[int] = None, **kwargs) -> None:
+        if extent_size is not None:
+            self.extent_size = extent_size
+
+        super().__init__(*args, **kwargs)
+
+    def flush(self) -> None:
+        """
+        Writes all dirty pages back to the mapping and asks the OS to write the mapped pages to the tree file.
+        """
+        super().flush()
+
+        if self.mapping is not None and not self.read_only:
+            self.mapping.flush()
+
+    def close(self) -> None:
+        """
+        Flushes the mapping, truncates the unused pages of the last extent and closes the tree file.
+        """
+        self.flush()
+
+        if self.wal is not None:
+            self.checkpoint()
+            self.wal.close()
+
+        self._unmap_tree_file()
+
+        if not self.read_only:
+            self.tree_file.truncate((self.last_used_page + 1) * self.page_size)
+
+        self.tree_file.close()
+
+    def _close_tree_file(self) -> None:
+        self._unmap_tree_file()
+        super()._close_tree_file()
+
+    def _unmap_tree_file(self) -> None:
+        if self.mapping is not None:
+            try:
+                self.mapping.close()
+            except BufferError:
+                pass  # memoryviews of pages are still referenced: the mapping is released when they are
+
+            self.mapping = None
+
+    def _read_from_disk(self, page_number: int, page_size: int) -> PageData:
+        """
+        Returns a zero-copy view of a page of the mapping.
+        """
+        page_start = page_number * page_size
+        page_end = page_start + page_size
+
+        if self.metrics is not None:
+            self.metrics.count("disk_reads")
+            self.metrics.count("bytes_read", page_size)
+
+        if self.mapping is None or page_end > len(self.mapping):
+            self._map_tree_file(page_end)
+
+        return memoryview(self.mapping)[page_start:page_end]  # type: ignore
+
+    def _write_to_disk(self, page: int, data: Union[bytes, bytearray], page_size: Optional[int] = None) -> None:
+        """
+        Copies a page into the mapping growing it by a new extent if the page is beyond its end.
+        """
+        page_size = page_size if page_size is not None else self.page_size
+        page_start = page * page_size
+        page_end = page_start + page_size
+
+        if self.metrics is not None:
+            self.metrics.count("disk_writes")
+            self.metrics.count("bytes_written", page_size)
+
+        if self.mapping is None or page_end > len(self.mapping):
+            self._grow_tree_file(page_end, page_size)
+
+        self.mapping[page_start:page_end] = data  # type: ignore
+
+    def refresh(self) -> None:
+        """
+        Same as PagedFileMemory.refresh, but the tree file is mapped again as the writer may have grown it.
+        """
+        self.mapping = None  # the old mapping is released as soon as its page views are gone
+        super().refresh()
+
+    def _sync_to_disk(self) -> None:
+        """
+        Makes all writes to the mapping durable.
+        """
+        if self.mapping is not None:
+            self.mapping.flush()
+
+        super()._sync_to_disk()
+
+    def _grow_tree_file(self, min_size: int, page_size: int) -> None:
+        """
+        Extends the tree file to the next multiple of the extent size that fits min_size bytes and remaps it. The
+        page size is given by the write as it isn't known yet while the log is replayed.
+        """
+        extent_size = max(self.extent_size, page_size)
+        new_size = (min_size // extent_size + 1) * extent_size
+
+        self.tree_file.truncate(new_size)
+        self._map_tree_file(min_size)
+
+    def _map_tree_file(self, min_size: int) -> None:
+        """
+        Maps the whole tree file. A new mapping is created instead of resizing the old one because previously
+        returned memoryviews would forbid resizing: old mappings are released as soon as their views are gone.
+        """
+        file_size = os.path.getsize(self.tree_file_path)
+
+        if file_size < min_size:
+            raise ValueError(f"Tree file of {file_size} bytes has no data at byte offset {min_size}!")
+
+        access = mmap.ACCESS_READ if self.read_only else mmap.ACCESS_WRITE
+        self.mapping = mmap.mmap(self.tree_file.fileno(), file_size, access=access)
+
+
+class CompressedPagedFileMemory(PagedFileMemory):
+    """
+    Paged file memory that compresses each page on its way to the tree file and stores it on a variable-size
+    extent of it (see the compression module for its layout), so tree files take less disk space and cold page
+    reads read fewer bytes. Pages keep their fixed size in main memory.
+
+    Written pages never overwrite the extents of the extent map that was last saved to the tree file. Without the
+    write-ahead log, the map is saved again on every commit (and on flushes of deferred writes), so a crashed writer
+    leaves the tree file as of its last committed operation. With it, committed operations are durable on the log
+    and the map is saved on its checkpoints.
+    """
+
+    compressor: PageCompressor = ZlibCompressor()
+    extent_map: ExtentMap
+    extent_map_lock: threading.Lock
+
+    def __init__(self, *args, compressor: Optional[PageCompressor] = None, **kwargs) -> None:
+        if compressor is not None:
+            self.compressor = compressor
+
+        self.extent_map_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def flush(self) -> None:
+        """
+        Writes all dirty pages back to the tree file and saves the extent map that locates them.
+        """
+        super().flush()
+        self._save_extent_map()
+
+    def commit(self) -> None:
+        """
+        Same as PagedFileMemory.commit, but without the write-ahead log the extent map is saved too, so the extents of
+        the operation's pages are found by readers and after a crash.
+        """
+        super().commit()
+
+        if self.wal is None and not self.defers_writes:
+            self._save_extent_map()
+
+    def refresh(self) -> None:
+        """
+        Same as PagedFileMemory.refresh, but the extent map is read again as the writer may have saved a new one.
+        """
+        if self.read_only:
+            self._read_extent_map()
+
+        super().refresh()
+
+    def _open_tree_file(self, file_path: Optional[StrPath]) -> Tuple[BinaryIO, bool]:
+        """
+        Opens or creates a compressed tree file and reads its extent map.
+        """
+        self.tree_file, _ = super()._open_tree_file(file_path)  # the extent map is read from the opened file
+        self.tree_file_path = self.tree_file.name
+
+        if os.path.getsize(self.tree_file_path) == 0 and not self.read_only:
+            self.extent_map = ExtentMap()
+            self._write_file_header(None)
+        else:
+            self._read_extent_map()
+
+        return self.tree_file, not self.read_only and self._is_empty_tree_file()  # read-only files must exist
+
+    def _is_empty_tree_file(self) -> bool:
+        return not self.extent_map.extents
+
+    def _read_from_disk(self, page_number: int, page_size: int) -> PageData:
+        """
+        Reads the extent of a page and decompresses it.
+        """
+        extent = self.extent_map.extents.get(page_number)
+
+        if extent is None:
+            raise ValueError(f"Tree file {os.fsdecode(self.tree_file_path)} has no page {page_number}!")
+
+        offset, size = extent
+        data = self.compressor.decompress(self._read_at(offset, size))
+
+        return data if len(data) == page_size else data[:page_size]
+
+    def _write_to_disk(self, page: int, data: Union[bytes, bytearray], page_size: Optional[int] = None) -> None:
+        """
+        Compresses a page and writes it to a new extent (of its compressed size).
+        """
+        extent_data = self.compressor.compress(data)
+
+        with self.extent_map_lock:
+            offset = self.extent_map.assign(page, len(extent_data))
+
+        self._write_at(offset, extent_data)
+
+    def _sync_to_disk(self) -> None:
+        """
+        Saves the extent map and makes all writes to the tree file durable.
+        """
+        self._save_extent_map()
+        super()._sync_to_disk()
+
+    def _save_extent_map(self) -> None:
+        """
+        Writes the extent map to a new extent and points the file header to it once the extents of the pages
+        (and of the map) are durable. The previous map stays valid until the header is written.
+        """
+        if self.read_only or not self.extent_map.is_changed:
+            return
+
+        map_data = self.compressor.compress(self.extent_map.to_bytes(self.endianness))
+
+        with self.extent_map_lock:
+            map_extent = (self.extent_map.allocate(len(map_data)), len(map_data))
+
+        self._write_at(map_extent[0], map_data)
+        os.fsync(self.tree_file.fileno())
+        self._write_file_header(map_extent)
+
+        with self.extent_map_lock:
+            self.extent_map.mark_saved(map_extent)
+
+        if os.path.getsize(self.tree_file_path) > self.extent_map.file_end:
+            self.tree_file.truncate(self.extent_map.file_end)  # free space at the end of the file
+
+    def _read_extent_map(self) -> None:
+        """
+        Reads the file header and the extent map that it points to.
+        """
+        if os.path.getsize(self.tree_file_path) < FILE_HEADER_SPACE:
+            raise ValueError(f"Tree file {os.fsdecode(self.tree_file_path)} is not a compressed tree file!")
+
+        header = self._read_at(0, FILE_HEADER_SPACE)
+
+        start = 0
+        end = start + COMPRESSED_FILE_MAGIC_BYTE_SPACE
+
+        if header[start:end] != COMPRESSED_FILE_MAGIC:
+            raise ValueError(f"Tree file {os.fsdecode(self.tree_file_path)} is not a compressed tree file!")
+
+        start = end
+        end += CODEC_BYTE_SPACE
+        codec = int.from_bytes(header[start:end], self.endianness)
+
+        if codec != self.compressor.codec:
+            raise ValueError(
+                f"Tree file {os.fsdecode(self.tree_file_path)} is not compressed with {self.compressor.name}!"
+            )
+
+        start = end
+        end += EXTENT_MAP_OFFSET_BYTE_SPACE
+        map_offset = int.from_bytes(header[start:end], self.endianness)
+
+        start = end
+        end += EXTENT_MAP_SIZE_BYTE_SPACE
+        map_size = int.from_bytes(header[start:end], self.endianness)
+
+        if map_size == 0:  # no map was saved yet
+            self.extent_map = ExtentMap()
+            return
+
+        map_data = self.compressor.decompress(self._read_at(map_offset, map_size))
+        self.extent_map = ExtentMap.from_bytes(map_data, (map_offset, map_size), self.endianness)
+
+    def _write_file_header(self, map_extent: Optional[Extent]) -> None:
+        """
+        Writes the file header with the extent of the saved extent map (if any).
+        """
+        map_offset, map_size = map_extent if map_extent is not None else (0, 0)
+
+        header = bytes()
+        header += COMPRESSED_FILE_MAGIC
+        header += self.compressor.codec.to_bytes(CODEC_BYTE_SPACE, self.endianness)
+        header += map_offset.to_bytes(EXTENT_MAP_OFFSET_BYTE_SPACE, self.endianness)
+        header += map_size.to_bytes(EXTENT_MAP_SIZE_BYTE_SPACE, self.endianness)
+        header += bytes(FILE_HEADER_SPACE - len(header))  # padding
+
+        self._write_at(0, header)
+
+
+class ZlibPagedFileMemory(CompressedPagedFileMemory):
+    """
+    Paged file memory whose pages are compressed with zlib.
+    """
+
+    compressor = ZlibCompressor()
+
+
+class LzmaPagedFileMemory(CompressedPagedFileMemory):
+    """
+    Paged file memory whose pages are compressed with lzma.
+    """
+
+    compressor = LzmaCompressor()
+
+
+def _sync_directory(file_path: StrPath) -> None:
+    """
+    Makes the renames of files of the directory of the given file durable (on platforms that can sync directories).
+    """
+    if os.name != "posix":
+        return
+
+    directory_fd = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+STORAGE_BACKENDS: Dict[str, Type[PagedFileMemory]] = {
+    "file": PagedFileMemory,
+    "mmap": MmapPagedFileMemory,
+    "zlib": ZlibPagedFileMemory,
+    "lzma": LzmaPagedFileMemory,
+}
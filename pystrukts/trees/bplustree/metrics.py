@@ -0,0 +1,200 @@
+"""
+Opt-in metrics of the B+tree and of its paged file memory.
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import TypeVar
+from typing import Union
+
+T = TypeVar("T")
+
+HISTOGRAM_BUCKETS_COUNT: int = 64  # the i-th bucket counts latencies of [2^(i-1), 2^i) nanoseconds
+
+
+@dataclass
+class OperationSample:
+    """
+    Latency of a single timed operation along with the counters that changed while it ran, e.g. the page reads of
+    a slow lookup. Counters are shared by all threads, so they also include the work of concurrent operations.
+    """
+
+    operation: str
+    seconds: float
+    counters: Dict[str, Union[int, float]]
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies with power-of-two buckets: recording a latency costs a couple of integer operations
+    and percentiles are estimated with the upper bound of their bucket (within a factor of two).
+    """
+
+    buckets: List[int]
+    count: int
+    total_seconds: float
+    max_seconds: float
+
+    def __init__(self) -> None:
+        self.buckets = [0] * HISTOGRAM_BUCKETS_COUNT
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Records a latency.
+        """
+        self.buckets[min(int(seconds * 1e9).bit_length(), HISTOGRAM_BUCKETS_COUNT - 1)] += 1
+        self.count += 1
+        self.total_seconds += seconds
+
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the (upper bound of the) latency in seconds that the given percent of the recorded latencies
+        don't exceed.
+        """
+        if self.count == 0:
+            return 0.0
+
+        threshold = self.count * percent / 100
+        seen = 0
+
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+
+            if seen >= threshold:
+                return min((1 << i) / 1e9, self.max_seconds)
+
+        return self.max_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "p50_seconds": self.percentile(50),
+            "p90_seconds": self.percentile(90),
+            "p99_seconds": self.percentile(99),
+            "max_seconds": self.max_seconds,
+        }
+
+
+class TreeMetrics:
+    """
+    Counters and latency histograms of a B+tree. Trees only collect them when they're created with an instance
+    of this class, which can be shared by many trees. Otherwise, instrumented code costs a single attribute check.
+
+    Counters: get, insert, read_page and write_page (calls of the timed operations), disk_reads, disk_writes,
+    bytes_read, bytes_written (of the tree file), cache_hits, cache_misses (of the buffer pool), descents and
+    descent_levels (of lookups), and serialize_seconds and deserialize_seconds (of nodes). Splits are counted per
+    level (0 for leaves) and the latencies of the timed operations are kept on histograms. Hooks are called with an
+    OperationSample after each timed operation. Updates from concurrent threads are not synchronized, so the metrics
+    of concurrent trees are approximate.
+    """
+
+    counters: Dict[str, Union[int, float]]  # the *_seconds counters are timings, the others are integers
+    splits_per_level: Counter
+    histograms: Dict[str, LatencyHistogram]
+    hooks: List[Callable[[OperationSample], None]]
+
+    def __init__(self) -> None:
+        self.counters = dict()
+        self.splits_per_level = Counter()
+        self.histograms = dict()
+        self.hooks = list()
+
+    def count(self, counter: str, amount: Union[int, float] = 1) -> None:
+        """
+        Increments a counter.
+        """
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def count_split(self, level: int) -> None:
+        """
+        Counts a node split of the given level (0 for leaves).
+        """
+        self.splits_per_level[level] += 1
+
+    def record_latency(self, operation: str, seconds: float) -> None:
+        """
+        Records the latency of an operation on its histogram.
+        """
+        histogram = self.histograms.get(operation)
+
+        if histogram is None:
+            histogram = self.histograms[operation] = LatencyHistogram()
+
+        histogram.record(seconds)
+
+    def instrument(self, operation: str, function: Callable[..., T]) -> Callable[..., T]:
+        """
+        Wraps a function (e.g. a bound method of a tree) so that its calls are counted and timed as the given
+        operation. Instances are only instrumented when metrics are enabled, so disabled metrics cost nothing.
+        """
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            self.count(operation)
+            counters = dict(self.counters) if self.hooks else None
+            start = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                self.record_latency(operation, seconds)
+
+                if counters is not None:
+                    self._call_hooks(OperationSample(operation, seconds, self._changed_counters(counters)))
+
+        return wrapper
+
+    def add_hook(self, hook: Callable[[OperationSample], None]) -> None:
+        """
+        Adds a callback that's called with a sample of each timed operation (e.g. to feed dashboards or to log
+        slow lookups along with their page reads).
+        """
+        self.hooks.append(hook)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns a copy of all metrics as a dict of plain types.
+        """
+        return {
+            "counters": dict(self.counters),
+            "splits_per_level": dict(self.splits_per_level),
+            "latencies": {operation: histogram.to_dict() for operation, histogram in self.histograms.items()},
+        }
+
+    def reset(self) -> None:
+        """
+        Zeroes all metrics (hooks are kept).
+        """
+        self.counters = dict()
+        self.splits_per_level = Counter()
+        self.histograms = dict()
+
+    def _changed_counters(self, counters: Dict[str, Union[int, float]]) -> Dict[str, Union[int, float]]:
+        """
+        Returns how much each counter changed since the given copy of the counters was taken.
+        """
+        return {
+            counter: value - counters.get(counter, 0)
+            for counter, value in self.counters.items()
+            if value != counters.get(counter, 0)
+        }
+
+    def _call_hooks(self, sample: OperationSample) -> None:
+        for hook in self.hooks:
+            hook(sample)
@@ -4,22 +4,90 @@ Module with a B+tree implementation.
 from __future__ import annotations
 
 import os
+import struct
 from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from typing import Any
 from typing import Generic
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
+from typing import cast
 
-from pystrukts._types.basic import KT
-from pystrukts._types.basic import VT
 from pystrukts._types.basic import Endianness
+from pystrukts._types.comparable import KT
+from pystrukts._types.comparable import VT
+from pystrukts.trees.bplustree.exceptions import NodeOverflow
+from pystrukts.trees.bplustree.memory import PageData
 from pystrukts.trees.bplustree.serializers import DefaultSerializer
 from pystrukts.trees.bplustree.serializers import Serializer
+from pystrukts.trees.bplustree.serializers import StructSerializer
+from pystrukts.trees.bplustree.settings import COLUMNAR_LEAF_PAGE_TYPE
+from pystrukts.trees.bplustree.settings import COUNTED_INNER_PAGE_TYPE
+from pystrukts.trees.bplustree.settings import INNER_NODE_HEADERS_SPACE
+from pystrukts.trees.bplustree.settings import INNER_RECORD_SLOT_SPACE
+from pystrukts.trees.bplustree.settings import KEY_OFFSET_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import KEY_PREFIX_SIZE_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import LEAF_NODES_HEADERS_SPACE
+from pystrukts.trees.bplustree.settings import LEAF_RECORD_SLOT_SPACE
+from pystrukts.trees.bplustree.settings import MAX_PAGE_SIZE
 from pystrukts.trees.bplustree.settings import NODE_POINTER_BYTE_SPACE
 from pystrukts.trees.bplustree.settings import NODE_TYPE_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import OVERFLOW_VALUE_FLAG
+from pystrukts.trees.bplustree.settings import PREV_LEAF_POINTER_OFFSET
 from pystrukts.trees.bplustree.settings import RECORDS_COUNT_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import SUBTREE_COUNT_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import VALUE_SIZE_BYTE_SPACE
 
-StrPath = Union[str, bytes, os.PathLike]
+try:
+    import numpy as np
+except ImportError:  # NumPy is an optional dependency used by columnar leaves
+    np = None  # type: ignore[assignment]  # np is narrowed with "is not None" checks before it's used
+
+# struct formats of inner records' slots: node pointer (4 bytes) and key end offset (2 bytes)
+INNER_RECORD_SLOT_FORMATS = {"big": ">IH", "little": "<IH"}
+
+# struct formats to read the key end offsets of two adjacent inner records' slots at once
+KEY_OFFSETS_FORMATS = {"big": ">H4xH", "little": "<H4xH"}
+
+# struct formats of leaf records' slots: key end offset (2 bytes), value end offset (2 bytes) and flags (1 byte)
+LEAF_RECORD_SLOT_FORMATS = {"big": ">HHB", "little": "<HHB"}
+
+# struct formats to read the record's start (previous slot's value end offset) and its slot at once
+LEAF_RECORD_BOUNDS_FORMATS = {"big": ">H1xHHB", "little": "<H1xHHB"}
+
+# struct byte order characters of columnar leaf pages (and of the subtree counts of counted inner pages)
+BYTE_ORDERS = {"big": ">", "little": "<"}
+
+
+@lru_cache(maxsize=512)
+def fixed_width_struct(struct_format: str) -> struct.Struct:
+    """
+    Returns a (cached) compiled struct of fixed-width records, e.g., all the columns of a columnar leaf page.
+    """
+    return struct.Struct(struct_format)
+
+
+def has_columnar_leaves(
+    key_serializer: Serializer[KT],
+    value_serializer: Serializer[VT],
+    max_key_size: int,
+    max_value_size: int,
+    endianness: Endianness,
+) -> bool:
+    """
+    Returns whether leaves are stored on columnar pages, i.e., both keys and values use struct serializers (of the
+    page's byte order) and they always fit their max sizes (so no value is ever stored on overflow pages).
+    """
+    if not isinstance(key_serializer, StructSerializer) or not isinstance(value_serializer, StructSerializer):
+        return False
+
+    if key_serializer.endianness != endianness or value_serializer.endianness != endianness:
+        return False
+
+    return key_serializer.size <= max_key_size and value_serializer.size <= max_value_size
 
 
 @dataclass
@@ -27,12 +95,42 @@ class InnerRecord(Generic[KT, VT]):
     key: KT
     next_node_page: int
     next_node: Optional[BPTNode[KT, VT]]  # if None, use the next page number to read from disk
+    next_node_count: int = 0  # records of the next node's subtree (only kept by counted inner nodes)
 
 
 @dataclass
 class LeafRecord(Generic[KT, VT]):
     key: KT
-    value: VT
+    value: Union[VT, OverflowValue]  # values stored on overflow pages are references to them
+
+    # serialized key and value as stored on leaf pages (so unchanged records are not serialized again)
+    record_data: Optional[bytes] = field(default=None, compare=False, repr=False)
+    key_size: int = field(default=0, compare=False, repr=False)
+
+
+@dataclass
+class OverflowValue:
+    """
+    Reference to a serialized value that is too big for its leaf page and is stored on a chain of overflow pages.
+    """
+
+    first_page: int
+    size: int
+
+    def to_bytes(self, endianness: Endianness) -> bytes:
+        reference_data = bytes()
+        reference_data += self.first_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness)
+        reference_data += self.size.to_bytes(VALUE_SIZE_BYTE_SPACE, endianness)
+
+        return reference_data
+
+    @staticmethod
+    def from_bytes(data: PageData, endianness: Endianness) -> OverflowValue:
+        size_start = NODE_POINTER_BYTE_SPACE
+        first_page = int.from_bytes(data[:size_start], endianness)
+        size = int.from_bytes(data[size_start : size_start + VALUE_SIZE_BYTE_SPACE], endianness)
+
+        return OverflowValue(first_page, size)
 
 
 class BPTNode(Generic[KT, VT]):
@@ -49,14 +147,18 @@ class BPTNode(Generic[KT, VT]):
     value_serializer: Serializer[VT]
 
     # inner node properties
-    inner_records: List[InnerRecord[KT, VT]]
+    _inner_records: List[InnerRecord[KT, VT]]
     first_node_page: int
     first_node: Optional[BPTNode[KT, VT]]
+    first_node_count: int
+    has_subtree_counts: bool  # the records count of each child's subtree is kept (trees with order statistics)
+    page_view: Optional[BPTNodeView[KT, VT]]  # page of an inner node read from disk whose keys weren't decoded yet
 
     # leaf node properties
     leaf_records: List[LeafRecord[KT, VT]]
     next_leaf_page: int
     next_leaf: Optional[BPTNode[KT, VT]]
+    prev_leaf_page: int
 
     def __init__(
         self,
@@ -74,51 +176,221 @@ class BPTNode(Generic[KT, VT]):
         self.value_serializer = value_serializer
 
         # inner nodes
-        self.inner_records = list()
+        self._inner_records = list()
+        self.page_view = None
         self.first_node = None
         self.first_node_page = 0
+        self.first_node_count = 0
+        self.has_subtree_counts = False
 
         # leaf nodes
         self.leaf_records = list()
         self.next_leaf_page = 0
         self.next_leaf = None
+        self.prev_leaf_page = 0
+
+    @property
+    def inner_records(self) -> List[InnerRecord[KT, VT]]:
+        """
+        Records of an inner node. Inner nodes read from disk only decode their keys once their records are
+        accessed, so nodes that are just searched on the way down the tree are binary searched on their page.
+        """
+        self.decode()
+
+        return self._inner_records
+
+    @inner_records.setter
+    def inner_records(self, inner_records: List[InnerRecord[KT, VT]]) -> None:
+        self._inner_records = inner_records
+        self.page_view = None
+
+    def decode(self) -> None:
+        """
+        Decodes the keys of an inner node read from disk, e.g., for nodes that are kept in memory and searched often.
+        """
+        if self.page_view is not None:
+            self._inner_records = self.page_view.inner_records()
+            self.page_view = None
 
     @property
     def records_count(self) -> int:
         if self.is_leaf:
             return len(self.leaf_records)
 
+        if self.page_view is not None:
+            return self.page_view.records_count
+
         return len(self.inner_records)
 
+    def key_at(self, i: int) -> KT:
+        """
+        Returns the key of the i-th record.
+        """
+        if self.is_leaf:
+            return self.leaf_records[i].key
+
+        if self.page_view is not None:
+            return self.page_view.key_at(i)
+
+        return self.inner_records[i].key
+
+    def child_index(self, key: KT) -> int:
+        """
+        Returns the index of the child of an inner node whose subtree may contain the given key: child 0 is the
+        first node and the child i > 0 is the next node of the (i - 1)-th inner record. Keys that are equal to an
+        inner record's key belong to the child on its left.
+        """
+        if self.page_view is not None:
+            return self.page_view.child_index(key)
+
+        # binary search for the first inner record whose key is not smaller than the given key
+        lo = 0
+        hi = len(self.inner_records)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if key > self.inner_records[mid].key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def find_record(self, key: KT) -> Optional[int]:
+        """
+        Returns the index of the leaf record with the given key or None if there's no such record.
+        """
+        i = 0
+
+        while i < len(self.leaf_records) and key > self.leaf_records[i].key:
+            i += 1
+
+        if i < len(self.leaf_records) and key == self.leaf_records[i].key:
+            return i
+
+        return None
+
+    def value_at(self, i: int) -> Union[VT, OverflowValue]:
+        """
+        Returns the value of the i-th leaf record (or its reference to overflow pages).
+        """
+        return self.leaf_records[i].value
+
+    def child_page(self, i: int) -> int:
+        """
+        Returns the disk page of the i-th child of an inner node.
+        """
+        if i == 0:
+            return self.first_node_page
+
+        if self.page_view is not None:
+            return self.page_view.child_page(i)
+
+        return self.inner_records[i - 1].next_node_page
+
+    def child_node(self, i: int) -> Optional[BPTNode[KT, VT]]:
+        """
+        Returns the in-memory i-th child of an inner node or None if it must be read from disk.
+        """
+        if i == 0:
+            return self.first_node
+
+        if self.page_view is not None:
+            return None
+
+        return self.inner_records[i - 1].next_node
+
+    def child_count(self, i: int) -> int:
+        """
+        Returns the records count of the subtree of the i-th child of a counted inner node.
+        """
+        if i == 0:
+            return self.first_node_count
+
+        if self.page_view is not None:
+            return self.page_view.child_count(i)
+
+        return self.inner_records[i - 1].next_node_count
+
+    def set_child_count(self, i: int, count: int) -> None:
+        """
+        Updates the records count of the subtree of the i-th child of a counted inner node.
+        """
+        if i == 0:
+            self.first_node_count = count
+        else:
+            self.inner_records[i - 1].next_node_count = count
+
+    @property
+    def subtree_records_count(self) -> int:
+        """
+        Returns the records count of the node's subtree (for inner nodes, as kept by counted inner nodes).
+        """
+        if self.is_leaf:
+            return self.records_count
+
+        return sum(self.child_count(i) for i in range(0, self.records_count + 1))
+
+    def set_child_node(self, i: int, child: BPTNode[KT, VT]) -> None:
+        """
+        Keeps a reference to the in-memory i-th child of an inner node. Children of nodes whose keys weren't
+        decoded yet are not kept (but the first one), so they're read from disk again.
+        """
+        if i == 0:
+            self.first_node = child
+        elif self.page_view is None:
+            self.inner_records[i - 1].next_node = child
+
     def to_page(self, page_size: int, max_key_size: int, max_value_size: int, endianness: Endianness) -> bytes:
         """
         Creates a byte array of the node following given memory layout.
         """
-        page_data = bytes()
+        page_data = self.serialize(max_key_size, max_value_size, endianness)
+
+        if len(page_data) > page_size:
+            raise NodeOverflow(f"node with {self.records_count} records does not fit the page size: {page_size}")
+
+        page_data += bytes(page_size - len(page_data))  # final padding to fit a disk page
+
+        return page_data
+
+    def serialize(self, max_key_size: int, max_value_size: int, endianness: Endianness) -> bytes:
+        """
+        Serializes the node's headers and records without the final page padding. As records have variable sizes,
+        this is how it's checked whether a node fits a page. Raises NodeOverflow if the records would not even fit
+        the biggest page size as their offsets could not be stored.
+        """
+        if self.is_leaf and has_columnar_leaves(
+            self.key_serializer, self.value_serializer, max_key_size, max_value_size, endianness
+        ):
+            return self._serialize_columnar_leaf_node(endianness)
+
+        node_data = bytes()
 
         # page headers
-        page_data += self.is_leaf.to_bytes(NODE_TYPE_BYTE_SPACE, endianness)
-        page_data += self.records_count.to_bytes(RECORDS_COUNT_BYTE_SPACE, endianness)
+        node_type = COUNTED_INNER_PAGE_TYPE if self.has_subtree_counts and not self.is_leaf else int(self.is_leaf)
+        node_data += node_type.to_bytes(NODE_TYPE_BYTE_SPACE, endianness)
+        node_data += self.records_count.to_bytes(RECORDS_COUNT_BYTE_SPACE, endianness)
 
         if self.is_leaf:
-            page_data += self._serialize_leaf_node(max_key_size, max_value_size, endianness)
+            node_data += self._serialize_leaf_node(max_key_size, max_value_size, endianness)
         else:
-            page_data += self._serialize_inner_node(max_key_size, endianness)
+            node_data += self._serialize_inner_node(max_key_size, endianness)
 
-        page_data += bytes(page_size - len(page_data))  # final padding to fit a disk page
-
-        return page_data
+        return node_data
 
     def load_from_page(
         self,
-        data: bytes,
+        data: PageData,
         max_key_size: int,
         max_value_size: int,
         endianess: Endianness,
     ) -> None:
         start = 0
         end = start + NODE_TYPE_BYTE_SPACE
-        self.is_leaf = bool(bool.from_bytes(data[start:end], endianess))
+        node_type = int.from_bytes(data[start:end], endianess)
+        self.is_leaf = bool(node_type) and node_type != COUNTED_INNER_PAGE_TYPE
 
         start = end
         end += RECORDS_COUNT_BYTE_SPACE
@@ -129,68 +401,433 @@ class BPTNode(Generic[KT, VT]):
             end += NODE_POINTER_BYTE_SPACE
             self.next_leaf_page = int.from_bytes(data[start:end], endianess)
 
-            for _ in range(0, records_count):
-                start = end
-                end += max_key_size
-                key = self.key_serializer.from_bytes(data[start:end])
+            start = end
+            end += NODE_POINTER_BYTE_SPACE
+            self.prev_leaf_page = int.from_bytes(data[start:end], endianess)
+
+            if node_type == COLUMNAR_LEAF_PAGE_TYPE:
+                self._load_columnar_leaf_records(data, end, records_count)
+                return
+
+            records_start = end + records_count * LEAF_RECORD_SLOT_SPACE
+            records_data = bytes(data[records_start:])
+            record_start = 0
+
+            # unpacks all (key_end, value_end, flags) slots at once
+            slots_data = data[end:records_start]
+
+            for key_end, value_end, flags in struct.iter_unpack(LEAF_RECORD_SLOT_FORMATS[endianess], slots_data):
+                key = self.key_serializer.from_bytes(records_data[record_start:key_end])
+                value: Union[VT, OverflowValue]
 
-                start = end
-                end += max_value_size
-                value = self.value_serializer.from_bytes(data[start:end])
+                if flags & OVERFLOW_VALUE_FLAG:
+                    value = OverflowValue.from_bytes(records_data[key_end:value_end], endianess)
+                else:
+                    value = self.value_serializer.from_bytes(records_data[key_end:value_end])
 
-                self.leaf_records.append(LeafRecord(key, value))
+                record_data = records_data[record_start:value_end]
+                self.leaf_records.append(LeafRecord(key, value, record_data, key_end - record_start))
+                record_start = value_end
         else:
             start = end
             end += NODE_POINTER_BYTE_SPACE
             self.first_node_page = int.from_bytes(data[start:end], endianess)
 
-            for _ in range(0, records_count):
-                start = end
-                end += NODE_POINTER_BYTE_SPACE
-                next_node_page = int.from_bytes(data[start:end], endianess)
+            # keys are only decoded when the records are accessed (a copy is kept as pages may be reused)
+            self.page_view = BPTNodeView(
+                bytes(data), max_key_size, max_value_size, endianess, self.key_serializer, self.value_serializer
+            )
+            self.has_subtree_counts = self.page_view.has_subtree_counts
+
+            if self.has_subtree_counts:
+                self.first_node_count = self.page_view.child_count(0)
+
+    def _load_columnar_leaf_records(self, data: PageData, columns_start: int, records_count: int) -> None:
+        """
+        Unpacks the key and value columns of a columnar leaf page with a single struct call for each column.
+        """
+        key_serializer: StructSerializer = self.key_serializer  # type: ignore
+        value_serializer: StructSerializer = self.value_serializer  # type: ignore
+        values_start = columns_start + records_count * key_serializer.size
+        values_end = values_start + records_count * value_serializer.size
+
+        keys = map(key_serializer.from_fields, key_serializer.struct.iter_unpack(data[columns_start:values_start]))
+        values = map(value_serializer.from_fields, value_serializer.struct.iter_unpack(data[values_start:values_end]))
 
-                start = end
-                end += max_key_size
-                key = self.key_serializer.from_bytes(data[start:end])
+        self.leaf_records = [LeafRecord(key, value) for key, value in zip(keys, values)]
 
-                self.inner_records.append(InnerRecord(key, next_node_page, None))
+    def _serialize_columnar_leaf_node(self, endianness: Endianness) -> bytes:
+        """
+        Packs the key and value columns of a columnar leaf page with a single struct call.
+        """
+        key_serializer: StructSerializer = self.key_serializer  # type: ignore
+        value_serializer: StructSerializer = self.value_serializer  # type: ignore
+        records_count = len(self.leaf_records)
+
+        if records_count * (key_serializer.size + value_serializer.size) >= MAX_PAGE_SIZE:
+            raise NodeOverflow(f"leaf with {self.records_count} records exceeds the max page size")
+
+        fields: List[Any] = []
+
+        for record in self.leaf_records:
+            fields += key_serializer.to_fields(record.key)
+
+        for record in self.leaf_records:
+            fields += value_serializer.to_fields(record.value)
+
+        columns_struct = fixed_width_struct(
+            BYTE_ORDERS[endianness] + key_serializer.format * records_count + value_serializer.format * records_count
+        )
+
+        node_data = [
+            COLUMNAR_LEAF_PAGE_TYPE.to_bytes(NODE_TYPE_BYTE_SPACE, endianness),
+            records_count.to_bytes(RECORDS_COUNT_BYTE_SPACE, endianness),
+            self.next_leaf_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness),
+            self.prev_leaf_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness),
+            columns_struct.pack(*fields),
+        ]
+
+        return b"".join(node_data)
 
     def _serialize_leaf_node(self, max_key_size: int, max_value_size: int, endianness: Endianness) -> bytes:
-        leaf_data = bytes()
-        leaf_data += self.next_leaf_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness)
+        slot_struct = struct.Struct(LEAF_RECORD_SLOT_FORMATS[endianness])
+        slots_data = [
+            self.next_leaf_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness),
+            self.prev_leaf_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness),
+        ]
+        records_data = []
+        records_end = 0
 
         # leaf_records must be in sorted order
         for record in self.leaf_records:
-            key_data = self.key_serializer.to_bytes(record.key)
-            value_data = self.value_serializer.to_bytes(record.value)
+            flags = OVERFLOW_VALUE_FLAG if isinstance(record.value, OverflowValue) else 0
 
-            if len(key_data) > max_key_size:
-                raise ValueError(f"key: {record.key} size exceeds max key size: {max_key_size}")
+            if record.record_data is None:
+                key_data = self.key_serializer.to_bytes(record.key)
+
+                if isinstance(record.value, OverflowValue):
+                    value_data = record.value.to_bytes(endianness)
+                else:
+                    value_data = self.value_serializer.to_bytes(record.value)
 
-            if len(value_data) > max_value_size:
-                raise ValueError(f"value: {record.value} size exceeds max value size: {max_value_size}")
+                if len(key_data) > max_key_size:
+                    raise ValueError(f"key: {record.key} size exceeds max key size: {max_key_size}")
 
-            leaf_data += key_data
-            leaf_data += bytes(max_key_size - len(key_data))  # padding
+                if len(value_data) > max_value_size and not flags & OVERFLOW_VALUE_FLAG:
+                    raise ValueError(f"value: {record.value} size exceeds max value size: {max_value_size}")
 
-            leaf_data += value_data
-            leaf_data += bytes(max_value_size - len(value_data))  # padding
+                record.record_data = key_data + value_data
+                record.key_size = len(key_data)
 
-        return leaf_data
+            # slots with the end offsets of the records which are stored after them
+            key_end = records_end + record.key_size
+            records_end += len(record.record_data)
+
+            if records_end >= MAX_PAGE_SIZE:
+                raise NodeOverflow(f"leaf with {self.records_count} records exceeds the max page size")
+
+            slots_data.append(slot_struct.pack(key_end, records_end, flags))
+            records_data.append(record.record_data)
+
+        return b"".join(slots_data) + b"".join(records_data)
 
     def _serialize_inner_node(self, max_key_size: int, endianness: Endianness) -> bytes:
-        inner_data = bytes()
-        inner_data += self.first_node_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness)
+        keys_data: List[bytes] = []
 
-        # page payload
         for inner_record in self.inner_records:
-            inner_data += inner_record.next_node_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness)
             key_data = self.key_serializer.to_bytes(inner_record.key)
 
             if len(key_data) > max_key_size:
                 raise ValueError(f"key: {inner_record.key} size exceeds max key size: {max_key_size}")
 
-            inner_data += key_data
-            inner_data += bytes(max_key_size - len(key_data))  # padding
+            keys_data.append(key_data)
+
+        # the common prefix of all keys is stored only once (commonprefix returns "" when there are no keys)
+        prefix = os.path.commonprefix(keys_data) or bytes()
+        slot_struct = struct.Struct(INNER_RECORD_SLOT_FORMATS[endianness])
+        suffixes_data = []
+        suffixes_end = 0
+
+        inner_data = [
+            self.first_node_page.to_bytes(NODE_POINTER_BYTE_SPACE, endianness),
+            len(prefix).to_bytes(KEY_PREFIX_SIZE_BYTE_SPACE, endianness),
+            prefix,
+        ]
+
+        # page payload: fixed-size slots with the end offsets of the keys' suffixes which are stored after them
+        for inner_record, key_data in zip(self.inner_records, keys_data):
+            suffix = key_data[len(prefix) :]
+            suffixes_end += len(suffix)
+
+            if suffixes_end >= MAX_PAGE_SIZE:
+                raise NodeOverflow(f"inner node with {self.records_count} records exceeds the max page size")
+
+            inner_data.append(slot_struct.pack(inner_record.next_node_page, suffixes_end))
+            suffixes_data.append(suffix)
+
+        if self.has_subtree_counts:
+            counts = [self.first_node_count] + [inner_record.next_node_count for inner_record in self.inner_records]
+            inner_data.append(struct.pack(f"{BYTE_ORDERS[endianness]}{len(counts)}Q", *counts))
+
+        return b"".join(inner_data) + b"".join(suffixes_data)
+
+
+class BPTNodeView(Generic[KT, VT]):
+    """
+    Read-only lazy view of a node (leaf or inner) over its raw disk page. Nothing is deserialized upfront: as
+    records are located by fixed-size slots, searches are binary searches that only decode the keys they probe
+    and values are decoded only when they're requested. It implements the search methods of BPTNode.
+    """
+
+    data: PageData
+    is_leaf: bool
+    records_count: int
+    slots_start: int
+
+    # inner nodes' key prefix compression
+    prefix: bytes
+    suffixes_start: int
+
+    # counted inner nodes' column of subtree records counts (between their slots and suffixes)
+    has_subtree_counts: bool
+    counts_start: int
+
+    # leaf nodes' records heap (or keys column of columnar leaves, followed by their values column)
+    records_start: int
+    is_columnar: bool
+    values_start: int
+
+    max_key_size: int
+    max_value_size: int
+    endianness: Endianness
+
+    key_serializer: Serializer[KT]
+    value_serializer: Serializer[VT]
+
+    def __init__(
+        self,
+        data: PageData,
+        max_key_size: int,
+        max_value_size: int,
+        endianness: Endianness,
+        key_serializer: Serializer[KT],
+        value_serializer: Serializer[VT],
+    ) -> None:
+        self.data = data
+        self.max_key_size = max_key_size
+        self.max_value_size = max_value_size
+        self.endianness = endianness
+        self.key_serializer = key_serializer
+        self.value_serializer = value_serializer
+
+        self.is_leaf = bool(data[0]) and data[0] != COUNTED_INNER_PAGE_TYPE
+        self.is_columnar = data[0] == COLUMNAR_LEAF_PAGE_TYPE
+        self.has_subtree_counts = data[0] == COUNTED_INNER_PAGE_TYPE
+        self.records_count = int.from_bytes(
+            data[NODE_TYPE_BYTE_SPACE : NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE], endianness
+        )
+
+        self.prefix = bytes()
+        self.slots_start = LEAF_NODES_HEADERS_SPACE
+        self.suffixes_start = 0
+        self.counts_start = 0
+        self.records_start = self.slots_start + self.records_count * LEAF_RECORD_SLOT_SPACE
+        self.values_start = 0
+
+        if self.is_columnar:
+            # columnar leaves have no slots: keys and values are located by their fixed sizes
+            self.records_start = LEAF_NODES_HEADERS_SPACE
+            self.values_start = self.records_start + self.records_count * self._key_size
+
+        if not self.is_leaf:
+            prefix_size_start = INNER_NODE_HEADERS_SPACE - KEY_PREFIX_SIZE_BYTE_SPACE
+            prefix_size = int.from_bytes(data[prefix_size_start:INNER_NODE_HEADERS_SPACE], endianness)
+
+            self.prefix = bytes(data[INNER_NODE_HEADERS_SPACE : INNER_NODE_HEADERS_SPACE + prefix_size])
+            self.slots_start = INNER_NODE_HEADERS_SPACE + prefix_size
+            self.suffixes_start = self.slots_start + self.records_count * INNER_RECORD_SLOT_SPACE
+
+            if self.has_subtree_counts:
+                self.counts_start = self.suffixes_start
+                self.suffixes_start += (self.records_count + 1) * SUBTREE_COUNT_BYTE_SPACE
+
+    @property
+    def next_leaf_page(self) -> int:
+        return self._read_pointer(NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE)
+
+    @property
+    def prev_leaf_page(self) -> int:
+        return self._read_pointer(PREV_LEAF_POINTER_OFFSET)
+
+    def key_at(self, i: int) -> KT:
+        """
+        Decodes only the key of the i-th record.
+        """
+        if self.is_columnar:
+            start = self.records_start + i * self._key_size
+            return self.key_serializer.from_bytes(self.data[start : start + self._key_size])
+
+        if self.is_leaf:
+            start, key_end, _, _ = self._read_leaf_record_bounds(i)
+
+            return self.key_serializer.from_bytes(self.data[self.records_start + start : self.records_start + key_end])
+
+        # the key's suffix starts where the previous key's suffix ends
+        offset = self.slots_start + i * INNER_RECORD_SLOT_SPACE + NODE_POINTER_BYTE_SPACE
+
+        if i > 0:
+            previous_offset = offset - INNER_RECORD_SLOT_SPACE
+            start, end = struct.unpack_from(KEY_OFFSETS_FORMATS[self.endianness], self.data, previous_offset)
+        else:
+            start, end = 0, int.from_bytes(self.data[offset : offset + KEY_OFFSET_BYTE_SPACE], self.endianness)
+
+        suffix = self.data[self.suffixes_start + start : self.suffixes_start + end]
+
+        return self.key_serializer.from_bytes(self.prefix + bytes(suffix))
+
+    def value_at(self, i: int) -> Union[VT, OverflowValue]:
+        """
+        Decodes only the value of the i-th leaf record (or its reference to overflow pages).
+        """
+        if self.is_columnar:
+            start = self.values_start + i * self._value_size
+            return self.value_serializer.from_bytes(self.data[start : start + self._value_size])
+
+        _, key_end, value_end, flags = self._read_leaf_record_bounds(i)
+        value_data = self.data[self.records_start + key_end : self.records_start + value_end]
+
+        if flags & OVERFLOW_VALUE_FLAG:
+            return OverflowValue.from_bytes(value_data, self.endianness)
+
+        return self.value_serializer.from_bytes(value_data)
+
+    def lower_bound(self, key: KT) -> int:
+        """
+        Binary searches the index of the first record whose key is not smaller than the given key. Columnar leaves
+        of NumPy scalars are searched with NumPy over their keys column.
+        """
+        if self.is_columnar and np is not None and self.key_serializer.numpy_dtype is not None:  # type: ignore
+            return int(np.searchsorted(self.key_array(), cast(Any, key)))  # keys are NumPy scalars here
+
+        lo = 0
+        hi = self.records_count
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+
+            if key > self.key_at(mid):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def find_record(self, key: KT) -> Optional[int]:
+        """
+        Returns the index of the leaf record with the given key or None if there's no such record.
+        """
+        i = self.lower_bound(key)
+
+        if i < self.records_count and key == self.key_at(i):
+            return i
+
+        return None
+
+    def child_index(self, key: KT) -> int:
+        """
+        Returns the index of the child whose subtree may contain the given key (see BPTNode.child_index).
+        """
+        return self.lower_bound(key)
+
+    def child_page(self, i: int) -> int:
+        """
+        Returns the disk page of the i-th child of an inner node.
+        """
+        if i == 0:
+            return self._read_pointer(NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE)
+
+        return self._read_pointer(self.slots_start + (i - 1) * INNER_RECORD_SLOT_SPACE)
+
+    def child_count(self, i: int) -> int:
+        """
+        Returns the records count of the subtree of the i-th child of a counted inner node.
+        """
+        start = self.counts_start + i * SUBTREE_COUNT_BYTE_SPACE
+
+        return int.from_bytes(self.data[start : start + SUBTREE_COUNT_BYTE_SPACE], self.endianness)
+
+    def child_node(self, i: int) -> Optional[BPTNode[KT, VT]]:  # pylint: disable=unused-argument,no-self-use
+        """
+        Views never hold in-memory children.
+        """
+        return None
+
+    def inner_records(self) -> List[InnerRecord[KT, VT]]:
+        """
+        Decodes all records of an inner node.
+        """
+        inner_records: List[InnerRecord[KT, VT]] = []
+        suffixes_data = bytes(self.data[self.suffixes_start :])
+        suffix_start = 0
+
+        # unpacks all (node_pointer, key_end) slots and subtree counts (of the next nodes) at once
+        slots_data = self.data[self.slots_start : self.slots_start + self.records_count * INNER_RECORD_SLOT_SPACE]
+        slots = struct.iter_unpack(INNER_RECORD_SLOT_FORMATS[self.endianness], slots_data)
+        counts = [0] * self.records_count
+
+        if self.has_subtree_counts:
+            counts_format = f"{BYTE_ORDERS[self.endianness]}{self.records_count}Q"
+            counts = list(struct.unpack_from(counts_format, self.data, self.counts_start + SUBTREE_COUNT_BYTE_SPACE))
+
+        for (next_node_page, suffix_end), next_node_count in zip(slots, counts):
+            key = self.key_serializer.from_bytes(self.prefix + suffixes_data[suffix_start:suffix_end])
+            suffix_start = suffix_end
+
+            inner_records.append(InnerRecord(key, next_node_page, None, next_node_count))
+
+        return inner_records
+
+    def key_array(self) -> np.ndarray:
+        """
+        Returns the keys column of a columnar leaf as a NumPy array over the page (without copying it).
+        """
+        return self._column_array(self.key_serializer, self.records_start)  # type: ignore
+
+    def value_array(self) -> np.ndarray:
+        """
+        Returns the values column of a columnar leaf as a NumPy array over the page (without copying it).
+        """
+        return self._column_array(self.value_serializer, self.values_start)  # type: ignore
+
+    @property
+    def _key_size(self) -> int:
+        return self.key_serializer.size  # type: ignore
+
+    @property
+    def _value_size(self) -> int:
+        return self.value_serializer.size  # type: ignore
+
+    def _column_array(self, serializer: StructSerializer, column_start: int) -> np.ndarray:
+        if not self.is_columnar or serializer.numpy_dtype is None:
+            raise ValueError("Only the columns of columnar leaves of NumPy scalars can be read as arrays!")
+
+        if np is None:
+            raise ImportError("NumPy is required to read the columns of leaves as arrays!")
+
+        return np.frombuffer(self.data, serializer.numpy_dtype, self.records_count, column_start)
+
+    def _read_pointer(self, start: int) -> int:
+        return int.from_bytes(self.data[start : start + NODE_POINTER_BYTE_SPACE], self.endianness)
+
+    def _read_leaf_record_bounds(self, i: int) -> Tuple[int, int, int, int]:
+        """
+        Reads the start, key end and value end offsets (within the records heap) and the flags of a leaf record.
+        """
+        offset = self.slots_start + i * LEAF_RECORD_SLOT_SPACE
+
+        # the record starts where the previous record's value ends
+        if i > 0:
+            previous_offset = offset - LEAF_RECORD_SLOT_SPACE + KEY_OFFSET_BYTE_SPACE
+            return struct.unpack_from(LEAF_RECORD_BOUNDS_FORMATS[self.endianness], self.data, previous_offset)
 
-        return inner_data
+        return (0,) + struct.unpack_from(LEAF_RECORD_SLOT_FORMATS[self.endianness], self.data, offset)
@@ -2,7 +2,12 @@
 Serializers of the B+tree used to perform disk operations.
 """
 import pickle
+import struct
+from functools import cached_property
+from typing import Any
+from typing import Optional
 from typing import Protocol
+from typing import Tuple
 from typing import Union
 
 from pystrukts._types.basic import Endianness
@@ -17,7 +22,7 @@ class Serializer(Protocol[T]):
     def to_bytes(self, object: T) -> bytes:
         """Serializes an object into a byte array."""
 
-    def from_bytes(self, some_bytes: Union[bytes, bytearray]) -> T:
+    def from_bytes(self, some_bytes: Union[bytes, bytearray, memoryview]) -> T:
         """Deserializes a byte array back into a Python object."""
 
 
@@ -31,8 +36,8 @@ class StrSerializer(Serializer[str]):
     def to_bytes(self, string: str) -> bytes:
         return string.encode(self.encoding)
 
-    def from_bytes(self, some_bytes: Union[bytes, bytearray]) -> str:
-        return some_bytes.decode(self.encoding)
+    def from_bytes(self, some_bytes: Union[bytes, bytearray, memoryview]) -> str:
+        return str(some_bytes, self.encoding)  # also decodes zero-copy memoryviews
 
 
 class IntSerializer(Serializer[int]):
@@ -45,10 +50,120 @@ class IntSerializer(Serializer[int]):
     def to_bytes(self, some_int: int) -> bytes:
         return some_int.to_bytes(4, self.endianness)
 
-    def from_bytes(self, some_bytes: Union[bytes, bytearray]) -> int:
+    def from_bytes(self, some_bytes: Union[bytes, bytearray, memoryview]) -> int:
         return int.from_bytes(some_bytes, self.endianness)
 
 
+class StructSerializer(Serializer[T]):
+    """
+    Base of the fixed-width serializers that are based on stdlib's struct formats (without their byte order
+    character). As all their objects have the same size, leaf pages whose keys and values both use struct
+    serializers are packed and unpacked with a single struct call for all of their records.
+    """
+
+    endianness: Endianness = "big"
+    format: str  # struct format of the object's fields
+    fields_count: int = 1  # number of struct fields of an object
+    numpy_type: Optional[str] = None  # NumPy type of the objects (without byte order) if they're NumPy scalars
+
+    @cached_property
+    def struct(self) -> struct.Struct:
+        return struct.Struct(f"{'>' if self.endianness == 'big' else '<'}{self.format}")
+
+    @property
+    def size(self) -> int:
+        return self.struct.size
+
+    @property
+    def numpy_dtype(self) -> Optional[str]:
+        """Returns the NumPy dtype of the objects or None if they can't be held by NumPy arrays."""
+        if self.numpy_type is None:
+            return None
+
+        return f"{'>' if self.endianness == 'big' else '<'}{self.numpy_type}"
+
+    def to_fields(self, some_object: T) -> Tuple[Any, ...]:
+        """Returns the struct fields of an object."""
+        return (some_object,)
+
+    def from_fields(self, fields: Tuple[Any, ...]) -> T:
+        """Builds an object back from its struct fields."""
+        return fields[0]
+
+    def to_bytes(self, some_object: T) -> bytes:
+        return self.struct.pack(*self.to_fields(some_object))
+
+    def from_bytes(self, some_bytes: Union[bytes, bytearray, memoryview]) -> T:
+        return self.from_fields(self.struct.unpack(some_bytes))
+
+
+class Int64Serializer(StructSerializer[int]):
+    """
+    Signed 64-bit int serializer.
+    """
+
+    format = "q"
+    numpy_type = "i8"
+
+
+class Float64Serializer(StructSerializer[float]):
+    """
+    Double-precision float serializer.
+    """
+
+    format = "d"
+    numpy_type = "f8"
+
+
+class FixedBytesSerializer(StructSerializer[bytes]):
+    """
+    Serializer of byte strings of a fixed length.
+    """
+
+    def __init__(self, length: int) -> None:
+        self.length = length
+        self.format = f"{length}s"
+        self.numpy_type = f"S{length}"
+
+    def to_fields(self, some_bytes: bytes) -> Tuple[Any, ...]:
+        if len(some_bytes) != self.length:
+            raise ValueError(f"bytes: {some_bytes!r} are not {self.length} bytes long")
+
+        return (some_bytes,)
+
+
+class TupleSerializer(StructSerializer[Tuple[Any, ...]]):
+    """
+    Serializer of tuples whose items are serialized by the given struct serializers (in order).
+    """
+
+    def __init__(self, *serializers: StructSerializer) -> None:
+        self.serializers = serializers
+        self.format = "".join(serializer.format for serializer in serializers)
+        self.fields_count = sum(serializer.fields_count for serializer in serializers)
+
+    def to_fields(self, some_tuple: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        if len(some_tuple) != len(self.serializers):
+            raise ValueError(f"tuple: {some_tuple} does not have {len(self.serializers)} items")
+
+        fields: Tuple[Any, ...] = ()
+
+        for serializer, item in zip(self.serializers, some_tuple):
+            fields += serializer.to_fields(item)
+
+        return fields
+
+    def from_fields(self, fields: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        items = []
+        start = 0
+
+        for serializer in self.serializers:
+            items.append(serializer.from_fields(fields[start : start + serializer.fields_count]))
+            start += serializer.fields_count
+
+        return tuple(items)
+
+
 class DefaultSerializer(Serializer[T]):
     """
     Default serializer based on stdlib's Pickle to be used in case a customized
@@ -58,5 +173,5 @@ class DefaultSerializer(Serializer[T]):
     def to_bytes(self, object) -> bytes:
         return pickle.dumps(object)
 
-    def from_bytes(self, bytes: Union[bytes, bytearray]) -> T:
+    def from_bytes(self, bytes: Union[bytes, bytearray, memoryview]) -> T:
         return pickle.loads(bytes)
@@ -3,47 +3,122 @@ Module with settings for the B+tree structure.
 
 Metadata page memory layout:
 
-+------------------------- disk page size -------------------------+
-| page_size_space |  key_size_space |  value_size_space |  unused  |
-|     4 byte      |     4 bytes     |    4 bytes        |    ...   |
-+------------------------------------------------------------------+
++---------------------------------------------- disk page size ----------------------------------------------- ... -+
+| page_size | key_size | value_size | free_list | version | root_page | height | records | last_page | flags  | ... |
+|  4 bytes  |  4 bytes |  4 bytes   |  4 bytes  | 2 bytes |  4 bytes  | 4 bytes| 8 bytes |  4 bytes  | 1 byte | ... |
++------------------------------------------------------------------------------------------------------------- ... -+
 
-Inner nodes memory layout:
+where free_list = page number of the first free page (0 if there are no free pages), version = tree file format
+version, root_page = page number of the root node, height = number of levels of the tree, records = number of keys
+stored on the tree, last_page = page number of the last allocated page of the file and flags = optional features
+of the tree (e.g. subtree counts on inner nodes). Hence, opening a tree file only reads this page.
 
-+------------------------------- disk page size ------------------------------- ... -+
-| node_type |  records_count | first_node_pointer | node_pointer |    key    |  ...  |
-|   1 byte  |     4 bytes    |       4 bytes      |   4 bytes    |  K bytes  |  ...  |
-+-------------------------------------------------------------------------------...--+
- ^~~~~~~~~~~~~~~~~~ page headers ~~~~~~~~~~~~~~~~^ ^~~~ each inner record ~~~~^
+Free pages (released by deletions) are chained into a free list that is reused by new allocations:
 
-where K = user-defined max key size (which must fit the page size)
++------------------- disk page size -------------------+
+| node_type (free) | next_free_page_pointer |  unused  |
+|      1 byte      |        4 bytes         |    ...   |
++------------------------------------------------------+
 
-Leaf nodes have a different memory layout, so the max. amount of children (2*degree - 1)
-it can sustain is different than inner nodes (that only stores keys and node pointers):
+Inner nodes memory layout: separator keys are stored with prefix compression, i.e., the common prefix of all the
+serialized keys of the page is stored once and each record only carries the rest of its key (suffix):
 
-+-------------------------------- disk page size ---------------------------- ... -+
-| node_type |  records_count |  next_leaf_pointer |    key    |   value    |  ...  |
-|   1 byte  |     4 bytes    |       4 bytes      |  K bytes  |   V bytes  |  ...  |
-+-----------------------------------------------------------------------------...--+
-^~~~~~~~~~~~~~~~~~~ page headers ~~~~~~~~~~~~~~~~^ ^~~ each leaf record ~~~^
++---------------------------------------------- disk page size ------------------------------------------ ... -+
+| node_type | records_count | first_node_pointer | prefix_size |  prefix  | node_pointer | key_end |  ...  | suffixes |
+|   1 byte  |    4 bytes    |       4 bytes      |   2 bytes   |  P bytes |   4 bytes    | 2 bytes |  ...  |   ...    |
++--------------------------------------------------------------------------------------------------------- ... -+
+ ^~~~~~~~~~~~~~~~~~~~~~~~~~~ page headers ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~^ ^~ each inner record ~~^
 
-where K = user-defined max key size, V = user-defined max value size
+where P = size of the common prefix, key_end = end offset of the record's key suffix within the suffixes area (the
+suffix of the i-th key starts at the end offset of the (i-1)-th key), so keys take only as much space as they need
+and can still be randomly accessed for binary searches. Each serialized key must fit the user-defined max key size K.
+
+Inner nodes of trees with order statistics are counted pages: their slots are followed by a column with the number of
+records of each child's subtree (first node's included), so ranks are summed up on the way down the tree:
+
++------------------------------------ disk page size ------------------------------------- ... -+
+| node_type (counted) | ... | node_pointer | key_end | ... |     subtree_counts      | suffixes |
+|       1 byte        | ... |   4 bytes    | 2 bytes | ... | (records_count + 1) * 8 |   ...    |
++----------------------------------------------------------------------------------------- ... -+
+
+Leaf nodes are slotted pages: a directory of fixed-size slots is followed by a heap with the variable-length
+records (key followed by value), so leaves hold as many records as their actual sizes allow:
+
++---------------------------------------------- disk page size ------------------------------------------------- ... -+
+| node_type | records_count | next_leaf_pointer | prev_leaf_pointer | key_end | value_end | flags | ... |   records   |
+|   1 byte  |    4 bytes    |      4 bytes      |      4 bytes      | 2 bytes |  2 bytes  | 1 byte| ... | key + value |
++--------------------------------------------------------------------------------------------------------------- ... -+
+ ^~~~~~~~~~~~~~~~~~~~~~~~~~ page headers ~~~~~~~~~~~~~~~~~~~~~~~~~~^ ^~~~~ each record slot ~~~~~^
+
+where next_leaf_pointer and prev_leaf_pointer = page numbers of the leaf's right and left siblings (0 if there's no
+such sibling), so leaves form a doubly linked list in key order, and key_end and value_end = end offsets of the
+record's key and value within the records heap (each record starts where the previous one ends). Keys must fit the
+user-defined max key size K. Values bigger than the user-defined max value size V are stored on a chain of overflow
+pages instead and the record only holds a reference to it (flags = 1):
+
++---- overflow value reference ----+
+| first_overflow_page | value_size |
+|       4 bytes       |   4 bytes  |
++----------------------------------+
+
++---------------------- disk page size ----------------------+
+| node_type (overflow) | next_overflow_page |  value bytes  |
+|        1 byte        |      4 bytes       |      ...      |
++-----------------------------------------------------------+
+
+Leaves whose keys and values are all of the same size (struct serializers) are columnar pages instead: all keys are
+stored contiguously and followed by all values, so no slots are needed and the columns can be read as arrays:
+
++--------------------------------------------------- disk page size ------------------------------------------ ... -+
+| node_type (columnar) | records_count | next_leaf_pointer | prev_leaf_pointer |   keys column    |   values column   |
+|        1 byte        |    4 bytes    |      4 bytes      |      4 bytes      | records_count * K | records_count * V |
++------------------------------------------------------------------------------------------------------------ ... -+
+
+where K and V = sizes of the keys and values of the struct serializers.
 """
 
 # paged file memory layout: tree metadata page
 PAGE_SIZE_BYTE_SPACE: int = 4
 MAX_KEY_SIZE_BYTE_SPACE: int = 4
 MAX_VALUE_SIZE_BYTE_SPACE: int = 4
+FREE_LIST_HEAD_BYTE_SPACE: int = 4
+FORMAT_VERSION_BYTE_SPACE: int = 2
+TREE_HEIGHT_BYTE_SPACE: int = 4
+TREE_RECORDS_COUNT_BYTE_SPACE: int = 8  # int64
+TREE_FLAGS_BYTE_SPACE: int = 1
+ORDER_STATISTICS_FLAG: int = 1
+TREE_FORMAT_VERSION: int = 2  # version 2 added the previous leaf pointers
 
 # paged file memory layout: file page header settings
 NODE_TYPE_BYTE_SPACE: int = 1
 RECORDS_COUNT_BYTE_SPACE: int = 4  # int32
+FREE_PAGE_TYPE: int = 2  # node types of leaves and inner nodes are 1 and 0
+OVERFLOW_PAGE_TYPE: int = 3
+COLUMNAR_LEAF_PAGE_TYPE: int = 4
+COUNTED_INNER_PAGE_TYPE: int = 5
 
 # paged file memory layout: file page payload settings
 NODE_POINTER_BYTE_SPACE: int = 4
 
 # inner nodes
-INNER_NODE_HEADERS_SPACE = NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE
+KEY_PREFIX_SIZE_BYTE_SPACE: int = 2
+KEY_OFFSET_BYTE_SPACE: int = 2
+INNER_NODE_HEADERS_SPACE = (
+    NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE + NODE_POINTER_BYTE_SPACE + KEY_PREFIX_SIZE_BYTE_SPACE
+)
+INNER_RECORD_SLOT_SPACE = NODE_POINTER_BYTE_SPACE + KEY_OFFSET_BYTE_SPACE
+SUBTREE_COUNT_BYTE_SPACE: int = 8  # int64
+MAX_PAGE_SIZE: int = 1 << 16  # offsets within a page must fit KEY_OFFSET_BYTE_SPACE and VALUE_OFFSET_BYTE_SPACE
 
 # leaf nodes
-LEAF_NODES_HEADERS_SPACE = NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE + NODE_POINTER_BYTE_SPACE
+VALUE_OFFSET_BYTE_SPACE: int = 2
+RECORD_FLAGS_BYTE_SPACE: int = 1
+PREV_LEAF_POINTER_OFFSET = NODE_TYPE_BYTE_SPACE + RECORDS_COUNT_BYTE_SPACE + NODE_POINTER_BYTE_SPACE
+LEAF_NODES_HEADERS_SPACE = PREV_LEAF_POINTER_OFFSET + NODE_POINTER_BYTE_SPACE
+LEAF_RECORD_SLOT_SPACE = KEY_OFFSET_BYTE_SPACE + VALUE_OFFSET_BYTE_SPACE + RECORD_FLAGS_BYTE_SPACE
+OVERFLOW_VALUE_FLAG: int = 1
+
+# overflow pages
+VALUE_SIZE_BYTE_SPACE: int = 4
+OVERFLOW_VALUE_REFERENCE_SPACE = NODE_POINTER_BYTE_SPACE + VALUE_SIZE_BYTE_SPACE
+OVERFLOW_PAGE_HEADERS_SPACE = NODE_TYPE_BYTE_SPACE + NODE_POINTER_BYTE_SPACE
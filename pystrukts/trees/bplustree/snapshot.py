@@ -0,0 +1,148 @@
+"""
+Module with read-only snapshots of the B+tree.
+"""
+# pylint: disable=protected-access
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Generic
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+
+from pystrukts._types.comparable import KT
+from pystrukts._types.comparable import VT
+from pystrukts.trees.bplustree.memory import PageData
+from pystrukts.trees.bplustree.memory import PageSnapshot
+from pystrukts.trees.bplustree.node import BPTNode
+
+if TYPE_CHECKING:
+    from pystrukts.trees.bplustree.bplustree import BPlusTree
+
+
+class TreeSnapshot(Generic[KT, VT]):
+    """
+    Read-only view of a B+tree pinned to the root, height and records count that the tree had when the snapshot
+    was taken. All its pages are read as they were at that time, so long scans see a consistent tree while writers
+    keep changing it. Snapshots can be read by other threads than the writer's one (for concurrent trees).
+    """
+
+    tree: BPlusTree[KT, VT]
+    page_snapshot: Optional[PageSnapshot]
+
+    def __init__(self, tree: BPlusTree[KT, VT], page_snapshot: PageSnapshot) -> None:
+        self.tree = tree
+        self.page_snapshot = page_snapshot
+
+    def __enter__(self) -> TreeSnapshot[KT, VT]:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def get(self, key: KT) -> Optional[VT]:
+        """
+        Looks for a key on the snapshot. If it's not found, returns None.
+        """
+        node = self.tree._view_from_page(self._read_page(self.snapshot.root_page))
+        fence: Optional[KT] = None  # separator to the right of the leaf
+
+        while not node.is_leaf:
+            j = node.child_index(key)
+
+            if j < node.records_count:
+                fence = node.key_at(j)
+
+            node = self.tree._view_from_page(self._read_page(node.child_page(j)))
+
+        i = node.find_record(key)
+
+        # duplicates of a separator's key may continue on the next leaf (as in BPlusTree.get)
+        if i is None and fence == key and node.next_leaf_page != 0:
+            node = self.tree._view_from_page(self._read_page(node.next_leaf_page))
+            i = node.find_record(key)
+
+        if i is None:
+            return None
+
+        return self.tree._load_value(node.value_at(i), self._read_page)
+
+    def items(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[Tuple[KT, VT]]:
+        """
+        Yields the (key, value) pairs of the snapshot whose keys are within [lo, hi) in key order. If lo or hi are
+        None, the range is unbounded on that side.
+        """
+        node = self._read_node(self.snapshot.root_page)
+
+        while not node.is_leaf:
+            node = self._read_node(node.child_page(0 if lo is None else node.child_index(lo)))
+
+        while True:
+            for record in node.leaf_records:
+                if lo is not None and record.key < lo:
+                    continue
+
+                if hi is not None and record.key >= hi:
+                    return
+
+                yield record.key, self.tree._load_value(record.value, self._read_page)
+
+            if node.next_leaf_page == 0:  # page 0 is the metadata page, so it's never a leaf
+                return
+
+            node = self._read_node(node.next_leaf_page)
+
+    def keys(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[KT]:
+        """
+        Yields the keys of the snapshot within [lo, hi) in order.
+        """
+        for key, _ in self.items(lo, hi):
+            yield key
+
+    def values(self, lo: Optional[KT] = None, hi: Optional[KT] = None) -> Iterator[VT]:
+        """
+        Yields the values of the keys of the snapshot within [lo, hi) in key order.
+        """
+        for _, value in self.items(lo, hi):
+            yield value
+
+    def __len__(self) -> int:
+        """
+        Returns the number of keys that the B+tree had when the snapshot was taken.
+        """
+        return self.snapshot.records_count
+
+    @property
+    def height(self) -> int:
+        """
+        Returns the number of levels that the B+tree had when the snapshot was taken.
+        """
+        return self.snapshot.tree_height
+
+    @property
+    def snapshot(self) -> PageSnapshot:
+        if self.page_snapshot is None:
+            raise ValueError("The snapshot was closed and it can't be read anymore!")
+
+        return self.page_snapshot
+
+    def close(self) -> None:
+        """
+        Releases the snapshot so that writes stop preserving pages for it. Closing it twice has no effect.
+        """
+        if self.page_snapshot is not None:
+            self.tree.memory.release_snapshot(self.page_snapshot)
+            self.page_snapshot = None
+
+    def _read_page(self, page_number: int) -> PageData:
+        """
+        Reads a page as it was when the snapshot was taken.
+        """
+        return self.tree.memory.read_snapshot_page(self.snapshot, page_number)
+
+    def _read_node(self, page_number: int) -> BPTNode[KT, VT]:
+        """
+        Reads a node as it was when the snapshot was taken.
+        """
+        return self.tree._node_from_page(page_number, self._read_page(page_number))
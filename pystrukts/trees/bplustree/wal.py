@@ -0,0 +1,273 @@
+"""
+Write-ahead log (WAL) used by the B+tree for crash safety.
+
+Every page written by a tree operation (insert, delete, etc.) is appended to the log as a full page image and the
+operation is sealed by a commit record. Pages only reach the tree file on checkpoints, after their log records are
+durable, so a crash in the middle of an operation (e.g. between the page writes of a split) never leaves the tree
+file with half of an operation: on open, the log is replayed and only the page images of committed operations are
+applied. Log records are fsynced in groups of operations (group commit) which turns the random page writes of the
+commit path into sequential appends. With a group commit interval, a timer fsyncs the last commits of a group that
+doesn't fill up, so that no commit waits longer than the interval to be durable.
+
+Log file memory layout: a header with the page size followed by page and commit records.
+
++------ log header -----+
+|      page_size        |
+|       4 bytes         |
++-----------------------+
+
++------------------------ page record ------------------------+
+| record_type |  page_number |     page image     |  crc32   |
+|   1 byte    |    4 bytes   |  page_size bytes   | 4 bytes  |
++-------------------------------------------------------------+
+
++----- commit record -----+
+| record_type |   crc32   |
+|   1 byte    |  4 bytes  |
++-------------------------+
+
+where crc32 is the checksum of the record's previous bytes, so torn records at the end of the log are detected.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import zlib
+from typing import BinaryIO
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from pystrukts._types.basic import Endianness
+from pystrukts._types.basic import StrPath
+from pystrukts.trees.bplustree.settings import NODE_POINTER_BYTE_SPACE
+from pystrukts.trees.bplustree.settings import PAGE_SIZE_BYTE_SPACE
+
+WAL_RECORD_TYPE_BYTE_SPACE: int = 1
+WAL_CHECKSUM_BYTE_SPACE: int = 4
+
+WAL_PAGE_RECORD: int = 1
+WAL_COMMIT_RECORD: int = 2
+
+
+class WriteAheadLog:
+    """
+    Redo log of page images with group commit. It also keeps the latest image of each logged page until it's
+    written to the tree file by a checkpoint, so that reads can be served before that.
+    """
+
+    log_file: BinaryIO
+    log_file_path: StrPath
+    page_size: int
+    endianness: Endianness
+
+    # group commit settings
+    group_commit_size: int  # fsync after this amount of commits
+    group_commit_interval: Optional[float]  # or fsync if this amount of ms has passed since the last fsync
+    checkpoint_size: int  # log size (bytes) that triggers a checkpoint
+
+    # state
+    pages: Dict[int, bytes]  # latest logged images of pages not yet written to the tree file
+    pending_records: List[Tuple[int, bytes]]  # page images of the current (uncommitted) operation
+    unsynced_commits: int
+    last_sync_time: float
+    sync_timer: Optional[threading.Timer]  # fsyncs the unsynced commits once the group commit interval has passed
+    sync_lock: threading.RLock
+    log_size: int
+
+    def __init__(
+        self,
+        log_file_path: StrPath,
+        page_size: int,
+        endianness: Endianness = "big",
+        group_commit_size: int = 1,
+        group_commit_interval: Optional[float] = None,
+        checkpoint_size: int = 1 << 22,
+    ) -> None:
+        if group_commit_size <= 0:
+            raise ValueError(f"Group commit size must be positive and not: {group_commit_size}!")
+
+        self.log_file_path = log_file_path
+        self.page_size = page_size
+        self.endianness = endianness
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.checkpoint_size = checkpoint_size
+
+        self.pages = dict()
+        self.pending_records = []
+        self.unsynced_commits = 0
+        self.last_sync_time = time.monotonic()
+        self.sync_timer = None
+        self.sync_lock = threading.RLock()
+
+        # previous logs must have been replayed already, so they are truncated
+        self.log_file = open(log_file_path, "wb", buffering=0)
+        self.log_size = 0
+        self._write_header()
+
+    def log_page(self, page_number: int, data: Union[bytes, bytearray]) -> None:
+        """
+        Logs a page image of the current operation. It's only appended to the log file on commit.
+        """
+        page_image = bytes(data)
+
+        self.pending_records.append((page_number, page_image))
+        self.pages[page_number] = page_image
+
+    def commit(self) -> None:
+        """
+        Appends the page images of the current operation followed by a commit record to the log with a single write.
+        The log is fsynced once enough operations have been committed or enough time has passed since the last fsync:
+        if no other operation commits by then, the sync timer fsyncs it.
+        """
+        if not self.pending_records:
+            return
+
+        log_data = bytes()
+
+        for page_number, page_image in self.pending_records:
+            record = WAL_PAGE_RECORD.to_bytes(WAL_RECORD_TYPE_BYTE_SPACE, self.endianness)
+            record += page_number.to_bytes(NODE_POINTER_BYTE_SPACE, self.endianness)
+            record += page_image
+
+            log_data += record + checksum(record, self.endianness)
+
+        record = WAL_COMMIT_RECORD.to_bytes(WAL_RECORD_TYPE_BYTE_SPACE, self.endianness)
+        log_data += record + checksum(record, self.endianness)
+
+        with self.sync_lock:
+            self._append(log_data)
+            self.pending_records = []
+            self.unsynced_commits += 1
+
+            elapsed_ms = (time.monotonic() - self.last_sync_time) * 1000
+            remaining_ms = None if self.group_commit_interval is None else self.group_commit_interval - elapsed_ms
+
+            if self.unsynced_commits >= self.group_commit_size or (remaining_ms is not None and remaining_ms <= 0):
+                self.sync()
+            elif remaining_ms is not None and self.sync_timer is None:
+                # commits that don't fill up their group are fsynced once the interval has passed anyway
+                self.sync_timer = threading.Timer(remaining_ms / 1000, self.sync)
+                self.sync_timer.daemon = True
+                self.sync_timer.start()
+
+    def sync(self) -> None:
+        """
+        Makes all committed operations durable (it's also called by the sync timer from its own thread).
+        """
+        with self.sync_lock:
+            if self.sync_timer is not None:
+                self.sync_timer.cancel()
+                self.sync_timer = None
+
+            if self.unsynced_commits > 0 and not self.log_file.closed:
+                os.fsync(self.log_file.fileno())
+
+            self.unsynced_commits = 0
+            self.last_sync_time = time.monotonic()
+
+    def needs_checkpoint(self) -> bool:
+        """
+        Checks whether the log has grown enough to be checkpointed.
+        """
+        return self.log_size >= self.checkpoint_size
+
+    def checkpoint(self, write_function: Callable[[int, bytes], None], sync_function: Callable[[], None]) -> None:
+        """
+        Writes all committed page images to the tree file in page order, makes them durable with the given
+        sync function and then empties the log.
+        """
+        self.commit()
+        self.sync()
+
+        for page_number in sorted(self.pages):
+            write_function(page_number, self.pages[page_number])
+
+        sync_function()
+
+        self.pages = dict()
+        self.log_file.seek(0)  # truncating doesn't move the file's cursor
+        self.log_file.truncate()
+        self.log_size = 0
+        self._write_header()
+
+    def close(self) -> None:
+        """
+        Makes committed operations durable and closes the log file.
+        """
+        self.sync()
+        self.log_file.close()
+
+    def _write_header(self) -> None:
+        self._append(self.page_size.to_bytes(PAGE_SIZE_BYTE_SPACE, self.endianness))
+        os.fsync(self.log_file.fileno())
+
+    def _append(self, data: bytes) -> None:
+        written_bytes = 0
+
+        # write() may actually write less than the data size, so we iterate to guarantee full write
+        while written_bytes < len(data):
+            written_bytes += self.log_file.write(data[written_bytes:])
+
+        self.log_size += len(data)
+
+
+def replay_log(log_file_path: StrPath, write_function: Callable[[int, bytes], None], endianness: Endianness) -> int:
+    """
+    Applies the page images of all committed operations found on a log file with the given write function and
+    returns how many operations were replayed. Reading stops at the first torn or corrupted record, so the
+    operations that were not fully committed before a crash are discarded.
+    """
+    with open(log_file_path, "rb") as log_file:
+        log_data = log_file.read()
+
+    replayed_operations = 0
+
+    if len(log_data) < PAGE_SIZE_BYTE_SPACE:
+        return replayed_operations
+
+    page_size = int.from_bytes(log_data[:PAGE_SIZE_BYTE_SPACE], endianness)
+    operation_records: List[Tuple[int, bytes]] = []
+    start = PAGE_SIZE_BYTE_SPACE
+
+    while True:
+        record_type = int.from_bytes(log_data[start : start + WAL_RECORD_TYPE_BYTE_SPACE], endianness)
+        end = start + WAL_RECORD_TYPE_BYTE_SPACE
+
+        if record_type == WAL_PAGE_RECORD:
+            end += NODE_POINTER_BYTE_SPACE + page_size
+
+        if record_type not in (WAL_PAGE_RECORD, WAL_COMMIT_RECORD) or end + WAL_CHECKSUM_BYTE_SPACE > len(log_data):
+            break
+
+        record = log_data[start:end]
+
+        if log_data[end : end + WAL_CHECKSUM_BYTE_SPACE] != checksum(record, endianness):
+            break
+
+        if record_type == WAL_PAGE_RECORD:
+            page_start = WAL_RECORD_TYPE_BYTE_SPACE + NODE_POINTER_BYTE_SPACE
+            page_number = int.from_bytes(record[WAL_RECORD_TYPE_BYTE_SPACE:page_start], endianness)
+            operation_records.append((page_number, record[page_start:]))
+        else:
+            for page_number, page_image in operation_records:
+                write_function(page_number, page_image)
+
+            operation_records = []
+            replayed_operations += 1
+
+        start = end + WAL_CHECKSUM_BYTE_SPACE
+
+    return replayed_operations
+
+
+def checksum(record: bytes, endianness: Endianness) -> bytes:
+    """
+    CRC32 checksum of a log record.
+    """
+    return zlib.crc32(record).to_bytes(WAL_CHECKSUM_BYTE_SPACE, endianness)
@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import unittest
+from collections import Counter
+from tempfile import TemporaryDirectory
+
+from benchmarks.bplustree import WORKLOADS
+from benchmarks.bplustree import ZipfianGenerator
+from benchmarks.bplustree import run_benchmarks
+from benchmarks.compare import compare_results
+from benchmarks.compare import load_results
+from benchmarks.compare import main
+
+
+class TestSuiteBPlusTreeBenchmarks(unittest.TestCase):
+    """
+    B+tree benchmarks testing suite.
+    """
+
+    def test_should_run_every_workload_of_every_case(self):
+        """
+        Should run all workloads for each combination of keys, page sizes and serializers.
+        """
+        # act
+        results = run_benchmarks(keys=[100], page_sizes=[1024], operations=50, scans=5, scan_length=10, opens=2)
+
+        # assert
+        cases = [(result["workload"], result["serializer"]) for result in results["results"]]
+
+        self.assertListEqual(
+            cases, [(workload, serializer) for serializer in ("int", "str", "pickle") for workload in WORKLOADS]
+        )
+        self.assertTrue(all(result["ops_per_second"] > 0 for result in results["results"]))
+        self.assertEqual(results["results"][3]["operations"], 50)  # get_sequential
+        self.assertEqual(results["results"][6]["operations"], 5 * 10)  # range_scan reads 10 records per scan
+        self.assertEqual(results["metadata"]["options"]["repeat"], 1)
+
+    def test_should_skew_zipfian_keys_towards_a_few_hot_keys(self):
+        """
+        Should draw keys within the key space where the hottest key is drawn much more often than a uniform one.
+        """
+        # arrange
+        generator = ZipfianGenerator(1000, random.Random(42))
+
+        # act
+        counts = Counter(generator.next() for _ in range(0, 10000))
+
+        # assert
+        self.assertTrue(all(0 <= key < 1000 for key in counts))
+        self.assertGreater(counts.most_common(1)[0][1], 10 * 10)  # 10 draws per key if they were uniform
+
+    def test_should_report_cases_that_regressed_beyond_the_threshold(self):
+        """
+        Should flag the cases of the candidate run that are slower than the baseline by more than the threshold and
+        exit with status 1.
+        """
+        with TemporaryDirectory() as directory:
+            # arrange
+            baseline_file = os.path.join(directory, "baseline.json")
+            candidate_file = os.path.join(directory, "candidate.json")
+            baseline = {"results": [_result("get_random", 1000.0), _result("range_scan", 1000.0)]}
+            candidate = {"results": [_result("get_random", 500.0), _result("range_scan", 950.0)]}
+
+            for results_file, results in ((baseline_file, baseline), (candidate_file, candidate)):
+                with open(results_file, "w") as results_data:
+                    json.dump(results, results_data)
+
+            # act
+            comparisons = compare_results(load_results(baseline_file), load_results(candidate_file), threshold=0.1)
+            status = main([baseline_file, candidate_file, "--threshold", "0.6"])
+
+            # assert
+            self.assertListEqual([comparison.is_regression for comparison in comparisons], [True, False])
+            self.assertAlmostEqual(comparisons[0].change, -0.5)
+            self.assertEqual(main([baseline_file, candidate_file]), 1)
+            self.assertEqual(status, 0)
+
+
+def _result(workload: str, ops_per_second: float) -> dict:
+    return {"workload": workload, "serializer": "int", "keys": 100, "page_size": 4096, "ops_per_second": ops_per_second}
@@ -1,9 +1,34 @@
+import os
+import random
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from unittest.mock import patch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]  # tests that need NumPy are skipped when np is None
 
 from pystrukts._types.basic import Endianness
 from pystrukts.trees.bplustree.bplustree import BPlusTree
+from pystrukts.trees.bplustree.exceptions import BufferPoolFull
+from pystrukts.trees.bplustree.exceptions import ReadOnlyTreeFile
+from pystrukts.trees.bplustree.memory import BufferPool
+from pystrukts.trees.bplustree.memory import ClockEvictionPolicy
+from pystrukts.trees.bplustree.memory import LRUEvictionPolicy
+from pystrukts.trees.bplustree.memory import MmapPagedFileMemory
 from pystrukts.trees.bplustree.memory import PagedFileMemory
+from pystrukts.trees.bplustree.memory import ZlibPagedFileMemory
+from pystrukts.trees.bplustree.node import BPTNode
+from pystrukts.trees.bplustree.node import BPTNodeView
 from pystrukts.trees.bplustree.node import LeafRecord
+from pystrukts.trees.bplustree.serializers import DefaultSerializer
+from pystrukts.trees.bplustree.serializers import FixedBytesSerializer
+from pystrukts.trees.bplustree.serializers import Float64Serializer
+from pystrukts.trees.bplustree.serializers import Int64Serializer
+from pystrukts.trees.bplustree.serializers import TupleSerializer
+from pystrukts.trees.bplustree.settings import COLUMNAR_LEAF_PAGE_TYPE
 from tests.trees.utils import tmp_btree_file
 
 
@@ -41,23 +66,158 @@ class TestSuiteBPlusTree(unittest.TestCase):
         """
         with tmp_btree_file() as btree_file:
             # arrange
-            page_size = len(b"bytearray page 0")
+            page_size = 64  # fits the metadata page
             memory = self.create_paged_file_memory(btree_file, page_size=page_size)
 
             # act
-            memory.write_page(0, b"bytearray page 0")
-            memory.write_page(1, b"bytearray page 1")
+            memory.write_page(0, b"bytearray page 0".ljust(page_size, b"\x00"))
+            memory.write_page(1, b"bytearray page 1".ljust(page_size, b"\x00"))
 
             # assert
             page_0 = memory.read_page(0)
             page_1 = memory.read_page(1)
 
-            str_0 = page_0.decode("utf-8")
-            str_1 = page_1.decode("utf-8")
+            str_0 = page_0.rstrip(b"\x00").decode("utf-8")
+            str_1 = page_1.rstrip(b"\x00").decode("utf-8")
 
             self.assertEqual(str_0, "bytearray page 0")
             self.assertEqual(str_1, "bytearray page 1")
 
+    def test_buffer_pool_should_evict_least_recently_used_pages_and_write_back_dirty_ones(self):
+        """
+        BufferPool with LRU eviction should evict the least recently used page and flush it if it's dirty.
+        """
+        # arrange
+        flushed_pages = dict()
+        pool = BufferPool(2 * 16, 16, flushed_pages.__setitem__, LRUEvictionPolicy())
+
+        pool.put_page(1, b"page 1", is_dirty=True)
+        pool.put_page(2, b"page 2")
+        pool.get_page(1)  # page 2 becomes the least recently used page
+
+        # act
+        pool.put_page(3, b"page 3")
+
+        # assert
+        self.assertIsNone(pool.get_page(2))
+        self.assertEqual(pool.get_page(1), b"page 1")
+        self.assertEqual(flushed_pages, dict())
+
+        # act - page 3 is now the least recently used page, then the dirty page 1
+        pool.get_page(3)
+        pool.put_page(4, b"page 4")
+
+        # assert
+        self.assertEqual(flushed_pages, {1: b"page 1"})
+        self.assertNotIn(1, pool)
+        self.assertEqual(pool.hits, 3)
+        self.assertEqual(pool.misses, 1)
+
+    def test_buffer_pool_should_give_second_chance_with_clock_and_never_evict_pinned_pages(self):
+        """
+        BufferPool with CLOCK eviction should skip referenced and pinned pages and raise when all pages are pinned.
+        """
+        # arrange
+        pool = BufferPool(3 * 16, 16, lambda page_number, data: None, ClockEvictionPolicy())
+
+        pool.put_page(1, b"page 1")
+        pool.put_page(2, b"page 2")
+        pool.put_page(3, b"page 3")
+        pool.pin_page(1)
+
+        # act - hand clears all reference bits, skips pinned page 1 and evicts page 2
+        pool.put_page(4, b"page 4")
+
+        # assert
+        self.assertIn(1, pool)
+        self.assertNotIn(2, pool)
+        self.assertIn(3, pool)
+        self.assertIn(4, pool)
+
+        # act and assert - no evictable pages
+        pool.pin_page(3)
+        pool.pin_page(4)
+
+        self.assertRaises(BufferPoolFull, pool.put_page, 5, b"page 5")
+
+    def test_should_serve_hot_pages_from_buffer_pool_without_disk_reads(self):
+        """
+        Should serve repeated lookups from the buffer pool without reading the tree file again.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=68, max_key_size=5, max_value_size=5, buffer_pool_size=68 * 8
+            )
+
+            for i in range(1, 9):
+                tree.insert(i, i)
+
+            # act
+            with patch.object(tree.memory, "_read_from_disk", wraps=tree.memory._read_from_disk) as disk_read:
+                for _ in range(0, 10):
+                    for i in range(1, 9):
+                        self.assertEqual(tree.get(i), i)
+
+            # assert
+            disk_read.assert_not_called()
+            self.assertGreater(tree.memory.buffer_pool.hits, 0)
+
+    def test_mmap_paged_file_memory_should_serve_pages_as_views_and_grow_in_extents(self):
+        """
+        MmapPagedFileMemory should return zero-copy page views, grow the file in extents and shrink it on close.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            memory = MmapPagedFileMemory(page_size=64, tree_file=btree_file, extent_size=64 * 16)
+
+            # act
+            page_number = memory.allocate_page()
+            memory.write_page(page_number, b"mmap page".ljust(64, b"\x00"))
+            page_data = memory.read_page(page_number)
+
+            # assert
+            self.assertIsInstance(page_data, memoryview)
+            self.assertEqual(bytes(page_data[:9]), b"mmap page")
+            self.assertEqual(os.path.getsize(btree_file), 64 * 16)
+
+            # act - close and reopen the file
+            del page_data
+            memory.close()
+            reopened_memory = MmapPagedFileMemory(tree_file=btree_file)
+
+            # assert
+            self.assertEqual(os.path.getsize(btree_file), 64 * 2)
+            self.assertEqual(reopened_memory.page_size, 64)
+            self.assertEqual(reopened_memory.last_used_page, 1)
+            self.assertEqual(bytes(reopened_memory.read_page(1)[:9]), b"mmap page")
+            reopened_memory.close()
+
+    def test_should_insert_and_find_keys_on_mmap_backed_bplustree(self):
+        """
+        Should insert and find keys on a B+tree stored on a memory-mapped tree file.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=68, max_key_size=5, max_value_size=5, storage="mmap"
+            )
+
+            # act
+            for i in range(1, 5):
+                tree.insert(i, i * 10)
+
+            tree.close()
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file, storage="mmap")
+
+            # assert
+            for i in range(1, 5):
+                self.assertEqual(tree_from_disk.get(i), i * 10)
+
+            self.assertIsNone(tree_from_disk.get(5))
+            self.assertRaises(ValueError, BPlusTree, btree_file, storage="tape")
+            tree_from_disk.close()
+
     def test_should_read_previous_tree_configuration_stored_on_disk(self):
         """
         Should read previous tree configuration stored on disk.
@@ -127,7 +287,7 @@ class TestSuiteBPlusTree(unittest.TestCase):
         """
         with tmp_btree_file() as btree_file:
             # arrange - t == 2 for leaves
-            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=39, max_key_size=5, max_value_size=5)
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=68, max_key_size=5, max_value_size=5)
 
             # act - insert until root node is split
             tree.insert(1, 1)
@@ -177,6 +337,1411 @@ class TestSuiteBPlusTree(unittest.TestCase):
             self.assertIsNone(tree_from_disk.get(101))
             self.assertIsNone(tree_from_disk.get(-1))
 
+    def test_should_insert_shuffled_keys_on_multi_level_bplustree(self):
+        """
+        Should insert shuffled keys on a B+tree whose inner and leaf nodes are split many times.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange - t == 4 for leaves and t == 6 for inner nodes
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            keys = list(range(0, 2000))
+            random.Random(7).shuffle(keys)
+
+            # act
+            for key in keys:
+                tree.insert(key, key * 2)
+
+            # assert
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            for key in keys:
+                self.assertEqual(tree.get(key), key * 2)
+                self.assertEqual(tree_from_disk.get(key), key * 2)
+
+            self.assertIsNone(tree_from_disk.get(2000))
+
+    def test_should_bulk_load_bplustree_from_sorted_items(self):
+        """
+        Should bulk load a B+tree from sorted items with chained leaves and keep inserting keys afterwards.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+
+            # act
+            tree.bulk_load(((key, key) for key in range(0, 1000, 2)), fill_factor=0.75)
+
+            # assert - leaves fill up to 75% of their pages and are chained from left to right
+            leaf = tree.root
+
+            while not leaf.is_leaf:
+                leaf = tree._disk_read(leaf.first_node_page)
+
+            chained_keys = []
+
+            while True:
+                self.assertLessEqual(len(leaf.serialize(16, 16, tree.endianness)), 256 * 0.75)
+                chained_keys.extend(record.key for record in leaf.leaf_records)
+
+                if leaf.next_leaf_page == 0:
+                    break
+
+                leaf = tree._disk_read(leaf.next_leaf_page)
+
+            self.assertListEqual(chained_keys, list(range(0, 1000, 2)))
+
+            # act - inserts keys in between the bulk loaded ones
+            for key in range(1, 1000, 2):
+                tree.insert(key, key)
+
+            # assert
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            for key in range(0, 1000):
+                self.assertEqual(tree_from_disk.get(key), key)
+
+    def test_should_not_bulk_load_unsorted_items_or_non_empty_bplustree(self):
+        """
+        Should not bulk load items that are not sorted by key or a B+tree that is not empty.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+
+            # act and assert
+            self.assertRaises(ValueError, tree.bulk_load, [(1, 1), (3, 3), (2, 2)])
+            self.assertRaises(ValueError, tree.bulk_load, [(1, 1)], 1.5)
+
+            # arrange
+            tree.insert(1, 1)
+
+            # act and assert
+            self.assertRaises(ValueError, tree.bulk_load, [(2, 2)])
+
+    def test_should_scan_key_ranges_in_order_through_linked_leaves(self):
+        """
+        Should scan key ranges in order by streaming the linked leaves of the B+tree.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, str] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=24)
+            keys = list(range(0, 500, 5))
+            random.Random(3).shuffle(keys)
+
+            for key in keys:
+                tree.insert(key, f"value {key}")
+
+            # act
+            all_items = list(tree.items())
+            range_items = list(tree.items(42, 100))
+
+            # assert
+            self.assertListEqual(all_items, [(key, f"value {key}") for key in range(0, 500, 5)])
+            self.assertListEqual(range_items, [(key, f"value {key}") for key in range(45, 100, 5)])
+            self.assertListEqual(list(tree.keys(hi=20)), [0, 5, 10, 15])
+            self.assertListEqual(list(tree.keys(lo=490)), [490, 495])
+            self.assertListEqual(list(tree.values(100, 111)), ["value 100", "value 105", "value 110"])
+            self.assertListEqual(list(tree.items(501, 600)), [])
+
+            # assert - scans read each leaf only once instead of descending the tree for each of the 20 keys
+            with patch.object(tree, "_disk_read", wraps=tree._disk_read) as disk_read:
+                list(tree.items(0, 100))
+
+            self.assertLess(disk_read.call_count, 20)
+
+    def test_should_search_nodes_lazily_over_raw_disk_pages(self):
+        """
+        Should binary search leaf pages decoding only the probed keys and the value of the found record.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange - one full leaf on the root page
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=4096, max_key_size=16, max_value_size=16)
+            tree.bulk_load((key, key * 3) for key in range(0, 127))
+
+            key_serializer = DefaultSerializer[int]()
+            value_serializer = DefaultSerializer[int]()
+            memory = tree.memory
+            view = BPTNodeView(memory.read_page(memory.root_page), 16, 16, "big", key_serializer, value_serializer)
+
+            # act
+            with patch.object(key_serializer, "from_bytes", wraps=key_serializer.from_bytes) as key_decoding:
+                with patch.object(value_serializer, "from_bytes", wraps=value_serializer.from_bytes) as value_decoding:
+                    found_index = view.find_record(100)
+                    found_value = view.value_at(found_index)
+                    missing_index = view.find_record(1000)
+
+            # assert
+            self.assertTrue(view.is_leaf)
+            self.assertEqual(view.records_count, 127)
+            self.assertEqual(found_index, 100)
+            self.assertEqual(found_value, 300)
+            self.assertIsNone(missing_index)
+            self.assertLessEqual(key_decoding.call_count, 2 * 8)  # log2(127) probes for each search
+            self.assertEqual(value_decoding.call_count, 1)
+
+            # act and assert - tree lookups on a reopened tree (nothing in memory but the root)
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            for key in range(0, 127):
+                self.assertEqual(tree_from_disk.get(key), key * 3)
+
+    def test_should_delete_keys_keeping_nodes_balanced(self):
+        """
+        Should delete keys from a B+tree borrowing records from siblings and merging nodes as they underflow.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            keys = list(range(0, 1000))
+            random.Random(5).shuffle(keys)
+
+            for key in keys:
+                tree.insert(key, key)
+
+            # act
+            deleted = [tree.delete(key) for key in keys[:900]]
+
+            # assert
+            self.assertTrue(all(deleted))
+            self.assertFalse(tree.delete(keys[0]))
+            self.assertListEqual(list(tree.keys()), sorted(keys[900:]))
+
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            for key in keys[:900]:
+                self.assertIsNone(tree_from_disk.get(key))
+
+            for key in keys[900:]:
+                self.assertEqual(tree_from_disk.get(key), key)
+
+            # act - deletes what is left
+            deleted_count = tree.delete_range(hi=500) + tree.delete_range(500)
+
+            # assert
+            self.assertEqual(deleted_count, 100)
+            self.assertTrue(tree.root.is_leaf)
+            self.assertListEqual(list(tree.items()), [])
+
+    def test_should_reuse_pages_released_by_deletions(self):
+        """
+        Should keep freed pages on a persistent free list that is reused by new allocations.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+
+            for key in range(0, 500):
+                tree.insert(key, key)
+
+            last_used_page = tree.memory.last_used_page
+
+            # act
+            self.assertEqual(tree.delete_range(0, 500), 500)
+            free_list_head = tree.memory.free_list_head
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            for key in range(0, 500):
+                tree_from_disk.insert(key, key)
+
+            # assert
+            self.assertNotEqual(free_list_head, 0)
+            self.assertEqual(tree_from_disk.memory.last_used_page, last_used_page)
+            self.assertListEqual(list(tree_from_disk.keys()), list(range(0, 500)))
+
+    def test_should_defer_page_writes_until_flush_in_write_back_mode(self):
+        """
+        Should write each dirty page only once when flushing many inserts on the same leaf in write-back mode.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=4096, max_key_size=16, max_value_size=16, write_back=True
+            )
+
+            # act
+            with patch.object(tree.memory, "_write_to_disk", wraps=tree.memory._write_to_disk) as disk_write:
+                for key in range(0, 50):
+                    tree.insert(key, key)
+
+                writes_before_flush = disk_write.call_count
+                tree.flush()
+
+            # assert
+            self.assertEqual(writes_before_flush, 0)
+            self.assertEqual(disk_write.call_count, 2)  # the root leaf and the metadata page (records count)
+            self.assertListEqual(list(BPlusTree(btree_file).keys()), list(range(0, 50)))
+
+    def test_should_write_transaction_pages_once_on_exit_and_discard_them_on_errors(self):
+        """
+        Should write the dirty pages of a transaction once when it exits and roll them back if it raises.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=16, buffer_pool_size=256 * 4
+            )
+
+            # act
+            with patch.object(tree.memory, "_write_to_disk", wraps=tree.memory._write_to_disk) as disk_write:
+                with tree.transaction():
+                    for key in range(0, 200):
+                        tree.insert(key, key)
+
+            # assert - each page is written only once
+            written_pages = [call.args[0] for call in disk_write.call_args_list]
+
+            self.assertEqual(len(written_pages), len(set(written_pages)))
+            self.assertListEqual(list(BPlusTree(btree_file).keys()), list(range(0, 200)))
+
+            # act - a failing transaction
+            with self.assertRaises(RuntimeError):
+                with tree.transaction():
+                    for key in range(200, 400):
+                        tree.insert(key, key)
+
+                    tree.delete(0)
+                    raise RuntimeError("transaction failure")
+
+            # assert - nothing from the failed transaction is persisted or kept in memory
+            self.assertListEqual(list(tree.keys()), list(range(0, 200)))
+            self.assertListEqual(list(BPlusTree(btree_file).keys()), list(range(0, 200)))
+
+            tree.insert(200, 200)
+            self.assertListEqual(list(BPlusTree(btree_file).keys()), list(range(0, 201)))
+
+    def test_should_delete_all_duplicates_of_keys_that_straddle_leaves(self):
+        """
+        Should delete every record of keys whose duplicates straddle leaves, one by one or within key ranges.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, key) for key in range(0, 100))
+            tree.insert_many([(20, -1)] * 40 + [(60, -1)] * 40 + [(90, -1)] * 5)
+
+            # act
+            deleted_count = tree.delete_range(15, 25)
+            deleted = [tree.delete(60) for _ in range(0, 42)]
+
+            # assert
+            self.assertEqual(deleted_count, 50)
+            self.assertListEqual(deleted, [True] * 41 + [False])
+            self.assertEqual(tree.delete_range(90, 91), 6)
+            self.assertListEqual(
+                list(tree.keys()), [key for key in range(0, 100) if not 15 <= key < 25 and key not in (60, 90)]
+            )
+            self.assertEqual(len(tree), 88)
+
+    def test_should_insert_and_upsert_batches_of_keys(self):
+        """
+        Should insert batches of unsorted keys, keeping duplicates on insert_many and replacing values on upsert_many.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            keys = list(range(0, 1000))
+            random.Random(7).shuffle(keys)
+
+            # act
+            tree.insert_many((key, key) for key in keys[:500])
+            tree.insert_many([(key, key) for key in keys[500:]] + [(10, 7)])
+            tree.upsert_many([(key, key * 2) for key in range(0, 1000, 3)] + [(3, 42)])
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            # assert
+            expected_values = {key: key * 2 if key % 3 == 0 else key for key in range(0, 1000)}
+            expected_values[3] = 42
+
+            self.assertListEqual(list(tree_from_disk.values(10, 11)), [10, 7])
+            self.assertListEqual(list(tree_from_disk.keys()), sorted(list(range(0, 1000)) + [10]))
+            self.assertTrue(all(tree_from_disk.get(key) == value for key, value in expected_values.items()))
+
+    def test_should_keep_duplicate_keys_reachable_across_leaf_splits(self):
+        """
+        Should split leaves at key boundaries so that all the records of a key stay on the same leaf and still find
+        and delete the duplicates of a key with more records than fit a leaf, which straddle leaves.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+
+            for key in range(0, 100):
+                tree.insert(key, key)
+
+            # act
+            for value in range(0, 8):
+                tree.insert(50, value)
+
+            # assert
+            leaves = [tree._disk_read(page).leaf_records for page in self.read_leaf_chain(tree)]
+
+            self.assertEqual(len([leaf for leaf in leaves if any(record.key == 50 for record in leaf)]), 1)
+            self.assertEqual(tree.get(50), 50)
+            self.assertListEqual([tree.delete(50) for _ in range(0, 10)], [True] * 9 + [False])
+            self.assertIsNone(tree.get(50))
+            self.assertListEqual(list(tree.keys()), [key for key in range(0, 100) if key != 50])
+
+            # act - duplicates that don't fit a leaf are found once their first leaf runs out of them
+            tree.insert_many((7, value) for value in range(0, 40))
+            tree.compact(fill_factor=0.5)
+            values = []
+
+            while tree.delete(7):
+                with tree.snapshot() as snapshot:
+                    values.append((tree.get(7), snapshot.get(7)))
+
+            # assert
+            self.assertListEqual(values, [(value, value) for value in range(0, 40)] + [(None, None)])
+            self.assertListEqual(list(tree.keys()), [key for key in range(0, 100) if key not in (7, 50)])
+
+    def test_should_upsert_keys_whose_duplicates_straddle_leaves(self):
+        """
+        Should replace a value of a key whose duplicates straddle two leaves instead of inserting the key again, also
+        once the first of these leaves runs out of them.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, key) for key in range(0, 100))
+            tree.insert_many((30, 30) for _ in range(0, 30))
+
+            for copies in range(31, 0, -1):
+                # act
+                tree.upsert_many([(29, -copies), (30, -copies), (31, -copies)])
+
+                # assert
+                self.assertEqual(len(list(tree.values(30, 31))), copies)
+                self.assertIn(-copies, tree.values(30, 31))
+                self.assertListEqual(list(tree.values(29, 30)) + list(tree.values(31, 32)), [-copies, -copies])
+                self.assertEqual(len(tree), 130 - (31 - copies))
+
+                tree.delete(30)
+
+    def test_should_write_fewer_pages_with_batched_inserts(self):
+        """
+        Should write each touched page once per batch instead of once per inserted key.
+        """
+        with tmp_btree_file() as btree_file, tmp_btree_file() as other_btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            other_tree: BPlusTree[int, int] = BPlusTree(
+                other_btree_file, page_size=256, max_key_size=16, max_value_size=16
+            )
+            items = [(key, key) for key in range(0, 500)]
+
+            # act
+            with patch.object(tree.memory, "write_page", wraps=tree.memory.write_page) as batch_writes:
+                tree.insert_many(items)
+
+            with patch.object(other_tree.memory, "write_page", wraps=other_tree.memory.write_page) as single_writes:
+                for key, value in items:
+                    other_tree.insert(key, value)
+
+            # assert
+            self.assertListEqual(list(tree.items()), items)
+            self.assertLess(batch_writes.call_count * 4, single_writes.call_count)
+
+    def test_should_store_shortest_separators_on_prefix_compressed_inner_nodes(self):
+        """
+        Should truncate separators of str keys and pack more than (2t - 1) prefix compressed keys in inner nodes.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[str, int] = BPlusTree(btree_file, page_size=1024, max_key_size=64, max_value_size=16)
+            keys = [f"/api/v1/users/{i:08d}/profile" for i in range(0, 2000)]
+            shuffled_keys = keys[:]
+            random.Random(3).shuffle(shuffled_keys)
+
+            # act
+            tree.bulk_load((key, i) for i, key in enumerate(keys))
+            inner_node = tree._disk_read(tree.root.first_node_page)
+
+            deleted = [tree.delete(key) for key in shuffled_keys[:1000]]
+
+            for key in shuffled_keys[:500]:
+                tree.insert(key, 5000)
+
+            tree_from_disk: BPlusTree[str, int] = BPlusTree(btree_file)
+
+            # assert
+            self.assertEqual(tree._separator("/api/v1/a123", "/api/v1/a300"), "/api/v1/a3")
+            self.assertEqual(tree._separator("/api/v1/a123", "/api/v1/a2"), "/api/v1/a13")
+            self.assertEqual(tree._separator("/api/v1/a", "/api/v1/ab"), "/api/v1/a")
+            self.assertEqual(tree._separator(b"ab\xff\x01", b"ac"), b"ab\xff\x02")
+            self.assertEqual(tree._separator(10, 20), 10)
+
+            self.assertFalse(inner_node.is_leaf)
+            self.assertEqual(inner_node.key_at(0), "/api/v1/users/00000018")
+            self.assertGreater(inner_node.records_count, 2 * tree.inner_degree - 1)
+
+            self.assertTrue(all(deleted))
+            self.assertListEqual(list(tree_from_disk.keys()), sorted(shuffled_keys[:500] + shuffled_keys[1000:]))
+
+            for key in shuffled_keys[:500]:
+                self.assertEqual(tree_from_disk.get(key), 5000)
+
+            for key in shuffled_keys[500:1000]:
+                self.assertIsNone(tree_from_disk.get(key))
+
+    def test_should_store_variable_length_values_on_slotted_leaves_and_overflow_pages(self):
+        """
+        Should pack leaves by the real size of their records and store values bigger than the max value size on
+        chains of overflow pages which are released when the values are replaced or deleted.
+        """
+        with tmp_btree_file() as btree_file, tmp_btree_file() as other_btree_file:
+            # arrange
+            tree: BPlusTree[int, bytes] = BPlusTree(btree_file, page_size=512, max_key_size=16, max_value_size=64)
+            values = {key: bytes([key % 256]) * (10 + key * 41 % 2048) for key in range(0, 200)}
+
+            # act
+            tree.insert_many(values.items())
+            last_used_page = tree.memory.last_used_page
+
+            for key in range(0, 200, 2):
+                tree.delete(key)
+
+            tree.upsert_many((key, b"small") for key in range(1, 200, 4))
+            tree.insert(1000, b"x" * 4000)
+
+            tree_from_disk: BPlusTree[int, bytes] = BPlusTree(btree_file)
+            small_tree: BPlusTree[int, bytes] = BPlusTree(
+                other_btree_file, page_size=512, max_key_size=16, max_value_size=64
+            )
+            small_tree.bulk_load((key, b"v") for key in range(0, 1000))
+            leaf = small_tree.root
+
+            while not leaf.is_leaf:
+                leaf = small_tree._disk_read(leaf.first_node_page)
+
+            # assert
+            expected = {key: values[key] for key in range(1, 200, 2)}
+            expected.update({key: b"small" for key in range(1, 200, 4)})
+            expected[1000] = b"x" * 4000
+
+            self.assertDictEqual(dict(tree_from_disk.items()), expected)
+            self.assertTrue(all(tree_from_disk.get(key) == value for key, value in expected.items()))
+            self.assertEqual(tree_from_disk.memory.last_used_page, last_used_page)  # freed overflow pages reused
+
+            self.assertGreater(leaf.records_count, 2 * small_tree.leaf_degree - 1)
+
+    def test_should_persist_root_height_and_records_count_on_metadata_page(self):
+        """
+        Should keep the root page, height and records count on the metadata page so that reopening the tree and
+        counting its keys don't depend on the tree file size or on traversals.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=68, max_key_size=5, max_value_size=5)
+
+            # act
+            for key in range(0, 3):
+                tree.insert(key, key)
+
+            with patch.object(tree.memory, "write_page", wraps=tree.memory.write_page) as page_writes:
+                tree.insert(3, 3)  # splits the root leaf
+
+            tree.upsert_many((key, key * 2) for key in range(0, 100))
+            tree.delete(50)
+            tree.delete(1000)
+            tree.close()
+
+            with open(btree_file, "ab") as tree_file:
+                tree_file.write(bytes(64 * 10))  # unused pages (e.g. of a mmap extent) are ignored
+
+            tree_from_disk: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            # assert
+            written_pages = [call.args[0] for call in page_writes.call_args_list]
+
+            self.assertListEqual(sorted(written_pages), [0, 1, 2, 2, 3, 3])  # new pages are zeroed on allocation
+            self.assertEqual(len(tree_from_disk), 99)
+            self.assertEqual(tree_from_disk.height, tree.height)
+            self.assertGreater(tree_from_disk.height, 2)
+            self.assertNotEqual(tree_from_disk.memory.root_page, 1)
+            self.assertEqual(tree_from_disk.memory.last_used_page, tree.memory.last_used_page)
+            self.assertListEqual(list(tree_from_disk.keys()), [key for key in range(0, 100) if key != 50])
+
+            # act - empties the tree
+            tree_from_disk.delete_range()
+
+            # assert
+            self.assertEqual(len(tree_from_disk), 0)
+            self.assertEqual(tree_from_disk.height, 1)
+            self.assertTrue(tree_from_disk.root.is_leaf)
+
+    def test_should_serve_lookups_from_many_threads_while_a_writer_inserts_keys(self):
+        """
+        Should serve concurrent lookups and scans from a thread pool while another thread inserts new keys.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=16, buffer_pool_size=256 * 8, concurrent=True
+            )
+            tree.insert_many((key, key) for key in range(0, 2000, 2))
+
+            def lookup(key: int) -> bool:
+                return tree.get(key) == key and tree.get(key + 1) in (None, key + 1)
+
+            def insert_odd_keys() -> None:
+                for key in range(1, 2000, 2):
+                    tree.insert(key, key)
+
+            # act
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                writer = executor.submit(insert_odd_keys)
+                lookups = list(executor.map(lookup, list(range(0, 2000, 2)) * 4))
+                scans = [executor.submit(lambda: list(tree.keys(100, 200))) for _ in range(0, 8)]
+                writer.result()
+
+            # assert
+            self.assertTrue(all(lookups))
+            self.assertTrue(all(set(range(100, 200, 2)) <= set(scan.result()) for scan in scans))
+            self.assertListEqual(list(tree.keys()), list(range(0, 2000)))
+
+            # act and assert - a reader can't become a writer while it holds the latch
+            with tree.latch.reading():
+                self.assertRaises(RuntimeError, tree.insert, 2000, 2000)
+                self.assertEqual(tree.get(0), 0)
+
+            with tree.latch.writing():
+                tree.insert(2000, 2000)  # writers may reenter the latch
+
+            self.assertEqual(len(tree), 2001)
+
+    def test_should_refuse_writes_of_a_thread_with_a_partially_consumed_scan_on_concurrent_trees(self):
+        """
+        Should keep the read latch of a concurrent tree while a scan is partially consumed, so the scanning thread
+        can't write to the tree until the scan is closed.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=16, concurrent=True
+            )
+            tree.insert_many((key, key) for key in range(0, 100))
+            scan = tree.items()
+
+            # act
+            first_item = next(scan)
+
+            # assert
+            self.assertEqual(first_item, (0, 0))
+            self.assertRaises(RuntimeError, tree.insert, 100, 100)
+            self.assertRaises(RuntimeError, tree.delete, 0)
+            self.assertEqual(tree.get(50), 50)  # reads are still allowed
+
+            # act - closing the scan releases the latch
+            scan.close()
+            tree.insert(100, 100)
+
+            # assert
+            self.assertEqual(len(tree), 101)
+            tree.close()
+
+    def test_should_serve_lookups_from_read_only_trees_and_refresh_them_after_writer_commits(self):
+        """
+        Should open a tree file in read-only mode (mapped read-only), refuse changes and see the operations
+        committed by the writer (even the ones not checkpointed from its log yet) once it's refreshed.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            writer: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=16, storage="mmap", wal=True
+            )
+            writer.insert_many((key, key) for key in range(0, 500))
+            writer.checkpoint()
+
+            reader: BPlusTree[int, int] = BPlusTree(btree_file, storage="mmap", read_only=True)
+            file_reader: BPlusTree[int, int] = BPlusTree(btree_file, read_only=True)
+            tree_file_size = os.path.getsize(btree_file)
+
+            # act
+            writer.insert_many((key, key) for key in range(500, 1000))  # committed on the log only
+            writer.delete(0)
+            keys_before_refresh = list(reader.keys())
+
+            reader.refresh()
+            file_reader.refresh()
+
+            # assert
+            self.assertListEqual(keys_before_refresh, list(range(0, 500)))
+            self.assertListEqual(list(reader.keys()), list(range(1, 1000)))
+            self.assertListEqual(list(file_reader.keys()), list(range(1, 1000)))
+            self.assertEqual(len(reader), 999)
+            self.assertEqual(reader.get(999), 999)
+
+            self.assertRaises(ReadOnlyTreeFile, reader.insert, 1000, 1000)
+            self.assertRaises(ReadOnlyTreeFile, reader.delete, 1)
+            self.assertRaises(ReadOnlyTreeFile, file_reader.memory.write_page, 1, bytes(256))
+            self.assertEqual(len(reader), 999)
+
+            # act - readers never change the tree file
+            reader.close()
+            file_reader.close()
+
+            # assert
+            self.assertEqual(os.path.getsize(btree_file), tree_file_size)
+            self.assertRaises(FileNotFoundError, BPlusTree, btree_file + ".missing", read_only=True)
+            writer.close()
+
+    def test_should_read_consistent_snapshots_while_the_tree_is_changed(self):
+        """
+        Should keep serving a snapshot as the tree was when it was taken while keys are inserted (splitting
+        nodes), replaced by overflow values and deleted, and release its preserved pages once it's closed.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, str] = BPlusTree(
+                btree_file, page_size=128, max_key_size=16, max_value_size=16, storage="mmap"
+            )
+            tree.insert_many((key, f"v{key}") for key in range(0, 300, 3))
+            height = tree.height
+            snapshot = tree.snapshot()
+            scan = snapshot.items()
+            first_items = [next(scan) for _ in range(0, 10)]
+
+            # act
+            tree.insert_many((key, f"v{key}") for key in range(1, 300, 3))
+            tree.upsert_many((key, f"overflow-{key}" * 10) for key in range(0, 300, 6))
+            tree.delete_range(150, 300)
+
+            # assert - the snapshot keeps its view, even for the scan that was in progress
+            self.assertListEqual(first_items + list(scan), [(key, f"v{key}") for key in range(0, 300, 3)])
+            self.assertEqual(snapshot.get(297), "v297")
+            self.assertEqual(snapshot.get(6), "v6")
+            self.assertIsNone(snapshot.get(1))
+            self.assertEqual(len(snapshot), 100)
+            self.assertEqual(snapshot.height, height)
+
+            self.assertEqual(tree.get(6), "overflow-6" * 10)
+            self.assertListEqual(list(tree.keys(0, 7)), [0, 1, 3, 4, 6])
+            self.assertEqual(len(tree), 100)
+            self.assertGreater(len(snapshot.page_snapshot.preserved_pages), 0)
+
+            # act - snapshots taken later see the changes and closed snapshots stop preserving pages
+            with tree.snapshot() as later_snapshot:
+                later_keys = list(later_snapshot.keys(0, 7))
+
+            snapshot.close()
+            tree.insert(1000, "v1000")
+
+            # assert
+            self.assertListEqual(later_keys, [0, 1, 3, 4, 6])
+            self.assertListEqual(tree.memory.snapshots, [])
+            self.assertRaises(ValueError, snapshot.get, 0)
+            tree.close()
+
+    def test_should_spill_before_images_of_snapshots_beyond_their_main_memory_budget(self):
+        """
+        Should keep at most max_preserved_pages before-images of a snapshot in main memory, read the others from
+        the spill file (shared by the snapshots) and delete the spill file once all snapshots are closed.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, str] = BPlusTree(btree_file, page_size=128, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, f"v{key}") for key in range(0, 300, 3))
+            snapshot = tree.snapshot(max_preserved_pages=2)
+            other_snapshot = tree.snapshot(max_preserved_pages=2)
+
+            # act
+            tree.upsert_many((key, f"w{key}") for key in range(0, 300, 3))
+            spill_file = tree.memory.snapshot_spill_file
+
+            # assert
+            self.assertEqual(len(snapshot.page_snapshot.preserved_pages), 2)
+            self.assertGreater(len(snapshot.page_snapshot.spilled_pages), 0)
+            self.assertDictEqual(snapshot.page_snapshot.spilled_pages, other_snapshot.page_snapshot.spilled_pages)
+            self.assertListEqual(list(snapshot.items()), [(key, f"v{key}") for key in range(0, 300, 3)])
+            self.assertListEqual(list(other_snapshot.values(0, 9)), ["v0", "v3", "v6"])
+            self.assertEqual(tree.get(3), "w3")
+
+            # act
+            snapshot.close()
+
+            # assert - the spill file is kept for the open snapshot
+            self.assertFalse(spill_file.closed)
+
+            # act
+            other_snapshot.close()
+
+            # assert
+            self.assertTrue(spill_file.closed)
+            self.assertIsNone(tree.memory.snapshot_spill_file)
+            tree.close()
+
+    def test_should_scan_snapshots_from_other_threads_while_a_writer_inserts_keys(self):
+        """
+        Should scan a snapshot of a concurrent tree from many threads while another thread keeps inserting keys.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=16, buffer_pool_size=256 * 8, concurrent=True
+            )
+            tree.insert_many((key, key) for key in range(0, 2000, 2))
+
+            def insert_odd_keys() -> None:
+                for key in range(1, 2000, 2):
+                    tree.insert(key, key)
+
+            # act
+            with tree.snapshot() as snapshot, ThreadPoolExecutor(max_workers=4) as executor:
+                writer = executor.submit(insert_odd_keys)
+                scans = [executor.submit(lambda: list(snapshot.items())) for _ in range(0, 4)]
+                writer.result()
+
+            # assert
+            for scan in scans:
+                self.assertListEqual(scan.result(), [(key, key) for key in range(0, 2000, 2)])
+
+            self.assertListEqual(list(tree.keys()), list(range(0, 2000)))
+
+    def test_should_pack_fixed_width_records_of_struct_serializers_with_whole_page_batches(self):
+        """
+        Should serialize int64, float64, fixed-length bytes and tuples of them with struct serializers and pack or
+        unpack all records of a leaf at once while keeping the slotted leaf page layout.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            key_serializer = TupleSerializer(Int64Serializer(), FixedBytesSerializer(4))
+            value_serializer = Float64Serializer()
+            tree: BPlusTree = BPlusTree(
+                btree_file,
+                key_serializer=key_serializer,
+                value_serializer=value_serializer,
+                page_size=512,
+                max_key_size=12,
+                max_value_size=8,
+            )
+
+            # act
+            tree.insert_many(((-key, b"key!"), key / 2) for key in range(0, 1000))
+            tree.close()
+
+            tree_from_disk: BPlusTree = BPlusTree(
+                btree_file, key_serializer=key_serializer, value_serializer=value_serializer
+            )
+            leaf_page = tree_from_disk.memory.read_page(tree_from_disk._find_leaf(None).disk_page)
+            view = BPTNodeView(leaf_page, 12, 8, "big", key_serializer, value_serializer)
+
+            # assert - records are fixed-width and lazy views decode them through their slots
+            self.assertEqual(key_serializer.to_bytes((-1, b"key!")), (-1).to_bytes(8, "big", signed=True) + b"key!")
+            self.assertEqual(key_serializer.from_bytes(key_serializer.to_bytes((2**40, b"abcd"))), (2**40, b"abcd"))
+            self.assertEqual(value_serializer.size, 8)
+            self.assertRaises(ValueError, key_serializer.to_bytes, (1, b"abc"))
+            self.assertEqual(view.key_at(0), (-999, b"key!"))
+            self.assertEqual(view.value_at(0), 499.5)
+            self.assertEqual(tree_from_disk.get((-500, b"key!")), 250.0)
+            self.assertIsNone(tree_from_disk.get((-500, b"key?")))
+            self.assertListEqual(list(tree_from_disk.values()), [key / 2 for key in range(999, -1, -1)])
+
+            # act and assert - whole leaves are packed and unpacked without serializing records one by one
+            int_serializer = Int64Serializer()
+            leaf: BPTNode = BPTNode(True, 1, int_serializer, int_serializer)
+            leaf.leaf_records = [LeafRecord(key, key * 10) for key in range(0, 20)]
+            leaf_from_disk: BPTNode = BPTNode(True, 1, int_serializer, int_serializer)
+
+            with patch.object(int_serializer, "to_bytes") as encoding:
+                with patch.object(int_serializer, "from_bytes") as decoding:
+                    leaf_from_disk.load_from_page(leaf.to_page(512, 8, 8, "big"), 8, 8, "big")
+
+            self.assertEqual(encoding.call_count + decoding.call_count, 0)
+            self.assertListEqual(leaf_from_disk.leaf_records, leaf.leaf_records)
+            tree_from_disk.close()
+
+    def test_should_store_leaves_of_fixed_width_records_as_key_and_value_columns(self):
+        """
+        Should store leaves whose keys and values use struct serializers as columnar pages: a keys column followed
+        by a values column without record slots (so more records fit each leaf).
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, float] = BPlusTree(
+                btree_file,
+                key_serializer=Int64Serializer(),
+                value_serializer=Float64Serializer(),
+                page_size=256,
+                max_key_size=8,
+                max_value_size=8,
+            )
+
+            # act
+            tree.bulk_load((key, key * 1.5) for key in range(0, 1000))
+            first_leaf = tree._find_leaf(None)
+            leaf_page = tree.memory.read_page(first_leaf.disk_page)
+            view = BPTNodeView(leaf_page, 8, 8, "big", Int64Serializer(), Float64Serializer())
+
+            # assert - (256 - 13) // 16 records fit a leaf instead of (256 - 13) // 21 slotted records
+            records_count = (256 - 13) // 16
+            keys_column = b"".join(key.to_bytes(8, "big", signed=True) for key in range(0, records_count))
+
+            self.assertEqual(leaf_page[0], COLUMNAR_LEAF_PAGE_TYPE)
+            self.assertEqual(first_leaf.records_count, records_count)
+            self.assertEqual(bytes(leaf_page[13 : 13 + records_count * 8]), keys_column)
+            self.assertTrue(view.is_leaf)
+            self.assertEqual(view.key_at(3), 3)
+            self.assertEqual(view.value_at(3), 4.5)
+            self.assertEqual(view.find_record(10), 10)
+            self.assertIsNone(view.find_record(1000))
+
+            # act and assert - columnar leaves are changed and read back as any other leaves
+            tree.delete_range(100, 900)
+            tree.insert_many((key, -1.0) for key in range(100, 200))
+            tree.close()
+
+            tree_from_disk: BPlusTree[int, float] = BPlusTree(
+                btree_file, key_serializer=Int64Serializer(), value_serializer=Float64Serializer()
+            )
+
+            self.assertEqual(tree_from_disk.get(150), -1.0)
+            self.assertEqual(tree_from_disk.get(950), 1425.0)
+            self.assertIsNone(tree_from_disk.get(500))
+            self.assertListEqual(list(tree_from_disk.keys()), list(range(0, 200)) + list(range(900, 1000)))
+            tree_from_disk.close()
+
+        with tmp_btree_file() as btree_file:
+            pickled_tree: BPlusTree[int, float] = BPlusTree(btree_file)
+            self.assertRaises(ValueError, lambda: list(pickled_tree.array_items()))
+            pickled_tree.close()
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_should_search_and_scan_columnar_leaves_with_numpy_arrays(self):
+        """
+        Should search columnar leaves with NumPy and scan ranges of keys and values in bulk as zero-copy array
+        slices of the leaves' pages.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, float] = BPlusTree(
+                btree_file,
+                key_serializer=Int64Serializer(),
+                value_serializer=Float64Serializer(),
+                page_size=512,
+                max_key_size=8,
+                max_value_size=8,
+                storage="mmap",
+            )
+            tree.insert_many((key, key / 4) for key in range(0, 10000, 2))
+            tree.close()
+
+            tree = BPlusTree(
+                btree_file, key_serializer=Int64Serializer(), value_serializer=Float64Serializer(), storage="mmap"
+            )
+
+            # act - nothing but the root is in memory, so leaves are searched on their pages
+            with patch("pystrukts.trees.bplustree.node.np.searchsorted", wraps=np.searchsorted) as searching:
+                value = tree.get(5000)
+                missing_value = tree.get(5001)
+
+            arrays = list(tree.array_items(1001, 2000))
+            keys = np.concatenate([keys for keys, _ in arrays])
+            values = np.concatenate([values for _, values in arrays])
+
+            # assert
+            self.assertEqual(value, 1250.0)
+            self.assertIsNone(missing_value)
+            self.assertGreater(searching.call_count, 0)
+            self.assertGreater(len(arrays), 1)
+            self.assertTrue(all(not keys.flags.owndata and not values.flags.owndata for keys, values in arrays))
+            self.assertListEqual(keys.tolist(), list(range(1002, 2000, 2)))
+            self.assertListEqual(values.tolist(), [key / 4 for key in range(1002, 2000, 2)])
+            self.assertEqual(sum(len(keys) for keys, _ in tree.array_items()), 5000)
+            self.assertListEqual(list(tree.array_items(20000)), [])
+            tree.close()
+
+    def test_compressed_paged_file_memory_should_store_pages_on_variable_size_extents(self):
+        """
+        ZlibPagedFileMemory should store compressed pages on extents smaller than pages and never overwrite the
+        extents of the saved extent map before a new map is saved.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            memory = ZlibPagedFileMemory(page_size=4096, tree_file=btree_file)
+            page_number = memory.allocate_page()
+            memory.write_page(page_number, b"compressed page".ljust(4096, b"\x00"))
+            memory.flush()
+            saved_extent = memory.extent_map.extents[page_number]
+
+            # act
+            memory.write_page(page_number, b"rewritten page".ljust(4096, b"\x00"))
+            rewritten_extent = memory.extent_map.extents[page_number]
+            memory.close()
+            reopened_memory = ZlibPagedFileMemory(tree_file=btree_file)
+
+            # assert
+            self.assertNotEqual(rewritten_extent[0], saved_extent[0])
+            self.assertLess(saved_extent[1], 64)
+            self.assertLess(os.path.getsize(btree_file), 4096)
+            self.assertEqual(reopened_memory.page_size, 4096)
+            self.assertEqual(reopened_memory.last_used_page, 1)
+            self.assertEqual(bytes(reopened_memory.read_page(1)[:14]), b"rewritten page")
+            self.assertEqual(len(reopened_memory.read_page(1)), 4096)
+            reopened_memory.close()
+
+    def test_should_store_bplustrees_on_compressed_tree_files(self):
+        """
+        Should store B+trees on zlib and lzma compressed tree files that are smaller than uncompressed ones and
+        whose cold pages are read with fewer bytes.
+        """
+        for storage in ("zlib", "lzma"):
+            with self.subTest(storage=storage), tmp_btree_file() as btree_file, tmp_btree_file() as plain_file:
+                # arrange
+                tree: BPlusTree[int, str] = BPlusTree(
+                    btree_file, page_size=4096, max_key_size=16, max_value_size=32, storage=storage
+                )
+                plain_tree: BPlusTree[int, str] = BPlusTree(
+                    plain_file, page_size=4096, max_key_size=16, max_value_size=32
+                )
+
+                # act
+                for tree_to_fill in (tree, plain_tree):
+                    tree_to_fill.insert_many((key, f"value-{key}") for key in range(0, 20000, 2))
+                    tree_to_fill.delete_range(5000, 5200)
+                    tree_to_fill.close()
+
+                tree = BPlusTree(btree_file, storage=storage)
+
+                with patch.object(tree.memory, "_read_at", wraps=tree.memory._read_at) as disk_read:
+                    values = [tree.get(key) for key in range(0, 20000, 1000)]
+
+                read_bytes = sum(read_call.args[1] for read_call in disk_read.call_args_list)
+
+                # assert
+                self.assertLess(os.path.getsize(btree_file) * 3, os.path.getsize(plain_file))
+                self.assertLess(read_bytes * 3, disk_read.call_count * 4096)
+                self.assertListEqual(values, [f"value-{key}" if key != 5000 else None for key in range(0, 20000, 1000)])
+                self.assertListEqual(list(tree.keys()), list(range(0, 5000, 2)) + list(range(5200, 20000, 2)))
+                self.assertRaises(ValueError, BPlusTree, plain_file, storage=storage)
+                self.assertRaises(ValueError, BPlusTree, btree_file, storage="lzma" if storage == "zlib" else "zlib")
+                tree.close()
+
+    def test_should_keep_compressed_tree_files_as_of_their_last_commit(self):
+        """
+        Should save the extent map of a compressed tree file on every commit, so that read-only trees see the
+        committed operations once they're refreshed and the tree file is reopened with them after its writer crashed
+        (or with the keys of its last flush in write-back mode).
+        """
+        for write_back in (False, True):
+            with self.subTest(write_back=write_back), tmp_btree_file() as btree_file:
+                # arrange
+                tree: BPlusTree[int, int] = BPlusTree(
+                    btree_file, page_size=256, max_key_size=16, max_value_size=16, storage="zlib", write_back=write_back
+                )
+                tree.insert_many((key, key) for key in range(0, 1000))
+                tree.flush()
+                reader: BPlusTree[int, int] = BPlusTree(btree_file, storage="zlib", read_only=True)
+
+                # act - the writer crashes without flushing or closing the tree file
+                tree.insert_many((key, key) for key in range(1000, 2000))
+                tree.delete_range(0, 500)
+                reader.refresh()
+                tree.memory.tree_file.close()
+
+                tree = BPlusTree(btree_file, storage="zlib")
+
+                # assert
+                expected_keys = list(range(0, 1000)) if write_back else list(range(500, 2000))
+
+                self.assertListEqual(list(reader.keys()), expected_keys)
+                self.assertEqual(len(tree), len(expected_keys))
+                self.assertListEqual(list(tree.keys()), expected_keys)
+                reader.close()
+                tree.close()
+
+    def test_should_compact_aged_bplustree_into_leaves_laid_out_in_key_order(self):
+        """
+        Should rewrite a B+tree aged by random inserts and deletions so that its leaves take consecutive pages in key
+        order followed by its inner nodes, dropping its free pages, and keep using the compacted tree file.
+        """
+        for storage in ("file", "mmap", "zlib"):
+            with self.subTest(storage=storage), tmp_btree_file() as btree_file:
+                # arrange
+                tree: BPlusTree[int, str] = BPlusTree(
+                    btree_file, page_size=256, max_key_size=16, max_value_size=32, storage=storage, wal=True
+                )
+                keys = list(range(0, 2000))
+                random.Random(42).shuffle(keys)
+
+                for key in keys:
+                    tree.insert(key, f"value-{key}")
+
+                tree.delete_range(500, 1500)
+                tree.flush()
+                last_used_page = tree.memory.last_used_page
+
+                # act
+                tree.compact()
+
+                # assert - leaves are chained through consecutive pages and inner nodes come after them
+                leaf = tree._find_leaf(None)
+                leaf_pages = [leaf.disk_page]
+
+                while leaf.next_leaf_page != 0:
+                    leaf = tree._disk_read(leaf.next_leaf_page)
+                    leaf_pages.append(leaf.disk_page)
+
+                self.assertListEqual(leaf_pages, list(range(1, len(leaf_pages) + 1)))
+                self.assertGreater(tree.root.disk_page, leaf_pages[-1])
+                self.assertEqual(tree.memory.free_list_head, 0)
+                self.assertLess(tree.memory.last_used_page, last_used_page)
+                self.assertFalse(os.path.exists(f"{btree_file}.compact"))
+                self.assertEqual(len(tree), 1000)
+                self.assertListEqual(list(tree.keys()), list(range(0, 500)) + list(range(1500, 2000)))
+
+                # act - the compacted tree file is written as usual
+                tree.insert(1000, "new")
+                tree.delete(0)
+                tree.close()
+
+                tree = BPlusTree(btree_file, storage=storage)
+
+                # assert
+                self.assertEqual(tree.get(1000), "new")
+                self.assertIsNone(tree.get(0))
+                self.assertEqual(tree.get(1999), "value-1999")
+                tree.close()
+
+    def test_should_not_compact_bplustree_with_open_snapshots_or_existing_target_files(self):
+        """
+        Should not compact a B+tree into an existing target file, with an invalid fill factor or while snapshots of
+        it are open, nor a read-only B+tree.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, key) for key in range(0, 100))
+
+            with open(f"{btree_file}.target", "w"):
+                pass
+
+            # act and assert
+            self.assertRaises(ValueError, tree.compact, f"{btree_file}.target")
+            self.assertRaises(ValueError, tree.compact, None, 1.5)
+
+            with tree.snapshot():
+                self.assertRaises(ValueError, tree.compact)
+
+            tree.compact(f"{btree_file}.compacted", fill_factor=0.5)
+            tree.close()
+
+            read_only_tree: BPlusTree[int, int] = BPlusTree(btree_file, read_only=True)
+            self.assertRaises(ReadOnlyTreeFile, read_only_tree.compact)
+            self.assertListEqual(list(read_only_tree.keys()), list(range(0, 100)))
+            self.assertFalse(os.path.exists(f"{btree_file}.compacted"))
+            read_only_tree.close()
+
+    def test_should_step_cursor_forwards_and_backwards_across_leaves(self):
+        """
+        Should step a cursor through all records of a B+tree in both directions following the next and previous
+        leaf pointers, which are kept consistent by leaf splits and merges.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=128, max_key_size=16, max_value_size=16)
+            keys = list(range(0, 1000))
+            random.Random(42).shuffle(keys)
+
+            for key in keys:
+                tree.insert(key, key * 10)
+
+            for key in keys[:600]:
+                tree.delete(key)
+
+            expected_keys = sorted(keys[600:])
+
+            # act
+            with tree.cursor() as cursor:
+                forward_keys = [cursor.key] if cursor.first() else []
+
+                while cursor.next():
+                    forward_keys.append(cursor.key)
+
+                backward_keys = [cursor.key] if cursor.last() else []
+
+                while cursor.prev():
+                    backward_keys.append(cursor.key)
+
+                last_value = cursor.last() and cursor.value
+
+            # assert
+            self.assertListEqual(forward_keys, expected_keys)
+            self.assertListEqual(backward_keys, expected_keys[::-1])
+            self.assertEqual(last_value, expected_keys[-1] * 10)
+            self.assertFalse(cursor.is_valid)
+            self.assertListEqual(self.read_leaf_chain(tree), self.read_leaf_chain(tree, backwards=True)[::-1])
+            tree.close()
+
+    def test_should_seek_cursor_to_first_key_not_smaller_than_the_given_one(self):
+        """
+        Should seek a cursor to the first record whose key is not smaller than the given key, invalidate it past
+        the ends of the B+tree and read values stored on overflow pages.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, str] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=32)
+
+            # act and assert
+            with tree.cursor() as cursor:
+                self.assertFalse(cursor.first())
+                self.assertFalse(cursor.last())
+                self.assertFalse(cursor.is_valid)
+                self.assertRaises(ValueError, lambda: cursor.key)
+
+            tree.insert_many((key, f"value-{key}") for key in range(0, 200, 2))
+            tree.insert(300, "v" * 500)  # stored on overflow pages
+
+            with tree.cursor() as cursor:
+                self.assertTrue(cursor.seek(51))
+                self.assertEqual(cursor.key, 52)
+                self.assertEqual(cursor.value, "value-52")
+                self.assertTrue(cursor.prev())
+                self.assertEqual(cursor.key, 50)
+                self.assertTrue(cursor.seek(50))
+                self.assertEqual(cursor.key, 50)
+                self.assertTrue(cursor.seek(-1))
+                self.assertEqual(cursor.key, 0)
+                self.assertFalse(cursor.prev())
+                self.assertFalse(cursor.next())  # cursors moved past the ends stay invalid
+                self.assertTrue(cursor.seek(199))
+                self.assertEqual(cursor.key, 300)
+                self.assertEqual(cursor.value, "v" * 500)
+                self.assertFalse(cursor.next())
+                self.assertFalse(cursor.seek(301))
+                self.assertRaises(ValueError, lambda: cursor.value)
+
+            tree.close()
+
+    def test_should_keep_cursor_leaf_pinned_on_buffer_pool(self):
+        """
+        Should pin the current leaf of a cursor on the buffer pool, move the pin as the cursor leaves it and unpin
+        it when the cursor is closed.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=128, max_key_size=16, max_value_size=16, buffer_pool_size=128 * 4
+            )
+            tree.insert_many((key, key) for key in range(0, 500))
+            buffer_pool = tree.memory.buffer_pool
+
+            def pinned_pages():
+                return [page for page, frame in buffer_pool.frames.items() if frame.pin_count > 0]
+
+            # act
+            cursor = tree.cursor()
+            cursor.first()
+            first_leaf_page = cursor.leaf_page
+
+            # assert - the pinned leaf is kept while other pages are evicted
+            self.assertListEqual(pinned_pages(), [first_leaf_page])
+
+            for key in range(499, 0, -50):
+                tree.get(key)
+
+            self.assertListEqual(pinned_pages(), [first_leaf_page])
+
+            while cursor.leaf_page == first_leaf_page:
+                cursor.next()
+
+            self.assertListEqual(pinned_pages(), [cursor.leaf_page])
+
+            cursor.close()
+            self.assertListEqual(pinned_pages(), [])
+            tree.close()
+
+    def test_should_chain_leaves_both_ways_after_bulk_loads_and_compactions(self):
+        """
+        Should chain the leaves of bulk loaded and compacted B+trees through their next and previous leaf pointers.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16)
+
+            # act
+            tree.bulk_load((key, key) for key in range(0, 1000))
+            bulk_loaded_leaves = self.read_leaf_chain(tree)
+            tree.delete_range(200, 800)
+            tree.compact(fill_factor=0.5)
+
+            # assert
+            self.assertGreater(len(bulk_loaded_leaves), 1)
+            self.assertListEqual(self.read_leaf_chain(tree), self.read_leaf_chain(tree, backwards=True)[::-1])
+
+            with tree.cursor() as cursor:
+                cursor.last()
+                keys = [cursor.key]
+
+                while cursor.prev():
+                    keys.append(cursor.key)
+
+            self.assertListEqual(keys, list(range(999, 799, -1)) + list(range(199, -1, -1)))
+            tree.close()
+
+    def test_should_count_rank_and_select_keys_with_order_statistics(self):
+        """
+        Should count the keys of ranges, rank keys and select keys by position reading a page per level of a B+tree
+        with order statistics, whose inner nodes keep the records counts of their children's subtrees.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=128, max_key_size=16, max_value_size=16, order_statistics=True
+            )
+            keys = list(range(0, 3000, 3))
+            random.Random(42).shuffle(keys)
+
+            for key in keys[:500]:
+                tree.insert(key, key * 10)
+
+            tree.insert_many((key, key * 10) for key in keys[500:])
+
+            for key in keys[:300]:
+                tree.delete(key)
+
+            sorted_keys = sorted(keys[300:])
+
+            # act
+            with patch.object(tree.memory, "read_page", wraps=tree.memory.read_page) as page_reads:
+                rank = tree.rank(1500)
+                rank_page_reads = page_reads.call_count
+                count = tree.count(300, 2400)
+                last_item = tree.select(-1)
+
+            # assert
+            self.assertEqual(rank, len([key for key in sorted_keys if key < 1500]))
+            self.assertEqual(rank_page_reads, tree.height - 1)
+            self.assertEqual(count, len([key for key in sorted_keys if 300 <= key < 2400]))
+            self.assertEqual(last_item, (sorted_keys[-1], sorted_keys[-1] * 10))
+            self.assertEqual(tree.count(), len(sorted_keys))
+            self.assertEqual(tree.count(2400, 300), 0)
+            self.assertEqual(tree.rank(-1), 0)
+            self.assertEqual(tree.rank(3000), len(sorted_keys))
+            self.assertListEqual([tree.select(i)[0] for i in range(0, len(sorted_keys), 37)], sorted_keys[::37])
+            self.assertRaises(IndexError, tree.select, len(sorted_keys))
+            self.assert_subtree_counts(tree)
+            tree.close()
+
+    def test_should_keep_subtree_counts_across_bulk_loads_compactions_and_reopens(self):
+        """
+        Should keep the subtree counts of bulk loaded and compacted B+trees with order statistics and keep order
+        statistics enabled when their tree files are opened again.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=128, max_key_size=16, max_value_size=16, order_statistics=True
+            )
+
+            # act
+            tree.bulk_load((key, key) for key in range(0, 2000))
+            self.assert_subtree_counts(tree)
+
+            tree.delete_range(500, 1500)
+            tree.compact(fill_factor=0.5)
+            self.assert_subtree_counts(tree)
+            tree.close()
+
+            tree = BPlusTree(btree_file)
+
+            # assert
+            self.assertTrue(tree.order_statistics)
+            self.assertEqual(tree.rank(1500), 500)
+            self.assertEqual(tree.select(500), (1500, 1500))
+            self.assertEqual(tree.count(0, 1000), 500)
+            self.assert_subtree_counts(tree)
+            tree.close()
+
+    def test_should_count_rank_and_select_keys_by_scanning_without_order_statistics(self):
+        """
+        Should count, rank and select keys of a B+tree without order statistics by scanning its leaves, whose
+        inner nodes are stored as usual.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=128, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, key) for key in range(0, 1000, 2))
+
+            # act and assert
+            self.assertFalse(tree.order_statistics)
+            self.assertFalse(tree.root.has_subtree_counts)
+            self.assertEqual(tree.rank(501), 251)
+            self.assertEqual(tree.count(100, 200), 50)
+            self.assertEqual(tree.select(250), (500, 500))
+            tree.close()
+
+    def test_should_count_rank_and_select_duplicate_keys_that_straddle_leaves(self):
+        """
+        Should count, rank and select the duplicates of a key that straddle leaves, with or without order statistics.
+        """
+        for order_statistics in (True, False):
+            with self.subTest(order_statistics=order_statistics), tmp_btree_file() as btree_file:
+                # arrange
+                tree: BPlusTree[int, int] = BPlusTree(
+                    btree_file, page_size=128, max_key_size=16, max_value_size=16, order_statistics=order_statistics
+                )
+                tree.insert_many((key, key) for key in range(0, 100))
+                tree.insert_many((50, -1) for _ in range(0, 30))
+
+                for copies in range(31, 0, -5):
+                    # act and assert
+                    self.assertEqual(tree.rank(50), 50)
+                    self.assertEqual(tree.rank(51), 50 + copies)
+                    self.assertEqual(tree.count(50, 51), copies)
+                    self.assertEqual(tree.count(40, 60), 19 + copies)
+                    self.assertEqual(tree.select(49 + copies)[0], 50)
+                    self.assertEqual(tree.select(50 + copies)[0], 51)
+
+                    for _ in range(0, 5):
+                        tree.delete(50)
+
+                if order_statistics:
+                    self.assert_subtree_counts(tree)
+
+                tree.close()
+
+    def read_leaf_chain(self, tree: BPlusTree, backwards: bool = False) -> list:
+        """
+        Returns the pages of the leaves of a B+tree by following their next (or previous) leaf pointers.
+        """
+        leaf = tree._find_leaf(None)
+
+        while backwards and leaf.next_leaf_page != 0:
+            leaf = tree._disk_read(leaf.next_leaf_page)
+
+        leaf_pages = [leaf.disk_page]
+
+        while (leaf.prev_leaf_page if backwards else leaf.next_leaf_page) != 0:
+            leaf = tree._disk_read(leaf.prev_leaf_page if backwards else leaf.next_leaf_page)
+            leaf_pages.append(leaf.disk_page)
+
+        return leaf_pages
+
+    def assert_subtree_counts(self, tree: BPlusTree, page: Optional[int] = None, level: Optional[int] = None) -> int:
+        """
+        Asserts that the subtree counts of the inner nodes of a B+tree match the records of their children's
+        subtrees and returns the records count of the (sub)tree.
+        """
+        page = tree.memory.root_page if page is None else page
+        level = tree.height - 1 if level is None else level
+        node = tree._disk_read(page)
+
+        if level == 0:
+            return node.records_count
+
+        self.assertTrue(node.has_subtree_counts)
+        records_count = 0
+
+        for i in range(0, node.records_count + 1):
+            child_records_count = self.assert_subtree_counts(tree, node.child_page(i), level - 1)
+            self.assertEqual(node.child_count(i), child_records_count)
+            records_count += child_records_count
+
+        if page == tree.memory.root_page:
+            self.assertEqual(records_count, len(tree))
+
+        return records_count
+
     def create_paged_file_memory(
         self,
         tree_file: str,
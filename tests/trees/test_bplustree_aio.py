@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from pystrukts.trees.bplustree.aio import AsyncBPlusTree
+from pystrukts.trees.bplustree.aio import AsyncReadWriteLatch
+from pystrukts.trees.bplustree.bplustree import BPlusTree
+from tests.trees.utils import tmp_btree_file
+
+
+class TestSuiteAsyncBPlusTree(unittest.IsolatedAsyncioTestCase):
+    """
+    B+tree asyncio front-end testing suite.
+    """
+
+    async def test_should_insert_get_and_scan_keys(self):
+        """
+        Should insert keys, get them and scan ranges of them with async for.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            async with AsyncBPlusTree(btree_file, page_size=256, max_key_size=16, max_value_size=16) as tree:
+                await tree.insert_many((key, f"value-{key}") for key in range(0, 500, 2))
+
+                # act
+                for key in range(1, 100, 2):
+                    await tree.insert(key, f"value-{key}")
+
+                deleted = await tree.delete(4)
+                missing_value = await tree.get(4)
+                value = await tree.get(99)
+                range_keys = [key async for key in tree.keys(95, 106)]
+                all_items = [item async for item in tree.items()]
+
+                # assert
+                self.assertTrue(deleted)
+                self.assertIsNone(missing_value)
+                self.assertEqual(value, "value-99")
+                self.assertEqual(range_keys, [95, 96, 97, 98, 99, 100, 102, 104])
+                self.assertEqual(len(tree), 299)
+                self.assertEqual(len(all_items), 299)
+                self.assertEqual(all_items[:3], [(0, "value-0"), (1, "value-1"), (2, "value-2")])
+                self.assertEqual([key for key, _ in all_items], sorted(key for key, _ in all_items))
+
+            # assert - the tree file is readable by the blocking tree
+            reopened_tree: BPlusTree[int, str] = BPlusTree(btree_file)
+
+            self.assertEqual(reopened_tree.get(99), "value-99")
+            self.assertEqual(len(reopened_tree), 299)
+            reopened_tree.close()
+
+    async def test_should_share_in_flight_reads_of_the_same_page(self):
+        """
+        Should read a cold page from disk only once when many coroutines await it at the same time.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange - a tree file with values bigger than max_value_size (on overflow pages)
+            tree: BPlusTree[int, str] = BPlusTree(btree_file, page_size=128, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, f"{key}" * 20) for key in range(0, 200))
+            tree.close()
+
+            async_tree: AsyncBPlusTree[int, str] = AsyncBPlusTree(
+                btree_file, page_size=128, max_key_size=16, max_value_size=16
+            )
+            read_pages = list()
+            read_page = async_tree.tree.memory.read_page
+            read_started = threading.Event()
+            release_reads = threading.Event()
+
+            def slow_read_page(page_number, *args):
+                read_pages.append(page_number)
+                read_started.set()
+                release_reads.wait(5)  # reads are held until all coroutines await the page
+                return read_page(page_number, *args)
+
+            # act
+            with patch.object(async_tree.tree.memory, "read_page", side_effect=slow_read_page):
+                lookups = [asyncio.ensure_future(async_tree.get(key)) for key in (150, 150, 151, 150)]
+
+                await asyncio.get_running_loop().run_in_executor(None, read_started.wait, 5)
+                await asyncio.sleep(0.01)
+                release_reads.set()
+                values = await asyncio.gather(*lookups)
+
+            await async_tree.close()
+
+            # assert - the leaf of the keys is read once and then each overflow value is read on its own
+            self.assertEqual(values, ["150" * 20, "150" * 20, "151" * 20, "150" * 20])
+            self.assertEqual(read_pages.count(read_pages[0]), 1)
+            self.assertEqual(async_tree.pending_reads, dict())
+
+    async def test_should_keep_writers_away_from_readers(self):
+        """
+        Should make writers wait for the readers of the latch and block new readers while writers wait.
+        """
+        # arrange
+        latch = AsyncReadWriteLatch()
+        events = list()
+
+        async def read(name, duration):
+            async with latch.reading():
+                events.append(f"{name} start")
+                await asyncio.sleep(duration)
+                events.append(f"{name} end")
+
+        async def write():
+            async with latch.writing():
+                events.append("writer start")
+                await asyncio.sleep(0.01)
+                events.append("writer end")
+
+        # act
+        first_reader = asyncio.ensure_future(read("reader 1", 0.02))
+        await asyncio.sleep(0)
+        writer = asyncio.ensure_future(write())
+        await asyncio.sleep(0)
+        second_reader = asyncio.ensure_future(read("reader 2", 0))
+        await asyncio.gather(first_reader, writer, second_reader)
+
+        # assert
+        self.assertEqual(
+            events, ["reader 1 start", "reader 1 end", "writer start", "writer end", "reader 2 start", "reader 2 end"]
+        )
@@ -0,0 +1,150 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from pystrukts.trees.bplustree.bloom import BloomFilter
+from pystrukts.trees.bplustree.bplustree import BPlusTree
+from tests.trees.utils import tmp_btree_file
+
+TREE_OPTIONS = dict(page_size=256, max_key_size=16, max_value_size=16, bloom_filter_bits_per_key=10)
+
+
+class TestSuiteBloomFilter(unittest.TestCase):
+    """
+    Bloom filter testing suite.
+    """
+
+    def test_should_never_miss_added_keys_and_rarely_report_absent_ones(self):
+        """
+        Should report all the added keys and about 1% of the absent keys with 10 bits per key.
+        """
+        # arrange
+        bloom_filter = BloomFilter(10000, 10)
+
+        # act
+        for key in range(0, 10000):
+            bloom_filter.add(key.to_bytes(8, "big"))
+
+        # assert
+        false_positives = sum(bloom_filter.may_contain(key.to_bytes(8, "big")) for key in range(10000, 30000))
+
+        self.assertEqual(bloom_filter.hash_count, 7)
+        self.assertTrue(all(bloom_filter.may_contain(key.to_bytes(8, "big")) for key in range(0, 10000)))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_should_save_and_load_filters(self):
+        """
+        Should save a filter to a file and load it back with the same bits, or load None for missing files.
+        """
+        with tmp_btree_file() as filter_file:
+            # arrange
+            bloom_filter = BloomFilter(100, 8)
+            bloom_filter.add(b"key")
+
+            # act
+            bloom_filter.save(filter_file)
+            loaded_filter = BloomFilter.load(filter_file)
+            missing_filter = BloomFilter.load(f"{filter_file}.missing")
+
+            # assert
+            self.assertIsNotNone(loaded_filter)
+            self.assertEqual(loaded_filter.capacity, 1024)
+            self.assertEqual(loaded_filter.bits_per_key, 8)
+            self.assertEqual(loaded_filter.hash_count, bloom_filter.hash_count)
+            self.assertEqual(loaded_filter.bits, bloom_filter.bits)
+            self.assertTrue(loaded_filter.may_contain(b"key"))
+            self.assertIsNone(missing_filter)
+            self.assertFalse(os.path.exists(f"{filter_file}.tmp"))
+
+    def test_should_not_create_filters_without_bits(self):
+        """
+        Should raise ValueError for filters with no bits per key.
+        """
+        # act / assert
+        with self.assertRaises(ValueError):
+            BloomFilter(100, 0)
+
+
+class TestSuiteBPlusTreeBloomFilter(unittest.TestCase):
+    """
+    B+tree bloom filter testing suite.
+    """
+
+    def test_should_answer_lookups_of_absent_keys_without_reading_pages(self):
+        """
+        Should return None for most absent keys before reading any page while present keys are still found.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree = BPlusTree(btree_file, **TREE_OPTIONS)
+            tree.insert_many((key, f"value-{key}") for key in range(0, 2000, 2))
+            tree.close()
+
+            tree = BPlusTree(btree_file, **TREE_OPTIONS)
+
+            # act
+            with patch.object(tree.memory, "read_page", wraps=tree.memory.read_page) as reading:
+                missing_values = [tree.get(key) for key in range(1, 2000, 2)]
+                missing_reads = reading.call_count
+                values = [tree.get(key) for key in range(0, 2000, 2)]
+
+            # assert
+            self.assertTrue(all(value is None for value in missing_values))
+            self.assertLess(missing_reads, 50)  # only the false positives descend the tree
+            self.assertListEqual(values, [f"value-{key}" for key in range(0, 2000, 2)])
+            tree.close()
+
+    def test_should_keep_the_filter_file_in_sync_with_the_tree_file(self):
+        """
+        Should save the filter on close, remove its file when the tree gets new keys and reload it on reopening.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            filter_file = f"{btree_file}.bloom"
+            tree = BPlusTree(btree_file, **TREE_OPTIONS)
+            tree.insert_many((key, key) for key in range(0, 100))
+            tree.close()
+            saved_after_close = os.path.exists(filter_file)
+
+            # act - a tree without the filter adds a key, so the filter file is stale
+            tree = BPlusTree(btree_file)
+            tree.insert(1000, 1000)
+            saved_after_insert = os.path.exists(filter_file)
+            tree.close()
+
+            with patch.object(BloomFilter, "load", wraps=BloomFilter.load) as loading:
+                tree = BPlusTree(btree_file, bloom_filter_bits_per_key=10)
+                value = tree.get(1000)
+                tree.close()
+
+            # assert
+            self.assertTrue(saved_after_close)
+            self.assertFalse(saved_after_insert)
+            self.assertEqual(loading.call_count, 0)  # no file to load, so the filter was rebuilt from the tree
+            self.assertEqual(value, 1000)
+            self.assertTrue(os.path.exists(filter_file))
+
+            with patch.object(BloomFilter, "load", wraps=BloomFilter.load) as loading:
+                tree = BPlusTree(btree_file, bloom_filter_bits_per_key=10)
+                self.assertEqual(loading.call_count, 1)
+                self.assertEqual(tree.get(99), 99)
+                tree.close()
+
+    def test_should_rebuild_the_filter_on_bulk_loads_and_growth(self):
+        """
+        Should rebuild the filter with room for more keys after bulk loads and when the tree outgrows it.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree = BPlusTree(btree_file, **TREE_OPTIONS)
+
+            # act
+            tree.bulk_load((key, key) for key in range(0, 3000))
+            bulk_loaded_capacity = tree.bloom_filter.capacity
+            tree.insert_many((key, key) for key in range(3000, 7000))
+
+            # assert
+            self.assertEqual(bulk_loaded_capacity, 6000)
+            self.assertEqual(tree.bloom_filter.capacity, 14000)
+            self.assertTrue(all(tree.get(key) == key for key in range(0, 7000, 7)))
+            tree.close()
@@ -0,0 +1,131 @@
+import unittest
+
+from pystrukts.trees.bplustree.bplustree import BPlusTree
+from pystrukts.trees.bplustree.metrics import LatencyHistogram
+from pystrukts.trees.bplustree.metrics import TreeMetrics
+from tests.trees.utils import tmp_btree_file
+
+
+class TestSuiteTreeMetrics(unittest.TestCase):
+    """
+    B+tree metrics testing suite.
+    """
+
+    def test_should_estimate_latency_percentiles_with_power_of_two_buckets(self):
+        """
+        Should estimate percentiles with the upper bound of their buckets, capped by the max latency.
+        """
+        # arrange
+        histogram = LatencyHistogram()
+
+        # act
+        for _ in range(0, 99):
+            histogram.record(0.000001)  # 1000 ns -> bucket of [512, 1024) ns
+
+        histogram.record(0.5)
+
+        # assert
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.percentile(50), 1024 / 1e9)
+        self.assertEqual(histogram.percentile(99), 1024 / 1e9)
+        self.assertEqual(histogram.percentile(100), 0.5)
+        self.assertEqual(histogram.to_dict()["max_seconds"], 0.5)
+        self.assertEqual(LatencyHistogram().percentile(50), 0.0)
+
+    def test_should_count_page_io_splits_descents_and_latencies(self):
+        """
+        Should count the page reads and writes, disk bytes, cache hits, node splits per level and descents of a
+        tree and keep the latencies of its lookups and inserts.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            metrics = TreeMetrics()
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file,
+                page_size=128,
+                max_key_size=16,
+                max_value_size=16,
+                buffer_pool_size=128 * 8,
+                metrics=metrics,
+            )
+
+            # act
+            for key in range(0, 300):
+                tree.insert(key, key)
+
+            values = [tree.get(key) for key in range(0, 400, 10)]
+            snapshot = metrics.snapshot()
+
+            # assert
+            counters = snapshot["counters"]
+
+            self.assertListEqual(values, [key if key < 300 else None for key in range(0, 400, 10)])
+            self.assertEqual(counters["insert"], 300)
+            self.assertEqual(counters["get"], 40)
+            self.assertEqual(counters["descents"], 40)
+            self.assertEqual(counters["descent_levels"], 40 * tree.height)
+            self.assertGreater(counters["read_page"], 0)
+            self.assertGreater(counters["write_page"], 300)
+            self.assertEqual(counters["cache_hits"] + counters["cache_misses"], counters["read_page"])
+            self.assertGreater(counters["cache_hits"], 0)
+            self.assertEqual(counters["bytes_written"], 128 * counters["disk_writes"])
+            self.assertGreater(counters["serialize_seconds"], 0)
+            self.assertGreater(snapshot["splits_per_level"][0], snapshot["splits_per_level"][1])
+            self.assertEqual(snapshot["latencies"]["get"]["count"], 40)
+            self.assertEqual(snapshot["latencies"]["insert"]["count"], 300)
+            self.assertEqual(snapshot["latencies"]["read_page"]["count"], counters["read_page"])
+            self.assertGreater(snapshot["latencies"]["insert"]["p99_seconds"], 0)
+
+            # act - metrics are zeroed
+            metrics.reset()
+
+            # assert
+            self.assertEqual(metrics.snapshot(), {"counters": {}, "splits_per_level": {}, "latencies": {}})
+            tree.close()
+
+    def test_should_call_hooks_with_the_counters_of_each_operation(self):
+        """
+        Should call hooks with samples of the timed operations that carry the counters changed by each of them.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, int] = BPlusTree(btree_file, page_size=128, max_key_size=16, max_value_size=16)
+            tree.insert_many((key, key) for key in range(0, 1000))
+            tree.close()
+
+            metrics = TreeMetrics()
+            samples = list()
+            metrics.add_hook(samples.append)
+            tree = BPlusTree(btree_file, metrics=metrics)
+
+            # act
+            value = tree.get(500)
+
+            # assert - nothing but the root is in memory, so the lookup reads a page per level below the root
+            get_sample = samples[-1]
+
+            self.assertEqual(value, 500)
+            self.assertEqual(get_sample.operation, "get")
+            self.assertGreater(get_sample.seconds, 0)
+            self.assertEqual(get_sample.counters["read_page"], tree.height - 1)
+            self.assertEqual(get_sample.counters["bytes_read"], 128 * (tree.height - 1))
+            self.assertEqual(get_sample.counters["descent_levels"], tree.height)
+            page_reads = samples[-tree.height : -1]
+
+            self.assertEqual([sample.operation for sample in page_reads], ["read_page"] * (tree.height - 1))
+            tree.close()
+
+    def test_should_not_instrument_trees_without_metrics(self):
+        """
+        Should leave the methods of trees (and of their memories) without metrics as they are.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange and act
+            tree: BPlusTree[int, int] = BPlusTree(btree_file)
+
+            # assert
+            self.assertIsNone(tree.metrics)
+            self.assertIsNone(tree.memory.metrics)
+            self.assertNotIn("get", vars(tree))
+            self.assertNotIn("read_page", vars(tree.memory))
+            tree.close()
@@ -0,0 +1,158 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from pystrukts.trees.bplustree.bplustree import BPlusTree
+from pystrukts.trees.bplustree.wal import WriteAheadLog
+from pystrukts.trees.bplustree.wal import replay_log
+from tests.trees.utils import tmp_btree_file
+
+
+class TestSuiteWriteAheadLog(unittest.TestCase):
+    """
+    B+tree write-ahead log testing suite.
+    """
+
+    def test_should_replay_only_committed_operations(self):
+        """
+        Should replay the page images of committed operations and discard uncommitted or torn records.
+        """
+        with tmp_btree_file() as log_file:
+            # arrange
+            wal = WriteAheadLog(log_file, page_size=8, group_commit_size=2)
+
+            wal.log_page(1, b"page 1 a")
+            wal.log_page(2, b"page 2 a")
+            wal.commit()
+            wal.log_page(1, b"page 1 b")
+            wal.commit()
+            wal.log_page(3, b"page 3 a")  # never committed
+
+            # assert - group commit fsyncs after 2 operations
+            self.assertEqual(wal.unsynced_commits, 0)
+            self.assertEqual(wal.pages[3], b"page 3 a")
+
+            # arrange - a torn commit at the end of the log
+            wal.log_page(2, b"page 2 b")
+            wal.commit()
+            wal.close()
+
+            with open(log_file, "r+b") as log:
+                log.truncate(os.path.getsize(log_file) - 2)
+
+            # act
+            replayed_pages = dict()
+            replayed_operations = replay_log(log_file, replayed_pages.__setitem__, "big")
+
+            # assert
+            self.assertEqual(replayed_operations, 2)
+            self.assertDictEqual(replayed_pages, {1: b"page 1 b", 2: b"page 2 a"})
+
+    def test_should_sync_a_lone_commit_once_the_group_commit_interval_has_passed(self):
+        """
+        Should fsync a commit that doesn't fill up its group once the group commit interval has passed, even if no
+        other operation commits after it.
+        """
+        with tmp_btree_file() as log_file:
+            # arrange
+            wal = WriteAheadLog(log_file, page_size=8, group_commit_size=100, group_commit_interval=50)
+
+            with patch("pystrukts.trees.bplustree.wal.os.fsync", wraps=os.fsync) as fsync:
+                # act
+                wal.log_page(1, b"page 1 a")
+                wal.commit()
+
+                # assert
+                self.assertEqual(wal.unsynced_commits, 1)
+                self.assertEqual(fsync.call_count, 0)
+
+                time.sleep(0.5)
+
+                self.assertEqual(wal.unsynced_commits, 0)
+                self.assertEqual(fsync.call_count, 1)
+                self.assertIsNone(wal.sync_timer)
+
+            wal.close()
+
+    def test_should_recover_committed_inserts_after_crash(self):
+        """
+        Should recover all committed inserts from the write-ahead log when a tree is reopened after a crash.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange - pages are only on the log as the tree is never checkpointed or closed
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=16, wal=True, wal_group_commit_size=10
+            )
+
+            for key in range(0, 300):
+                tree.insert(key, key)
+
+            tree.memory.wal.sync()
+
+            # assert
+            self.assertEqual(os.path.getsize(btree_file), 0)
+
+            # act - crash and reopen
+            recovered_tree: BPlusTree[int, int] = BPlusTree(btree_file, wal=True)
+
+            # assert
+            self.assertEqual(recovered_tree.memory.page_size, 256)
+            self.assertListEqual(list(recovered_tree.keys()), list(range(0, 300)))
+            self.assertEqual(os.path.getsize(f"{btree_file}.wal"), 4)  # log only has its header after recovery
+
+    def test_should_recover_committed_inserts_after_crash_with_mmap_storage(self):
+        """
+        Should recover all committed inserts from the write-ahead log into a memory-mapped tree file, which is
+        grown by the replayed pages before its page size is read from the metadata page.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange - pages are only on the log as the tree is never checkpointed or closed
+            tree: BPlusTree[int, int] = BPlusTree(
+                btree_file,
+                page_size=256,
+                max_key_size=16,
+                max_value_size=16,
+                storage="mmap",
+                wal=True,
+                wal_group_commit_size=10,
+            )
+
+            for key in range(0, 300):
+                tree.insert(key, key)
+
+            tree.memory.wal.sync()
+
+            # act - crash and reopen
+            recovered_tree: BPlusTree[int, int] = BPlusTree(btree_file, storage="mmap", wal=True)
+
+            # assert
+            self.assertEqual(recovered_tree.memory.page_size, 256)
+            self.assertListEqual(list(recovered_tree.keys()), list(range(0, 300)))
+            self.assertEqual(os.path.getsize(f"{btree_file}.wal"), 4)
+            recovered_tree.close()
+
+    def test_should_checkpoint_log_into_tree_file(self):
+        """
+        Should write logged pages to the tree file on checkpoints and keep working without the log.
+        """
+        with tmp_btree_file() as btree_file:
+            # arrange
+            tree: BPlusTree[int, str] = BPlusTree(
+                btree_file, page_size=256, max_key_size=16, max_value_size=24, wal=True
+            )
+
+            for key in range(0, 100):
+                tree.insert(key, f"value {key}")
+
+            # act
+            tree.checkpoint()
+            tree.delete(50)
+            tree.close()
+
+            # assert
+            tree_from_disk: BPlusTree[int, str] = BPlusTree(btree_file)
+
+            self.assertIsNone(tree_from_disk.get(50))
+            self.assertEqual(tree_from_disk.get(99), "value 99")
+            self.assertEqual(len(list(tree_from_disk.keys())), 99)
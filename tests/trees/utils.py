@@ -1,6 +1,7 @@
 """
 Utility functions used for testing trees.
 """
+import glob
 import os
 from contextlib import contextmanager
 from typing import Optional
@@ -10,7 +11,8 @@ from uuid import uuid4
 @contextmanager
 def tmp_btree_file(tmp_file_name: Optional[str] = None):
     """
-    Temporarily creates a test index name which is deleted at the end of the context manager.
+    Temporarily creates a test index name which is deleted, along with its side files (e.g. write-ahead logs),
+    at the end of the context manager.
     """
     tmp_file_name = tmp_file_name if tmp_file_name is not None else f"tmp-btree-{uuid4().hex}.db"
 
@@ -19,5 +21,5 @@ def tmp_btree_file(tmp_file_name: Optional[str] = None):
         yield tmp_file_name
     finally:
         # final cleaning if needed
-        if os.path.exists(tmp_file_name):
-            os.remove(tmp_file_name)
+        for file_name in glob.glob(f"{tmp_file_name}*"):
+            os.remove(file_name)